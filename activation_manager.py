@@ -1,64 +1,396 @@
 ﻿from __future__ import annotations
 
+import contextlib
+import functools
+import itertools
 import json
+import logging
+import os
 import secrets
 import string
+import threading
+import time
 from datetime import date, datetime
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows：只做进程内加锁
+    fcntl = None
+
+import metrics
+
+logger = logging.getLogger(__name__)
 
 
 class ActivationError(Exception):
     """Raised when activation operations fail."""
 
 
+CODE_STATUS_FILTERS = ("active", "disabled", "expired")
+CODE_SORT_OPTIONS = ("created_desc", "created_asc", "code")
+
+CODE_ALPHABET = string.ascii_uppercase + string.digits
+CODE_LENGTH = 16
+MAX_CODE_LENGTH = 50
+MAX_BULK_CODES = 100000
+# 每个激活码音色库保留的音色数，超出时淘汰最久未使用的
+MAX_VOICES_PER_CODE = 50
+
+CODE_RECORD_FIELDS = (
+    "code",
+    "max_voices",
+    "used_voices",
+    "max_characters",
+    "used_characters",
+    "expires_at",
+    "disabled",
+    "note",
+    "created_at",
+    "last_used_at",
+)
+VOICE_RECORD_FIELDS = ("code", "uri", "name", "audio_hash", "created_at", "last_used_at")
+
+
+def generate_unique_codes(count: int, existing: Iterable[str], length: int = CODE_LENGTH) -> List[str]:
+    """在内存中生成 count 个互不重复、且不与 existing 冲突的激活码。"""
+    seen = set(existing)
+    codes: List[str] = []
+    while len(codes) < count:
+        candidate = "".join(secrets.choice(CODE_ALPHABET) for _ in range(length))
+        if candidate not in seen:
+            seen.add(candidate)
+            codes.append(candidate)
+    return codes
+
+
+def validate_bulk_count(count: Any) -> int:
+    try:
+        count = int(count)
+    except (TypeError, ValueError):
+        raise ActivationError("生成数量必须是整数。")
+    if count <= 0:
+        raise ActivationError("生成数量必须大于 0。")
+    if count > MAX_BULK_CODES:
+        raise ActivationError(f"单次最多生成 {MAX_BULK_CODES} 个激活码。")
+    return count
+
+
+def prepare_import_record(raw: Dict[str, Any]) -> Dict[str, Any]:
+    """校验并规整一条导入记录（CSV / JSON 读出的原始字段）。"""
+    code = str(raw.get("code") or "").strip().upper()
+    if not code:
+        raise ActivationError("导入记录缺少激活码。")
+    if len(code) > MAX_CODE_LENGTH:
+        raise ActivationError(f"激活码过长：{code}")
+
+    record: Dict[str, Any] = {"code": code}
+    for key in ("max_voices", "used_voices", "max_characters", "used_characters"):
+        value = raw.get(key)
+        try:
+            record[key] = max(int(value), 0) if value not in (None, "") else 0
+        except (TypeError, ValueError):
+            raise ActivationError(f"激活码 {code} 的 {key} 不是有效整数。")
+
+    disabled = raw.get("disabled", False)
+    if isinstance(disabled, str):
+        disabled = disabled.strip().lower() in ("1", "true", "yes", "y", "t")
+    record["disabled"] = bool(disabled)
+
+    expires_at = str(raw.get("expires_at") or "").strip()
+    if expires_at:
+        try:
+            expires_at = datetime.fromisoformat(expires_at).date().isoformat()
+        except ValueError:
+            raise ActivationError(f"激活码 {code} 的有效期格式错误：{expires_at}")
+    record["expires_at"] = expires_at or None
+
+    for key in ("created_at", "last_used_at"):
+        value = str(raw.get(key) or "").strip()
+        try:
+            record[key] = datetime.fromisoformat(value).isoformat() if value else None
+        except ValueError:
+            raise ActivationError(f"激活码 {code} 的 {key} 格式错误：{value}")
+
+    record["note"] = str(raw.get("note") or "").strip()
+    return record
+
+
+SNAPSHOT_RETRY_SECONDS = 60
+
+
+def _exclusive(method: Callable[..., Any]) -> Callable[..., Any]:
+    """读-改-写操作在进程内与进程间（多 worker）都串行执行"""
+    @functools.wraps(method)
+    def wrapper(self: "ActivationManager", *args: Any, **kwargs: Any) -> Any:
+        with self._write_lock():
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
 class ActivationManager:
-    def __init__(self, storage_path: Path):
+    def __init__(self, storage_path: Path, snapshot_source: Optional[str] = None):
         self.storage_path = Path(storage_path)
         if self.storage_path.is_dir():
             raise ActivationError("storage_path must point to a file")
         self.storage_path.parent.mkdir(parents=True, exist_ok=True)
-        self._ensure_storage()
+        # 内存索引：文件未变化（inode/mtime/size 相同）时复用，避免每次读取都解析整个 JSON
+        self._index_stamp: Optional[Tuple[int, int, int]] = None
+        self._index_codes: Dict[str, Dict[str, Any]] = {}
+        self._index_orders: Dict[str, List[str]] = {}
+        self._index_positions: Dict[str, Dict[str, int]] = {}
+        self._index_voices: Dict[str, List[Dict[str, Any]]] = {}
+        self._index_lock = threading.RLock()
+        # 写锁：线程间用 RLock，进程间用锁文件上的 flock
+        self._write_mutex = threading.RLock()
+        self._write_depth = 0
+        self._lock_handle = None
+        self._lock_path = self.storage_path.with_name(self.storage_path.name + ".lock")
+        # 待恢复的快照来源：存储文件不存在时，第一次读取才下载并恢复
+        self._pending_snapshot: Optional[str] = None
+        self._snapshot_retry_at = 0.0
+        if snapshot_source is None:
+            snapshot_source = os.getenv("ACTIVATION_SNAPSHOT", "").strip() or None
+        self._ensure_storage(snapshot_source)
 
-    def _ensure_storage(self) -> None:
-        if not self.storage_path.exists():
-            # 尝试从环境变量加载默认激活码（用于 Render 等临时文件系统）
-            import os
-            default_codes_json = os.getenv("DEFAULT_ACTIVATION_CODES")
-            if default_codes_json:
-                try:
-                    default_data = json.loads(default_codes_json)
-                    if isinstance(default_data, dict) and "codes" in default_data:
-                        print(f"[激活码管理] 从环境变量加载了 {len(default_data['codes'])} 个默认激活码")
-                        self._save_data(default_data)
-                        return
-                except json.JSONDecodeError:
-                    print("[激活码管理] 警告：DEFAULT_ACTIVATION_CODES 环境变量格式错误")
-            self._save_data({"codes": {}})
+    @contextlib.contextmanager
+    def _write_lock(self) -> Iterator[None]:
+        with self._write_mutex:
+            self._write_depth += 1
+            try:
+                if self._write_depth == 1:
+                    if fcntl is not None:
+                        handle = open(self._lock_path, "a")
+                        fcntl.flock(handle, fcntl.LOCK_EX)
+                        self._lock_handle = handle
+                    # 写入前先恢复快照；恢复失败时拒绝写入，不能用空数据覆盖快照
+                    if self._pending_snapshot and not self._restore_snapshot():
+                        raise ActivationError("激活码快照尚未恢复，暂时无法写入，请稍后重试。")
+                yield
+            finally:
+                self._release_write_lock()
 
-    def _load_data(self) -> Dict[str, Any]:
+    @contextlib.contextmanager
+    def _try_write_lock(self) -> Iterator[bool]:
+        """非阻塞地获取写锁，返回是否获取成功"""
+        if not self._write_mutex.acquire(blocking=False):
+            yield False
+            return
+        try:
+            self._write_depth += 1
+            try:
+                acquired = True
+                if self._write_depth == 1 and fcntl is not None:
+                    handle = open(self._lock_path, "a")
+                    try:
+                        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except OSError:
+                        handle.close()
+                        acquired = False
+                    else:
+                        self._lock_handle = handle
+                yield acquired
+            finally:
+                self._release_write_lock()
+        finally:
+            self._write_mutex.release()
+
+    def _release_write_lock(self) -> None:
+        self._write_depth -= 1
+        if self._write_depth == 0 and self._lock_handle is not None:
+            self._lock_handle.close()
+            self._lock_handle = None
+
+    @_exclusive
+    def _ensure_storage(self, snapshot_source: Optional[str] = None) -> None:
+        if self.storage_path.exists():
+            return
+        if snapshot_source:
+            # 延迟到第一次读取时恢复，避免启动阶段下载和解析整个快照
+            self._pending_snapshot = snapshot_source
+            return
+        # 兼容旧方式：从环境变量加载默认激活码（建议改用 ACTIVATION_SNAPSHOT）
+        default_codes_json = os.getenv("DEFAULT_ACTIVATION_CODES")
+        if default_codes_json:
+            try:
+                default_data = json.loads(default_codes_json)
+                if isinstance(default_data, dict) and "codes" in default_data:
+                    logger.info("从环境变量加载了 %d 个默认激活码", len(default_data["codes"]))
+                    self._save_data(default_data)
+                    return
+            except json.JSONDecodeError:
+                logger.warning("DEFAULT_ACTIVATION_CODES 环境变量格式错误")
+        self._save_data({"codes": {}})
+
+    def _restore_snapshot(self) -> bool:
+        """持有写锁时调用：从待恢复的快照写入存储文件，返回快照是否已恢复。
+
+        失败时 SNAPSHOT_RETRY_SECONDS 秒后重试；期间读取按空数据处理，写入被拒绝。
+        """
+        if not self._pending_snapshot:
+            return True
+        if self.storage_path.exists():
+            # 其他进程已经恢复
+            self._pending_snapshot = None
+            return True
+        if time.monotonic() < self._snapshot_retry_at:
+            return False
+        from snapshot import SnapshotError, load_snapshot
+
+        try:
+            raw_records, raw_voices = load_snapshot(self._pending_snapshot)
+            records = [prepare_import_record(raw) for raw in raw_records]
+        except (SnapshotError, ActivationError) as exc:
+            logger.warning("快照恢复失败（%d 秒后重试）：%s", SNAPSHOT_RETRY_SECONDS, exc)
+            self._snapshot_retry_at = time.monotonic() + SNAPSHOT_RETRY_SECONDS
+            return False
+        codes = {record["code"]: record for record in records}
+        voices: Dict[str, List[Dict[str, Any]]] = {}
+        for voice in raw_voices:
+            code = str(voice.get("code") or "").upper()
+            if code in codes:
+                voices.setdefault(code, []).append(voice)
+        voices = self._normalise_voices(voices)
+        self._save_data({"codes": codes, "voices": voices})
+        logger.info("已从快照恢复 %d 个激活码、%d 个音色", len(records), sum(map(len, voices.values())))
+        self._pending_snapshot = None
+        return True
+
+    def _try_restore_snapshot(self) -> bool:
+        """读取时恢复快照。写锁被占用时不等待：持锁的写操作会先恢复快照，
+        而读取方可能已持有索引锁，阻塞等待写锁会与写操作互相等待。"""
+        with self._try_write_lock() as acquired:
+            return acquired and self._pending_snapshot is not None and self._restore_snapshot()
+
+    def _parse_storage(self) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, List[Dict[str, Any]]]]:
+        """返回 (激活码, 音色库)"""
         if not self.storage_path.exists():
-            return {"codes": {}}
+            return {}, {}
         try:
             raw_text = self.storage_path.read_text(encoding="utf-8")
             data = json.loads(raw_text) if raw_text.strip() else {"codes": {}}
         except (OSError, json.JSONDecodeError):
-            return {"codes": {}}
+            return {}, {}
         codes = data.get("codes")
         if not isinstance(codes, dict):
-            return {"codes": {}}
-        normalised = {
-            code.upper(): self._normalise_record(code.upper(), record)
-            for code, record in codes.items()
-        }
-        return {"codes": normalised}
+            return {}, {}
+        return (
+            {code.upper(): self._normalise_record(code.upper(), record) for code, record in codes.items()},
+            self._normalise_voices(data.get("voices")),
+        )
+
+    def _normalise_voices(self, raw: Any) -> Dict[str, List[Dict[str, Any]]]:
+        if not isinstance(raw, dict):
+            return {}
+        voices: Dict[str, List[Dict[str, Any]]] = {}
+        for code, entries in raw.items():
+            if not isinstance(entries, list):
+                continue
+            cleaned = [
+                {
+                    "uri": str(entry["uri"]),
+                    "name": str(entry.get("name") or ""),
+                    "audio_hash": str(entry.get("audio_hash") or ""),
+                    "created_at": self._safe_iso(entry.get("created_at")),
+                    "last_used_at": self._safe_iso(entry.get("last_used_at")),
+                }
+                for entry in entries
+                if isinstance(entry, dict) and entry.get("uri")
+            ]
+            if cleaned:
+                voices[code.upper()] = cleaned
+        return voices
+
+    def _storage_stamp(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            stat = self.storage_path.stat()
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _set_index(
+        self,
+        codes: Dict[str, Dict[str, Any]],
+        voices: Dict[str, List[Dict[str, Any]]],
+        stamp: Optional[Tuple[int, int, int]],
+    ) -> None:
+        order = sorted(codes, key=lambda code: (codes[code].get("created_at") or "", code), reverse=True)
+        with self._index_lock:
+            self._index_codes = codes
+            self._index_voices = voices
+            self._index_orders = {"created_desc": order}
+            self._index_positions = {}
+            self._index_stamp = stamp
+
+    def _read_index(self) -> Dict[str, Dict[str, Any]]:
+        """返回只读的激活码索引；调用方不得修改返回的记录。"""
+        with self._index_lock:
+            stamp = self._storage_stamp()
+            if stamp is None and self._pending_snapshot and self._try_restore_snapshot():
+                stamp = self._storage_stamp()
+            hit = stamp is not None and stamp == self._index_stamp
+            metrics.record_cache("json_index", hit)
+            if not hit:
+                codes, voices = self._parse_storage()
+                self._set_index(codes, voices, stamp)
+            return self._index_codes
+
+    def _sorted_index(self, sort: str) -> Tuple[Dict[str, Dict[str, Any]], List[str]]:
+        """返回同一版本的索引与指定排序的激活码列表。"""
+        if sort not in CODE_SORT_OPTIONS:
+            raise ActivationError(f"不支持的排序方式：{sort}")
+        with self._index_lock:
+            codes = self._read_index()
+            order = self._index_orders.get(sort)
+            if order is None:
+                if sort == "created_asc":
+                    order = list(reversed(self._index_orders["created_desc"]))
+                else:
+                    order = sorted(codes)
+                self._index_orders[sort] = order
+            return codes, order
+
+    def _position_in(self, sort: str, code: str) -> Optional[int]:
+        with self._index_lock:
+            _, order = self._sorted_index(sort)
+            positions = self._index_positions.get(sort)
+            if positions is None:
+                positions = {item: index for index, item in enumerate(order)}
+                self._index_positions[sort] = positions
+            return positions.get(code)
+
+    def _load_data(self) -> Dict[str, Any]:
+        with self._index_lock:
+            codes = self._read_index()
+            voices = self._index_voices
+            return {
+                "codes": {code: dict(record) for code, record in codes.items()},
+                "voices": {code: [dict(entry) for entry in entries] for code, entries in voices.items()},
+            }
 
     def _save_data(self, data: Dict[str, Any]) -> None:
         payload = {"codes": data.get("codes", {})}
-        self.storage_path.write_text(
+        voices = {code: entries for code, entries in (data.get("voices") or {}).items() if entries}
+        if voices:
+            payload["voices"] = voices
+        # 先写临时文件再原子替换，其他进程不会读到写了一半的文件
+        temp_path = self.storage_path.with_name(f"{self.storage_path.name}.{os.getpid()}.tmp")
+        temp_path.write_text(
             json.dumps(payload, ensure_ascii=False, indent=2, sort_keys=True),
             encoding="utf-8",
         )
+        os.replace(temp_path, self.storage_path)
+        codes = {
+            code.upper(): self._normalise_record(code.upper(), record)
+            for code, record in payload["codes"].items()
+        }
+        self._set_index(codes, self._normalise_voices(voices), self._storage_stamp())
+
+    def ping(self) -> Dict[str, Any]:
+        """健康检查：只检查存储文件是否可读写，不解析内容"""
+        target = self.storage_path if self.storage_path.exists() else self.storage_path.parent
+        return {"ok": os.access(target, os.R_OK | os.W_OK), "backend": "json"}
 
     def _normalise_record(self, code: str, record: Optional[Dict[str, Any]]) -> Dict[str, Any]:
         record = dict(record or {})
@@ -134,16 +466,103 @@ class ActivationManager:
         code = (code or "").upper()
         if not code:
             return None
-        data = self._load_data()
-        record = data["codes"].get(code)
+        record = self._read_index().get(code)
         if not record:
             return None
         return self._build_info(record)
 
-    def list_codes(self) -> List[Dict[str, Any]]:
-        data = self._load_data()
-        infos = [self._build_info(record) for record in data["codes"].values()]
-        return sorted(infos, key=lambda item: item.get("created_at") or "", reverse=True)
+    def _matches_filter(
+        self,
+        record: Dict[str, Any],
+        code_prefix: str,
+        note: str,
+        status: Optional[str],
+        today: date,
+    ) -> bool:
+        if code_prefix and not record["code"].startswith(code_prefix):
+            return False
+        if note and note not in (record.get("note") or "").lower():
+            return False
+        if status:
+            expiry_date = self._parse_expiry(record.get("expires_at"))
+            expired = expiry_date is not None and today > expiry_date
+            disabled = bool(record.get("disabled", False))
+            if status == "disabled" and not disabled:
+                return False
+            if status == "expired" and not expired:
+                return False
+            if status == "active" and (disabled or expired):
+                return False
+        return True
+
+    def _iter_filtered(
+        self,
+        code_prefix: str,
+        note: str,
+        status: Optional[str],
+        sort: str,
+        after: Optional[str] = None,
+    ):
+        if status and status not in CODE_STATUS_FILTERS:
+            raise ActivationError(f"不支持的状态筛选：{status}")
+        code_prefix = (code_prefix or "").strip().upper()
+        note = (note or "").strip().lower()
+        with self._index_lock:
+            codes, order = self._sorted_index(sort)
+            start = 0
+            if after:
+                position = self._position_in(sort, after.upper())
+                start = position + 1 if position is not None else 0
+        today = datetime.utcnow().date()
+        filtered = bool(code_prefix or note or status)
+        for code in order[start:] if start else order:
+            record = codes[code]
+            if filtered and not self._matches_filter(record, code_prefix, note, status, today):
+                continue
+            yield record
+
+    def list_codes(
+        self,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        *,
+        code_prefix: str = "",
+        note: str = "",
+        status: Optional[str] = None,
+        sort: str = "created_desc",
+        after: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """分页列出激活码。
+
+        ``after`` 为上一页最后一个激活码，传入后按游标翻页（忽略 ``offset``）。
+        """
+        offset = 0 if after else max(int(offset or 0), 0)
+        stop = None if limit is None else offset + max(int(limit), 0)
+        records = self._iter_filtered(code_prefix, note, status, sort, after)
+        return [self._build_info(record) for record in itertools.islice(records, offset, stop)]
+
+    def iter_codes(
+        self,
+        *,
+        code_prefix: str = "",
+        note: str = "",
+        status: Optional[str] = None,
+        sort: str = "created_desc",
+        batch_size: int = 1000,
+    ) -> Iterator[Dict[str, Any]]:
+        """遍历激活码（用于导出），基于当前索引快照，每次只构建 batch_size 条信息。"""
+        batch_size = max(int(batch_size), 1)
+        records = self._iter_filtered(code_prefix, note, status, sort)
+        while True:
+            batch = [self._build_info(record) for record in itertools.islice(records, batch_size)]
+            yield from batch
+            if len(batch) < batch_size:
+                return
+
+    def count_codes(self, *, code_prefix: str = "", note: str = "", status: Optional[str] = None) -> int:
+        if not (code_prefix or note or status):
+            return len(self._read_index())
+        return sum(1 for _ in self._iter_filtered(code_prefix, note, status, "created_desc"))
 
     def ensure_quota(self, code: str, required_characters: int, needs_new_voice: bool) -> Tuple[bool, str, Optional[Dict[str, Any]]]:
         info = self.get_code_info(code)
@@ -159,6 +578,7 @@ class ActivationManager:
             return False, "剩余字符不足，请缩短文本或联系管理员。", info
         return True, "", info
 
+    @_exclusive
     def record_usage(self, code: str, characters: int, created_voice: bool) -> Dict[str, Any]:
         code = (code or "").upper()
         data = self._load_data()
@@ -179,23 +599,57 @@ class ActivationManager:
         return self._build_info(data["codes"][code])
 
     def create_code(self, max_voices: int, max_characters: int, expires_at: Optional[str], note: str = "") -> Dict[str, Any]:
-        data = self._load_data()
-        new_code = self._generate_unique_code(set(data["codes"].keys()))
-        record = {
-            "max_voices": max(int(max_voices), 0),
-            "used_voices": 0,
-            "max_characters": max(int(max_characters), 0),
-            "used_characters": 0,
+        template = {
+            "max_voices": max_voices,
+            "max_characters": max_characters,
             "expires_at": expires_at,
-            "note": note or "",
-            "disabled": False,
-            "created_at": datetime.utcnow().isoformat(),
-            "last_used_at": None,
+            "note": note,
         }
-        data["codes"][new_code] = self._normalise_record(new_code, record)
+        return self.create_codes(1, template)[0]
+
+    @_exclusive
+    def create_codes(self, count: int, template: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """按同一模板批量生成激活码，只写一次存储文件。"""
+        count = validate_bulk_count(count)
+        template = template or {}
+        data = self._load_data()
+        created_at = datetime.utcnow().isoformat()
+        new_codes = generate_unique_codes(count, data["codes"].keys())
+        for new_code in new_codes:
+            record = {
+                "max_voices": max(int(template.get("max_voices", 0) or 0), 0),
+                "used_voices": 0,
+                "max_characters": max(int(template.get("max_characters", 0) or 0), 0),
+                "used_characters": 0,
+                "expires_at": template.get("expires_at"),
+                "note": template.get("note") or "",
+                "disabled": False,
+                "created_at": created_at,
+                "last_used_at": None,
+            }
+            data["codes"][new_code] = self._normalise_record(new_code, record)
         self._save_data(data)
-        return self._build_info(data["codes"][new_code])
+        return [self._build_info(data["codes"][new_code]) for new_code in new_codes]
+
+    @_exclusive
+    def import_codes(self, records: Iterable[Dict[str, Any]]) -> Tuple[List[str], List[str]]:
+        """批量导入指定激活码，已存在的跳过。返回 (已导入, 已跳过)。"""
+        prepared = [prepare_import_record(raw) for raw in records]
+        data = self._load_data()
+        imported: List[str] = []
+        skipped: List[str] = []
+        for record in prepared:
+            code = record["code"]
+            if code in data["codes"]:
+                skipped.append(code)
+                continue
+            data["codes"][code] = self._normalise_record(code, record)
+            imported.append(code)
+        if imported:
+            self._save_data(data)
+        return imported, skipped
 
+    @_exclusive
     def update_code(
         self,
         code: str,
@@ -233,9 +687,110 @@ class ActivationManager:
         self._save_data(data)
         return self._build_info(data["codes"][code])
 
-    def _generate_unique_code(self, existing: set[str], length: int = 16) -> str:
-        alphabet = string.ascii_uppercase + string.digits
-        while True:
-            candidate = "".join(secrets.choice(alphabet) for _ in range(length))
-            if candidate not in existing:
-                return candidate
\ No newline at end of file
+    def list_voices(self, code: str, limit: int = MAX_VOICES_PER_CODE) -> List[Dict[str, Any]]:
+        """激活码的音色库，最近使用的在前"""
+        code = (code or "").upper()
+        with self._index_lock:
+            self._read_index()
+            entries = [dict(entry) for entry in self._index_voices.get(code, [])]
+        entries.sort(key=lambda entry: entry["last_used_at"] or entry["created_at"] or "", reverse=True)
+        return entries[:limit]
+
+    def find_voice(self, code: str, audio_hash: str) -> Optional[Dict[str, Any]]:
+        """按参考音频哈希查找已上传过的音色"""
+        if not audio_hash:
+            return None
+        return next((entry for entry in self.list_voices(code) if entry["audio_hash"] == audio_hash), None)
+
+    @_exclusive
+    def save_voice(self, code: str, uri: str, name: str = "", audio_hash: str = "") -> Dict[str, Any]:
+        """新增或更新音色库中的音色（按 URI 去重）"""
+        code = (code or "").upper()
+        data = self._load_data()
+        if code not in data["codes"]:
+            raise ActivationError("激活码不存在。")
+        now = datetime.utcnow().isoformat()
+        entries = data["voices"].setdefault(code, [])
+        entry = next((item for item in entries if item["uri"] == uri), None)
+        if entry is None:
+            entry = {"uri": uri, "name": "", "audio_hash": "", "created_at": now}
+            entries.append(entry)
+        entry["name"] = name or entry["name"]
+        entry["audio_hash"] = audio_hash or entry["audio_hash"]
+        entry["last_used_at"] = now
+        entries.sort(key=lambda item: item["last_used_at"] or item["created_at"] or "", reverse=True)
+        del entries[MAX_VOICES_PER_CODE:]
+        self._save_data(data)
+        return dict(entry)
+
+    @_exclusive
+    def touch_voice(self, code: str, uri: str) -> None:
+        """更新音色的最近使用时间；音色不在库中时忽略"""
+        code = (code or "").upper()
+        data = self._load_data()
+        entry = next((item for item in data["voices"].get(code, []) if item["uri"] == uri), None)
+        if entry is None:
+            return
+        entry["last_used_at"] = datetime.utcnow().isoformat()
+        self._save_data(data)
+
+    @_exclusive
+    def delete_voice(self, code: str, uri: str) -> bool:
+        code = (code or "").upper()
+        data = self._load_data()
+        entries = data["voices"].get(code, [])
+        remaining = [item for item in entries if item["uri"] != uri]
+        if len(remaining) == len(entries):
+            return False
+        data["voices"][code] = remaining
+        self._save_data(data)
+        return True
+
+    def iter_voices(self) -> Iterator[Dict[str, Any]]:
+        """遍历所有激活码的音色库条目（用于快照）"""
+        with self._index_lock:
+            self._read_index()
+            voices = self._index_voices
+        for code in sorted(voices):
+            for entry in voices[code]:
+                yield {"code": code, **entry}
+
+    @_exclusive
+    def import_voices(self, entries: Iterable[Dict[str, Any]]) -> int:
+        """导入音色库条目（用于快照恢复）；激活码不存在或 URI 已在库中的跳过，返回导入数"""
+        data = self._load_data()
+        grouped: Dict[str, List[Dict[str, Any]]] = {}
+        for entry in entries:
+            grouped.setdefault(str(entry.get("code") or "").upper(), []).append(entry)
+        imported = 0
+        for code, new_entries in self._normalise_voices(grouped).items():
+            if code not in data["codes"]:
+                continue
+            existing = data["voices"].setdefault(code, [])
+            known = {item["uri"] for item in existing}
+            for entry in new_entries:
+                if entry["uri"] not in known and len(existing) < MAX_VOICES_PER_CODE:
+                    existing.append(entry)
+                    known.add(entry["uri"])
+                    imported += 1
+        if imported:
+            self._save_data(data)
+        return imported
+
+    def _generate_unique_code(self, existing: set[str], length: int = CODE_LENGTH) -> str:
+        return generate_unique_codes(1, existing, length)[0]
+
+
+def create_activation_manager(storage_path: Path, database_url: Optional[str] = None):
+    """创建激活码管理器，配置了 DATABASE_URL 时优先使用 PostgreSQL。"""
+    database_url = database_url if database_url is not None else os.getenv("DATABASE_URL")
+    if database_url:
+        try:
+            from db_activation_manager import DatabaseActivationManager
+            logger.info("检测到 DATABASE_URL，使用 PostgreSQL 持久化存储")
+            return DatabaseActivationManager(database_url)
+        except Exception as e:
+            logger.error("PostgreSQL 初始化失败，降级使用 JSON 文件存储：%s", e)
+
+    logger.info("使用 JSON 文件存储（本地开发模式）")
+    return ActivationManager(Path(storage_path))
\ No newline at end of file
@@ -1,42 +1,76 @@
 ﻿from __future__ import annotations
 
+import asyncio
 import base64
 import datetime
+import functools
+import hashlib
+import json
+import logging
 import mimetypes
 import os
+import secrets
 import tempfile
+import threading
+import time
+from dataclasses import dataclass
 from typing import Any, Dict, List, Optional, Tuple
 
 import gradio as gr
 import requests
-from fastapi import FastAPI
-from fastapi.responses import RedirectResponse
+from fastapi import FastAPI, File, Form, Header, HTTPException, UploadFile, WebSocket, WebSocketDisconnect
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, RedirectResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
 import uvicorn
 
 import config
-from activation_manager import ActivationError, ActivationManager
+from logging_setup import SAMPLED, configure_logging
+from activation_manager import ActivationError, create_activation_manager
+from audio_postprocess import POSTPROCESS_POOL, PostprocessOptions
+from audio_validation import ValidationError, validate_reference_audio, validate_text
+from audio_preprocess import (
+    EncodedAudioCache,
+    file_digest,
+    preprocess_reference_audio,
+    preprocess_settings_key,
+)
+from async_activation_manager import create_async_activation_manager
+from export_codes import EXPORT_FORMATS, EXPORT_MEDIA_TYPES, iter_export
+import metrics
+import tracing
+from health import HealthMonitor, check_upstream
+from latency_model import LATENCY_MODEL, audio_seconds
+from lazy import LazyASGIApp, LazyProxy, is_initialized
+from runtime_info import RuntimeInfo
+from shared_state import check_rate_limit, create_shared_store
+from streaming_upload import MultipartStream, ProgressCallback
+from text_segmenter import TextSegmenter
+from manage_codes import load_code_records
+
+configure_logging()
+logger = logging.getLogger("app")
+
 
 # 自动检测并选择存储后端
 def _create_activation_manager():
     """创建激活码管理器，优先使用 PostgreSQL"""
-    database_url = os.getenv("DATABASE_URL")
-
-    if database_url:
-        try:
-            from db_activation_manager import DatabaseActivationManager
-            print("[激活码管理] 检测到 DATABASE_URL，使用 PostgreSQL 持久化存储")
-            return DatabaseActivationManager(database_url)
-        except Exception as e:
-            print(f"[激活码管理] PostgreSQL 初始化失败: {e}")
-            print("[激活码管理] 降级使用 JSON 文件存储")
-
     from pathlib import Path
-    print("[激活码管理] 使用 JSON 文件存储（本地开发模式）")
-    return ActivationManager(Path("activation_codes.json"))
+    return create_activation_manager(Path("activation_codes.json"))
 
 
 REQUEST_TIMEOUT = (10, 120)
 MAX_REFERENCE_FILE_SIZE_MB = 10
+ADMIN_MAX_BULK_CODES = 10000
+# 管理后台挂载在懒加载的子应用下，子应用的启动钩子不会执行，Gradio 队列也就不会启动；
+# 后台事件因此不走队列，并发由 ADMIN_SLOTS 限制，不与前台的声音克隆争抢工作线程
+ADMIN_EVENT_OPTIONS = {"queue": False}
+ADMIN_SLOTS = threading.BoundedSemaphore(config.ADMIN_CONCURRENCY)
+ADMIN_SLOT_TIMEOUT = 30
+# 界面、REST 接口与流式合成共用的上游并发名额，同时进行的合成总数不超过 CLONE_CONCURRENCY
+CLONE_SLOTS = threading.BoundedSemaphore(config.CLONE_CONCURRENCY)
+# 情感参考音频的 base64 编码结果，按文件内容哈希缓存
+EMOTION_AUDIO_CACHE = EncodedAudioCache("emotion_audio", config.EMOTION_AUDIO_CACHE_MB * 1024 * 1024)
 
 CUSTOM_CSS = """
 footer {display: none !important;}
@@ -46,7 +80,25 @@ button[data-testid="view-api"] {display: none !important;}
 div[data-testid="block-info"] {display: none !important;}
 """
 
-ACTIVATION_MANAGER = _create_activation_manager()
+RUNTIME_INFO = RuntimeInfo()
+# 存储在第一次使用时才初始化（通常是启动后健康检查线程的第一次检查），导入 app 不连接数据库
+ACTIVATION_MANAGER = LazyProxy(
+    lambda: metrics.InstrumentedManager(_create_activation_manager()), "activation_manager"
+)
+# FastAPI async 路由使用的异步接口，避免在事件循环中执行阻塞的存储调用
+ASYNC_ACTIVATION_MANAGER = LazyProxy(
+    lambda: create_async_activation_manager(ACTIVATION_MANAGER), "async_activation_manager"
+)
+# 多 worker 共享的状态：合成结果缓存、限流计数
+SHARED_STATE = LazyProxy(lambda: create_shared_store(ACTIVATION_MANAGER), "shared_state")
+# 存储不可用时服务不可用；上游 API 异常只标记为降级
+HEALTH_MONITOR = HealthMonitor(
+    {
+        "storage": lambda: ACTIVATION_MANAGER.ping(),
+        "upstream": lambda: check_upstream(config.API_URL),
+    },
+    critical=("storage",),
+)
 
 ADVANCED_PRESETS = {
     "魔搭示例": {
@@ -168,24 +220,50 @@ def _call_siliconflow(payload: Dict[str, Any]) -> Tuple[Optional[str], str]:
 
     response_format = payload.get("response_format", "mp3") or "mp3"
 
+    cache_key = ""
+    # 只缓存关闭采样（do_sample=False）的请求：采样时同样的参数每次结果不同，缓存会把一次结果反复返回。
+    # 命中缓存与正常合成一样扣除字符额度，用户拿到的音频与重新合成相同
+    if config.RESULT_CACHE_TTL > 0 and not payload.get("do_sample"):
+        cache_key = "result:" + hashlib.sha256(
+            json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")
+        ).hexdigest()
+        cached = SHARED_STATE.get(cache_key)
+        metrics.record_cache("result", cached is not None)
+        if cached is not None:
+            return _save_audio(base64.b64decode(cached), response_format), "生成成功（缓存）。"
+
+    started = time.perf_counter()
     try:
-        response = requests.post(
-            config.API_URL,
-            headers=headers,
-            json=payload,
-            timeout=REQUEST_TIMEOUT,
-        )
+        with tracing.span("synthesis", model=payload.get("model")), \
+                metrics.UPSTREAM_SECONDS.time(endpoint="speech"):
+            response = requests.post(
+                config.API_URL,
+                headers=headers,
+                json=payload,
+                timeout=REQUEST_TIMEOUT,
+            )
     except requests.exceptions.Timeout:
+        metrics.record_upstream_status("speech", "timeout")
         return None, "请求超时，请稍后重试。"
     except requests.exceptions.RequestException as exc:
+        metrics.record_upstream_status("speech", "error")
         return None, f"请求失败：{exc}"
 
+    metrics.record_upstream_status("speech", response.status_code)
     if response.status_code == 200:
-        file_path = _save_audio(response.content, response_format)
-        print(
-            "[SiliconFlow] 请求成功",
-            f"模型={payload.get('model')}",
-            f"音频字节数={len(response.content)}",
+        metrics.AUDIO_BYTES.observe(len(response.content), direction="synthesized")
+        LATENCY_MODEL.record(
+            len(payload.get("input") or ""),
+            time.perf_counter() - started,
+            audio_seconds(response.content, response_format),
+        )
+        with tracing.span("save", bytes=len(response.content)):
+            file_path = _save_audio(response.content, response_format)
+        if cache_key and len(response.content) <= config.RESULT_CACHE_MAX_BYTES:
+            SHARED_STATE.set(cache_key, base64.b64encode(response.content).decode("ascii"), ttl=config.RESULT_CACHE_TTL)
+        logger.info(
+            "SiliconFlow 请求成功",
+            extra={**SAMPLED, "model": payload.get("model"), "audio_bytes": len(response.content)},
         )
         return file_path, "生成成功。"
 
@@ -194,10 +272,9 @@ def _call_siliconflow(payload: Dict[str, Any]) -> Tuple[Optional[str], str]:
     except ValueError:
         error_detail = response.text[:500]
 
-    print(
-        "[SiliconFlow] 请求失败",
-        f"状态码={response.status_code}",
-        f"详情={error_detail}",
+    logger.warning(
+        "SiliconFlow 请求失败",
+        extra={"status_code": response.status_code, "detail": error_detail},
     )
     return None, f"生成失败（HTTP {response.status_code}）：{error_detail}"
 
@@ -217,16 +294,41 @@ def _upload_reference_audio(
     api_key: str,
     custom_name: str,
     sample_text: str,
+    progress: Optional[ProgressCallback] = None,
 ) -> Tuple[Optional[str], Optional[str]]:
     if not os.path.exists(audio_path):
         return None, "未找到参考音频文件。"
 
+    if os.path.getsize(audio_path) / (1024 * 1024) > config.MAX_REFERENCE_SOURCE_MB:
+        return None, f"参考音频不能超过 {config.MAX_REFERENCE_SOURCE_MB} MB。"
+
+    # 去静音、截断、单声道重采样后再上传；无法处理时上传原文件
+    with tracing.span("preprocess"):
+        processed = preprocess_reference_audio(audio_path)
+    try:
+        if processed is not None:
+            return _post_reference_audio(processed.path, processed.mime_type, api_key, custom_name, sample_text, progress)
+        return _post_reference_audio(audio_path, None, api_key, custom_name, sample_text, progress)
+    finally:
+        if processed is not None:
+            processed.cleanup()
+
+
+def _post_reference_audio(
+    audio_path: str,
+    mime_type: Optional[str],
+    api_key: str,
+    custom_name: str,
+    sample_text: str,
+    progress: Optional[ProgressCallback],
+) -> Tuple[Optional[str], Optional[str]]:
     file_size_mb = os.path.getsize(audio_path) / (1024 * 1024)
     if file_size_mb > MAX_REFERENCE_FILE_SIZE_MB:
-        return None, f"参考音频不能超过 {MAX_REFERENCE_FILE_SIZE_MB} MB。"
+        return None, f"参考音频不能超过 {MAX_REFERENCE_FILE_SIZE_MB} MB，请截取较短的片段后重试。"
 
     headers = {"Authorization": f"Bearer {api_key}"}
-    mime_type, _ = mimetypes.guess_type(audio_path)
+    if not mime_type:
+        mime_type, _ = mimetypes.guess_type(audio_path)
     mime_type = mime_type or "application/octet-stream"
 
     data = {
@@ -238,22 +340,27 @@ def _upload_reference_audio(
         data["text"] = sample_text[:200]
 
     try:
-        with open(audio_path, "rb") as audio_file:
-            files = {"file": (os.path.basename(audio_path), audio_file, mime_type)}
-            response = requests.post(
-                config.VOICE_UPLOAD_URL,
-                headers=headers,
-                data=data,
-                files=files,
-                timeout=REQUEST_TIMEOUT,
-            )
+        # 边读边发，不在内存中拼出完整的 multipart 请求体
+        with MultipartStream(data, "file", audio_path, mime_type, progress=progress) as body:
+            headers["Content-Type"] = body.content_type
+            with metrics.UPSTREAM_SECONDS.time(endpoint="upload"):
+                response = requests.post(
+                    config.VOICE_UPLOAD_URL,
+                    headers=headers,
+                    data=body,
+                    timeout=REQUEST_TIMEOUT,
+                )
     except requests.exceptions.Timeout:
+        metrics.record_upstream_status("upload", "timeout")
         return None, "上传参考音频超时，请稍后重试。"
     except requests.exceptions.RequestException as exc:
+        metrics.record_upstream_status("upload", "error")
         return None, f"上传参考音频失败：{exc}"
     except OSError as exc:
         return None, f"读取音频文件失败：{exc}"
 
+    metrics.record_upstream_status("upload", response.status_code)
+    metrics.AUDIO_BYTES.observe(os.path.getsize(audio_path), direction="uploaded")
     if response.status_code != 200:
         try:
             detail = response.json()
@@ -277,16 +384,60 @@ def _encode_audio_for_payload(audio_path: str, label: str) -> Tuple[Optional[str
     if not os.path.exists(audio_path):
         return None, f"{label}未找到。"
 
-    file_size_mb = os.path.getsize(audio_path) / (1024 * 1024)
-    if file_size_mb > MAX_REFERENCE_FILE_SIZE_MB:
-        return None, f"{label}不能超过 {MAX_REFERENCE_FILE_SIZE_MB} MB。"
+    if os.path.getsize(audio_path) / (1024 * 1024) > config.MAX_REFERENCE_SOURCE_MB:
+        return None, f"{label}不能超过 {config.MAX_REFERENCE_SOURCE_MB} MB。"
 
     try:
-        with open(audio_path, "rb") as audio_file:
+        cache_key = f"{file_digest(audio_path)}:{preprocess_settings_key()}"
+    except OSError as exc:
+        return None, f"读取{label}失败：{exc}"
+    cached = EMOTION_AUDIO_CACHE.get(cache_key)
+    if cached is not None:
+        return cached, None
+
+    # 与参考音频相同的预处理，缩小请求体
+    with tracing.span("preprocess"):
+        processed = preprocess_reference_audio(audio_path)
+    source_path = processed.path if processed is not None else audio_path
+    try:
+        file_size_mb = os.path.getsize(source_path) / (1024 * 1024)
+        if file_size_mb > MAX_REFERENCE_FILE_SIZE_MB:
+            return None, f"{label}不能超过 {MAX_REFERENCE_FILE_SIZE_MB} MB，请截取较短的片段后重试。"
+        with open(source_path, "rb") as audio_file:
             encoded = base64.b64encode(audio_file.read()).decode("utf-8")
-            return encoded, None
     except OSError as exc:
         return None, f"读取{label}失败：{exc}"
+    finally:
+        if processed is not None:
+            processed.cleanup()
+
+    EMOTION_AUDIO_CACHE.put(cache_key, encoded)
+    return encoded, None
+
+
+def handle_reexport(
+    audio_path: Optional[str],
+    response_format: str,
+    volume: float,
+    speed: float,
+    normalize: bool,
+) -> Tuple[Optional[str], str]:
+    """在本地对已生成的结果转码或调整音量、语速，不请求上游"""
+    if not audio_path or not os.path.exists(audio_path):
+        return None, "请先生成音频。"
+    options = PostprocessOptions(
+        response_format=response_format or "mp3",
+        volume=float(volume),
+        speed=float(speed),
+        normalize=bool(normalize),
+    )
+    try:
+        with tracing.span("postprocess", format=options.response_format):
+            exported = POSTPROCESS_POOL.export(audio_path, options)
+    except Exception as exc:
+        logger.warning("重新导出失败：%s", exc)
+        return None, f"❌ 导出失败：{exc}"
+    return exported, f"✅ 已导出为 {options.response_format.upper()}（未消耗额度）。"
 
 
 def update_emotion_mode_controls(mode: str):
@@ -512,87 +663,235 @@ def handle_activation_refresh(
     summary = format_activation_summary(fresh, reveal_full)
     return fresh, summary
 
-def build_codes_table_rows() -> List[List[str]]:
-    rows: List[List[str]] = []
-    for info in ACTIVATION_MANAGER.list_codes():
-        if info.get("max_voices", 0) == 0:
-            voice_text = "无限"
-        else:
-            voice_text = f"{info.get('available_voices', 0)} / {info.get('max_voices', 0)}"
-        if info.get("max_characters", 0) == 0:
-            char_text = "无限"
-        else:
-            char_text = f"{info.get('remaining_characters', 0)} / {info.get('max_characters', 0)}"
-        expires = info.get("expires_at") or "长期有效"
-        status_flags: List[str] = []
-        if info.get("disabled"):
-            status_flags.append("停用")
-        if info.get("expired"):
-            status_flags.append("过期")
-        if not status_flags:
-            status_flags.append("正常")
-        rows.append(
-            [
-                info.get("code", ""),
-                voice_text,
-                char_text,
-                expires,
-                "、".join(status_flags),
-                info.get("note") or "-",
-                _format_datetime(info.get("created_at")),
-                _format_datetime(info.get("last_used_at")),
-            ]
-        )
-    return rows
+def _voice_choice_label(voice: Dict[str, Any]) -> str:
+    name = voice.get("name") or voice["uri"].rsplit(":", 1)[-1][:12]
+    return f"{name}（{_format_datetime(voice.get('created_at'))}）"
+
 
+def refresh_voice_library(activation_state: Optional[Dict[str, Any]], selected_uri: str):
+    """刷新音色库下拉框；选中项不在库中时清空选择（不自动选中，避免新上传的参考音频被忽略）"""
+    if not activation_state or not activation_state.get("code"):
+        return gr.update(choices=[], value=None), ""
+    voices = ACTIVATION_MANAGER.list_voices(activation_state["code"])
+    choices = [(_voice_choice_label(voice), voice["uri"]) for voice in voices]
+    uris = {voice["uri"] for voice in voices}
+    value = selected_uri if selected_uri in uris else None
+    return gr.update(choices=choices, value=value), value or ""
+
+
+def select_library_voice(uri: Optional[str]):
+    """选中音色库中的音色时同时勾选复用"""
+    return uri or "", uri or "", gr.update(value=bool(uri))
 
-def handle_admin_login(password: str, current_state: bool):
+
+CODES_PAGE_SIZE_OPTIONS = [20, 50, 100, 200]
+DEFAULT_CODES_PAGE_SIZE = 50
+CHECK_CODES_LIMIT = 100
+
+CODE_STATUS_OPTIONS = {
+    "全部": None,
+    "正常": "active",
+    "停用": "disabled",
+    "过期": "expired",
+}
+
+
+def default_codes_query() -> Dict[str, Any]:
+    return {
+        "page": 1,
+        "page_size": DEFAULT_CODES_PAGE_SIZE,
+        "code_prefix": "",
+        "note": "",
+        "status": "全部",
+    }
+
+
+def _format_code_row(info: Dict[str, Any]) -> List[str]:
+    if info.get("max_voices", 0) == 0:
+        voice_text = "无限"
+    else:
+        voice_text = f"{info.get('available_voices', 0)} / {info.get('max_voices', 0)}"
+    if info.get("max_characters", 0) == 0:
+        char_text = "无限"
+    else:
+        char_text = f"{info.get('remaining_characters', 0)} / {info.get('max_characters', 0)}"
+    expires = info.get("expires_at") or "长期有效"
+    status_flags: List[str] = []
+    if info.get("disabled"):
+        status_flags.append("停用")
+    if info.get("expired"):
+        status_flags.append("过期")
+    if not status_flags:
+        status_flags.append("正常")
+    return [
+        info.get("code", ""),
+        voice_text,
+        char_text,
+        expires,
+        "、".join(status_flags),
+        info.get("note") or "-",
+        _format_datetime(info.get("created_at")),
+        _format_datetime(info.get("last_used_at")),
+    ]
+
+
+def build_codes_table_rows(
+    query: Optional[Dict[str, Any]] = None,
+) -> Tuple[List[List[str]], Dict[str, Any], str]:
+    """读取一页激活码，返回表格行、校正后的查询条件与分页说明。"""
+    query = {**default_codes_query(), **(query or {})}
+    filters = {
+        "code_prefix": query["code_prefix"],
+        "note": query["note"],
+        "status": CODE_STATUS_OPTIONS.get(query["status"]),
+    }
+    page_size = int(query["page_size"]) if int(query["page_size"] or 0) > 0 else DEFAULT_CODES_PAGE_SIZE
+    total = ACTIVATION_MANAGER.count_codes(**filters)
+    page_count = max((total + page_size - 1) // page_size, 1)
+    page = min(max(int(query["page"] or 1), 1), page_count)
+    infos = ACTIVATION_MANAGER.list_codes(offset=(page - 1) * page_size, limit=page_size, **filters)
+    query.update(page=page, page_size=page_size)
+    page_info = f"第 {page} / {page_count} 页，共 {total} 个激活码"
+    return [_format_code_row(info) for info in infos], query, page_info
+
+
+def _codes_table_outputs(query: Optional[Dict[str, Any]]):
+    rows, query, page_info = build_codes_table_rows(query)
+    return gr.update(value=rows), page_info, query
+
+
+def _admin_action(func):
+    """后台事件占用一个 ADMIN_SLOTS 名额，等待超时时提示稍后重试"""
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        if not ADMIN_SLOTS.acquire(timeout=ADMIN_SLOT_TIMEOUT):
+            raise gr.Error("后台正在处理其他操作，请稍后重试。")
+        try:
+            return func(*args, **kwargs)
+        finally:
+            ADMIN_SLOTS.release()
+    return wrapper
+
+
+@_admin_action
+def handle_admin_login(password: str, current_state: bool, codes_query: Optional[Dict[str, Any]]):
     password = (password or "").strip()
     if not password:
-        return current_state, "⚠️ 请输入后台口令。", gr.update(), gr.update(value=[])
+        return current_state, "⚠️ 请输入后台口令。", gr.update(), gr.update(), gr.update(), codes_query
     if password != config.get_admin_password():
-        return False, "❌ 后台口令错误。", gr.update(visible=False), gr.update(value=[])
-    # 登录成功时刷新激活码列表
-    rows = build_codes_table_rows()
-    print(f"[后台登录] 读取到 {len(rows)} 个激活码，准备更新表格")
-    if rows:
-        print(f"[后台登录] 第一个激活码: {rows[0][0]}")
-    return True, "✅ 后台登录成功。", gr.update(visible=True), gr.update(value=rows)
+        return False, "❌ 后台口令错误。", gr.update(visible=False), gr.update(value=[]), "", codes_query
+    # 登录成功时刷新激活码列表（仅第一页）
+    table_update, page_info, codes_query = _codes_table_outputs(codes_query)
+    logger.info("后台登录成功：%s", page_info)
+    return True, "✅ 后台登录成功。", gr.update(visible=True), table_update, page_info, codes_query
+
+
+def _save_codes_file(codes: List[str]) -> str:
+    prefix = datetime.datetime.now().strftime("codes-%Y%m%d-%H%M%S-")
+    with tempfile.NamedTemporaryFile(
+        "w", delete=False, prefix=prefix, suffix=".txt", encoding="utf-8"
+    ) as tmp_file:
+        tmp_file.write("\n".join(codes) + "\n")
+        return tmp_file.name
 
 
+@_admin_action
 def handle_admin_generate(
     admin_active: bool,
+    count: Optional[float],
     voice_limit: Optional[float],
     char_limit: Optional[float],
     expires_at: str,
     note: str,
+    codes_query: Optional[Dict[str, Any]],
 ):
     if not admin_active:
-        return "", "⚠️ 请先完成后台登录。", gr.update(value=build_codes_table_rows())
+        return "", None, "⚠️ 请先完成后台登录。", gr.update(), gr.update(), codes_query
     try:
+        count_int = int(count) if count is not None else 1
+        if count_int > ADMIN_MAX_BULK_CODES:
+            raise ValueError(f"后台单次最多生成 {ADMIN_MAX_BULK_CODES} 个激活码")
         voice_limit_int = int(voice_limit) if voice_limit is not None else 0
         char_limit_int = int(char_limit) if char_limit is not None else 0
         expires_str = (expires_at or "").strip() or None
-        info = ACTIVATION_MANAGER.create_code(
-            max_voices=max(voice_limit_int, 0),
-            max_characters=max(char_limit_int, 0),
-            expires_at=expires_str,
-            note=note or "",
+        infos = ACTIVATION_MANAGER.create_codes(
+            count_int,
+            {
+                "max_voices": max(voice_limit_int, 0),
+                "max_characters": max(char_limit_int, 0),
+                "expires_at": expires_str,
+                "note": note or "",
+            },
         )
     except (ActivationError, ValueError) as exc:
-        return "", f"❌ 生成失败：{exc}", gr.update(value=build_codes_table_rows())
-    rows = build_codes_table_rows()
-    message = f"✅ 已生成激活码：{info['code']}"
-    return info["code"], message, gr.update(value=rows)
+        return "", None, f"❌ 生成失败：{exc}", gr.update(), gr.update(), codes_query
+    codes = [info["code"] for info in infos]
+    if len(codes) == 1:
+        message = f"✅ 已生成激活码：{codes[0]}"
+        codes_file = None
+    else:
+        message = f"✅ 已批量生成 {len(codes)} 个激活码，可下载文件分发。"
+        codes_file = _save_codes_file(codes)
+    return ("\n".join(codes), codes_file, message, *_codes_table_outputs(codes_query))
+
+
+@_admin_action
+def handle_admin_import(
+    admin_active: bool,
+    file_path: Optional[str],
+    codes_query: Optional[Dict[str, Any]],
+):
+    if not admin_active:
+        return "⚠️ 请先完成后台登录。", gr.update(), gr.update(), codes_query
+    if not file_path:
+        return "⚠️ 请先上传 CSV / JSON / JSONL 文件。", gr.update(), gr.update(), codes_query
+    try:
+        imported, skipped = ACTIVATION_MANAGER.import_codes(load_code_records(file_path))
+    except (ActivationError, OSError, ValueError) as exc:
+        return f"❌ 导入失败：{exc}", gr.update(), gr.update(), codes_query
+    message = f"✅ 导入完成：新增 {len(imported)} 个，跳过 {len(skipped)} 个（已存在）。"
+    return (message, *_codes_table_outputs(codes_query))
+
+
+@_admin_action
+def handle_admin_refresh(admin_active: bool, codes_query: Optional[Dict[str, Any]]):
+    if not admin_active:
+        return gr.update(), gr.update(), codes_query, "⚠️ 请先完成后台登录。"
+    return (*_codes_table_outputs(codes_query), "✅ 已刷新激活码列表。")
+
+
+@_admin_action
+def handle_admin_search(
+    admin_active: bool,
+    code_prefix: str,
+    note: str,
+    status: str,
+    page_size: Optional[float],
+    codes_query: Optional[Dict[str, Any]],
+):
+    if not admin_active:
+        return gr.update(), gr.update(), codes_query, "⚠️ 请先完成后台登录。"
+    query = {
+        **(codes_query or default_codes_query()),
+        "page": 1,
+        "page_size": int(page_size or DEFAULT_CODES_PAGE_SIZE),
+        "code_prefix": (code_prefix or "").strip(),
+        "note": (note or "").strip(),
+        "status": status if status in CODE_STATUS_OPTIONS else "全部",
+    }
+    return (*_codes_table_outputs(query), "✅ 已更新筛选条件。")
 
 
-def handle_admin_refresh(admin_active: bool):
-    rows = build_codes_table_rows()
+@_admin_action
+def handle_admin_page(admin_active: bool, codes_query: Optional[Dict[str, Any]], step: int):
     if not admin_active:
-        return gr.update(value=rows), "⚠️ 请先完成后台登录。"
-    return gr.update(value=rows), "✅ 已刷新激活码列表。"
+        return gr.update(), gr.update(), codes_query, "⚠️ 请先完成后台登录。"
+    query = dict(codes_query or default_codes_query())
+    query["page"] = int(query.get("page") or 1) + int(step)
+    return (*_codes_table_outputs(query), "")
 
 
+@_admin_action
 def handle_admin_update(
     admin_active: bool,
     code: str,
@@ -600,13 +899,13 @@ def handle_admin_update(
     char_limit: Optional[float],
     expires_at: str,
     note: str,
+    codes_query: Optional[Dict[str, Any]],
 ):
-    rows = build_codes_table_rows()
     if not admin_active:
-        return "⚠️ 请先完成后台登录。", gr.update(value=rows)
+        return "⚠️ 请先完成后台登录。", gr.update(), gr.update(), codes_query
     code = (code or "").strip().upper()
     if not code:
-        return "⚠️ 请填写要更新的激活码。", gr.update(value=rows)
+        return "⚠️ 请填写要更新的激活码。", gr.update(), gr.update(), codes_query
     kwargs: Dict[str, Any] = {}
     if voice_limit is not None:
         kwargs["max_voices"] = max(int(voice_limit), 0)
@@ -620,30 +919,50 @@ def handle_admin_update(
     try:
         ACTIVATION_MANAGER.update_code(code, **kwargs)
     except (ActivationError, ValueError) as exc:
-        return f"❌ 更新失败：{exc}", gr.update(value=build_codes_table_rows())
-    return f"✅ 激活码 {code} 已更新。", gr.update(value=build_codes_table_rows())
+        return f"❌ 更新失败：{exc}", gr.update(), gr.update(), codes_query
+    return (f"✅ 激活码 {code} 已更新。", *_codes_table_outputs(codes_query))
 
 
-def handle_admin_toggle(admin_active: bool, code: str, disabled: bool):
-    rows = build_codes_table_rows()
+@_admin_action
+def handle_admin_toggle(
+    admin_active: bool,
+    code: str,
+    disabled: bool,
+    codes_query: Optional[Dict[str, Any]],
+):
     if not admin_active:
-        return "⚠️ 请先完成后台登录。", gr.update(value=rows)
+        return "⚠️ 请先完成后台登录。", gr.update(), gr.update(), codes_query
     code = (code or "").strip().upper()
     if not code:
-        return "⚠️ 请填写要操作的激活码。", gr.update(value=rows)
+        return "⚠️ 请填写要操作的激活码。", gr.update(), gr.update(), codes_query
     try:
         ACTIVATION_MANAGER.update_code(code, disabled=disabled)
     except ActivationError as exc:
-        return f"❌ 操作失败：{exc}", gr.update(value=build_codes_table_rows())
+        return f"❌ 操作失败：{exc}", gr.update(), gr.update(), codes_query
     state_text = "已禁用" if disabled else "已启用"
-    return f"✅ 激活码 {code} {state_text}。", gr.update(value=build_codes_table_rows())
+    return (f"✅ 激活码 {code} {state_text}。", *_codes_table_outputs(codes_query))
 
-def voice_clone(
-    reference_audio: Optional[str],
-    text: str,
-    use_saved_voice: bool,
-    custom_voice_name: str,
-    saved_voice_uri: str,
+class CloneFailure(Exception):
+    """声音克隆在合成前失败；message 可直接展示给用户，status_code 供 REST 接口使用"""
+
+    def __init__(self, message: str, status_code: int = 400, activation_info: Optional[Dict[str, Any]] = None):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+        self.activation_info = activation_info
+
+
+@dataclass
+class CloneResult:
+    audio_path: Optional[str]        # 上游合成失败时为 None，原因见 status
+    status: str
+    voice_uri: str
+    created_voice_uri: Optional[str]
+    activation_info: Dict[str, Any]
+    emotion_message: str
+
+
+def build_synthesis_options(
     speed: float,
     pitch: float,
     volume: float,
@@ -656,86 +975,10 @@ def voice_clone(
     length_penalty: float,
     num_beams: float,
     max_mel_tokens: float,
-    emotion_mode: str,
-    emotion_audio: Optional[str],
-    emo_happy: float,
-    emo_angry: float,
-    emo_sad: float,
-    emo_fear: float,
-    emo_disgust: float,
-    emo_melancholic: float,
-    emo_surprise: float,
-    emo_calm: float,
-    emotion_text: str,
     emo_alpha: float,
-    activation_state: Optional[Dict[str, Any]],
-    reveal_full_code: bool,
-) -> Tuple[Optional[str], str, str, str, Optional[Dict[str, Any]], str]:
-    text = (text or "").strip()
-    if not text:
-        summary = format_activation_summary(activation_state, reveal_full_code)
-        return None, "请输入要合成的文本。", saved_voice_uri, saved_voice_uri, activation_state, summary
-
-    if not activation_state or not activation_state.get("code"):
-        summary = format_activation_summary(activation_state, reveal_full_code)
-        return None, "请先输入激活码完成登录。", saved_voice_uri, saved_voice_uri, activation_state, summary
-
-    code = activation_state["code"]
-    fresh_info = ACTIVATION_MANAGER.get_code_info(code)
-    if not fresh_info:
-        summary = format_activation_summary(None, reveal_full_code)
-        return None, "激活码无效或已被移除，请重新登录。", saved_voice_uri, saved_voice_uri, None, summary
-    if fresh_info.get("disabled") or fresh_info.get("expired"):
-        summary = format_activation_summary(fresh_info, reveal_full_code)
-        return None, "当前激活码不可用，请联系管理员。", saved_voice_uri, saved_voice_uri, fresh_info, summary
-
-    saved_voice_uri = (saved_voice_uri or "").strip()
-    use_saved_voice = bool(use_saved_voice)
-    needs_new_voice = not (use_saved_voice and saved_voice_uri)
-    characters_needed = len(text)
-
-    ok, quota_message, quota_info = ACTIVATION_MANAGER.ensure_quota(code, characters_needed, needs_new_voice)
-    if not ok:
-        summary = format_activation_summary(quota_info or fresh_info, reveal_full_code)
-        return None, quota_message, saved_voice_uri, saved_voice_uri, quota_info or fresh_info, summary
-
-    activation_info = quota_info or fresh_info
-
-    api_key = config.get_api_key()
-    if not api_key:
-        summary = format_activation_summary(activation_info, reveal_full_code)
-        return None, "API 密钥未配置，请检查 siliconflowkey.env 文件。", saved_voice_uri, saved_voice_uri, activation_info, summary
-
-    voice_uri = saved_voice_uri
-    created_voice_uri: Optional[str] = None
-    upload_message = ""
-
-    if use_saved_voice and saved_voice_uri:
-        upload_message = f"使用已有音色 URI：{voice_uri}"
-    else:
-        if not reference_audio:
-            summary = format_activation_summary(activation_info, reveal_full_code)
-            if use_saved_voice:
-                return None, "未检测到已保存的音色 URI，请先上传参考音频。", saved_voice_uri, saved_voice_uri, activation_info, summary
-            return None, "请上传参考音频。", saved_voice_uri, saved_voice_uri, activation_info, summary
-
-        custom_name = _build_custom_name(custom_voice_name)
-        voice_uri, error = _upload_reference_audio(
-            audio_path=reference_audio,
-            api_key=api_key,
-            custom_name=custom_name,
-            sample_text=text,
-        )
-        if error:
-            summary = format_activation_summary(activation_info, reveal_full_code)
-            return None, error, saved_voice_uri, saved_voice_uri, activation_info, summary
-        created_voice_uri = voice_uri
-        upload_message = f"已上传音色并获得 URI：{voice_uri}"
-
-    payload = {
-        "model": config.MODEL_NAME,
-        "input": text,
-        "voice": voice_uri,
+) -> Dict[str, Any]:
+    """合成请求中除文本、音色、情感外的参数"""
+    return {
         "response_format": response_format or "mp3",
         "speed": speed,
         "pitch": pitch,
@@ -751,33 +994,57 @@ def voice_clone(
         "emo_alpha": emo_alpha,
     }
 
-    emotion_mode = (emotion_mode or EMOTION_MODE_OPTIONS[0]).strip()
-    emotion_message = f"情感模式={emotion_mode}"
 
+def _options_summary(options: Dict[str, Any]) -> str:
+    return (
+        f"采样={'开' if options['do_sample'] else '关'}, temperature={options['temperature']}, "
+        f"top_p={options['top_p']}, top_k={options['top_k']}, 重复惩罚={options['repetition_penalty']}, "
+        f"num_beams={options['num_beams']}, 最大Mel={options['max_mel_tokens']}, 情感强度={options['emo_alpha']}"
+    )
+
+
+def check_activation(code: str) -> Dict[str, Any]:
+    """确认激活码可用并计入限流，返回最新的激活码信息"""
+    with tracing.span("activation_lookup"):
+        fresh_info = ACTIVATION_MANAGER.get_code_info(code)
+    if not fresh_info:
+        raise CloneFailure("激活码无效或已被移除，请重新登录。", 401)
+    if fresh_info.get("disabled") or fresh_info.get("expired"):
+        raise CloneFailure("当前激活码不可用，请联系管理员。", 403, fresh_info)
+
+    if not check_rate_limit(SHARED_STATE, code, config.RATE_LIMIT_PER_MINUTE):
+        raise CloneFailure("请求过于频繁，请稍后再试。", 429, fresh_info)
+    return fresh_info
+
+
+def check_voice_owner(code: str, voice_uri: str, activation_info: Optional[Dict[str, Any]] = None) -> None:
+    """接口只能使用激活码自己音色库中的音色，不能借用其他激活码的音色"""
+    if not any(entry["uri"] == voice_uri for entry in ACTIVATION_MANAGER.list_voices(code)):
+        raise CloneFailure("音色不在当前激活码的音色库中。", 404, activation_info)
+
+
+def apply_emotion(
+    payload: Dict[str, Any],
+    emotion_mode: str,
+    emotion_audio: Optional[str] = None,
+    emotion_vector: Optional[List[float]] = None,
+    emotion_text: str = "",
+) -> Tuple[str, str]:
+    """按情感模式写入合成请求，返回 (实际使用的模式, 说明)"""
+    emotion_message = f"情感模式={emotion_mode}"
     if emotion_mode == EMOTION_MODE_OPTIONS[1]:
         if not emotion_audio:
-            summary = format_activation_summary(activation_info, reveal_full_code)
-            return None, "请上传情感参考音频。", saved_voice_uri, saved_voice_uri, activation_info, summary
-        encoded_audio, error = _encode_audio_for_payload(emotion_audio, "情感参考音频")
+            raise CloneFailure("请上传情感参考音频。")
+        with tracing.span("encode"):
+            encoded_audio, error = _encode_audio_for_payload(emotion_audio, "情感参考音频")
         if error:
-            summary = format_activation_summary(activation_info, reveal_full_code)
-            return None, error, saved_voice_uri, saved_voice_uri, activation_info, summary
+            raise CloneFailure(error)
         payload["emotion_audio"] = encoded_audio
         emotion_message += "（参考上传的情感音频）"
     elif emotion_mode == EMOTION_MODE_OPTIONS[2]:
-        emotion_vector = [
-            float(emo_happy),
-            float(emo_angry),
-            float(emo_sad),
-            float(emo_fear),
-            float(emo_disgust),
-            float(emo_melancholic),
-            float(emo_surprise),
-            float(emo_calm),
-        ]
-        if max(emotion_vector) <= 0:
-            summary = format_activation_summary(activation_info, reveal_full_code)
-            return None, "请调整情感向量（至少一个维度大于 0）。", saved_voice_uri, saved_voice_uri, activation_info, summary
+        emotion_vector = [float(value) for value in (emotion_vector or [])]
+        if not emotion_vector or max(emotion_vector) <= 0:
+            raise CloneFailure("请调整情感向量（至少一个维度大于 0）。")
         rounded_vector = [round(val, 4) for val in emotion_vector]
         payload["emotion_vector"] = rounded_vector
         pairs = ", ".join(f"{label}:{val:.2f}" for label, val in zip(EMOTION_VECTOR_LABELS, rounded_vector))
@@ -785,47 +1052,560 @@ def voice_clone(
     elif emotion_mode == EMOTION_MODE_OPTIONS[3]:
         emotion_text = (emotion_text or "").strip()
         if not emotion_text:
-            summary = format_activation_summary(activation_info, reveal_full_code)
-            return None, "请填写情感描述文本。", saved_voice_uri, saved_voice_uri, activation_info, summary
+            raise CloneFailure("请填写情感描述文本。")
         payload["emotion_text"] = emotion_text
         emotion_message += f"（描述：{emotion_text}）"
     else:
         emotion_mode = EMOTION_MODE_OPTIONS[0]
         emotion_message = f"情感模式={emotion_mode}"
+    return emotion_mode, emotion_message
+
+
+def _holds_clone_slot(kind: str):
+    """执行期间占用一个 CLONE_SLOTS 名额；等待名额的请求数与耗时记入 /metrics"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with metrics.CLONE_SLOT_WAITING.track_inprogress(kind=kind), \
+                    metrics.CLONE_SLOT_WAIT_SECONDS.time(kind=kind):
+                CLONE_SLOTS.acquire()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                CLONE_SLOTS.release()
+        return wrapper
+    return decorator
+
+
+@tracing.traced("voice_clone")
+@metrics.CLONES_IN_PROGRESS.track_inprogress()
+@_holds_clone_slot("clone")
+def synthesize_clone(
+    code: str,
+    text: str,
+    options: Dict[str, Any],
+    reference_audio: Optional[str] = None,
+    use_saved_voice: bool = False,
+    saved_voice_uri: str = "",
+    custom_voice_name: str = "",
+    emotion_mode: str = "",
+    emotion_audio: Optional[str] = None,
+    emotion_vector: Optional[List[float]] = None,
+    emotion_text: str = "",
+    upload_progress: Optional[ProgressCallback] = None,
+    library_only: bool = False,
+) -> CloneResult:
+    """界面与 REST 接口共用的克隆流程：校验、限流、音色库、预检、额度、上传、合成、记录用量
+
+    合成前的失败抛出 CloneFailure；上游合成失败时返回 audio_path 为 None 的结果
+    （此时可能已经上传了新音色，调用方仍需更新 voice_uri）。
+    library_only=True 时指定的 saved_voice_uri 必须在该激活码的音色库中。
+    """
+    text = (text or "").strip()
+    if not text:
+        raise CloneFailure("请输入要合成的文本。")
+    try:
+        validate_text(text)
+    except ValidationError as exc:
+        raise CloneFailure(str(exc), 413)
+
+    fresh_info = check_activation(code)
+
+    saved_voice_uri = (saved_voice_uri or "").strip()
+    use_saved_voice = bool(use_saved_voice)
+    if library_only and use_saved_voice and saved_voice_uri:
+        check_voice_owner(code, saved_voice_uri, fresh_info)
+    if use_saved_voice and not saved_voice_uri and not reference_audio:
+        # 没有选中音色、也没有上传新的参考音频时，使用音色库中最近使用的音色
+        recent = ACTIVATION_MANAGER.list_voices(code, limit=1)
+        saved_voice_uri = recent[0]["uri"] if recent else ""
+
+    reference_hash = ""
+    library_message = ""
+    if not (use_saved_voice and saved_voice_uri) and reference_audio and os.path.exists(reference_audio):
+        # 同一段参考音频已经上传过时直接复用音色，不再上传，也不占用音色额度
+        with tracing.span("voice_lookup"):
+            try:
+                reference_hash = file_digest(reference_audio)
+            except OSError:
+                reference_hash = ""
+            existing_voice = ACTIVATION_MANAGER.find_voice(code, reference_hash)
+        if existing_voice:
+            use_saved_voice, saved_voice_uri = True, existing_voice["uri"]
+            library_message = f"参考音频与音色库中的「{existing_voice['name'] or existing_voice['uri']}」相同，已直接复用"
+    needs_new_voice = not (use_saved_voice and saved_voice_uri)
+    emotion_mode = (emotion_mode or EMOTION_MODE_OPTIONS[0]).strip()
+    # 预检：上传前在本地发现损坏、过短或静音的音频
+    preflight_targets = []
+    if needs_new_voice and reference_audio:
+        preflight_targets.append((reference_audio, "参考音频"))
+    if emotion_mode == EMOTION_MODE_OPTIONS[1] and emotion_audio:
+        preflight_targets.append((emotion_audio, "情感参考音频"))
+    try:
+        with tracing.span("preflight"):
+            for path, label in preflight_targets:
+                validate_reference_audio(path, label)
+    except ValidationError as exc:
+        metrics.PREFLIGHT_REJECTIONS.inc()
+        raise CloneFailure(str(exc), 422, fresh_info)
+    characters_needed = len(text)
+    tracing.annotate(characters=characters_needed, needs_new_voice=needs_new_voice)
+
+    with tracing.span("quota_check"):
+        ok, quota_message, quota_info = ACTIVATION_MANAGER.ensure_quota(code, characters_needed, needs_new_voice)
+    if not ok:
+        raise CloneFailure(quota_message, 402, quota_info or fresh_info)
+
+    activation_info = quota_info or fresh_info
+
+    api_key = config.get_api_key()
+    if not api_key:
+        raise CloneFailure("API 密钥未配置，请检查 siliconflowkey.env 文件。", 503, activation_info)
+
+    voice_uri = saved_voice_uri
+    created_voice_uri: Optional[str] = None
 
+    if use_saved_voice and saved_voice_uri:
+        upload_message = library_message or f"使用已有音色 URI：{voice_uri}"
+    else:
+        if not reference_audio:
+            if use_saved_voice:
+                raise CloneFailure("未检测到已保存的音色 URI，请先上传参考音频。", 400, activation_info)
+            raise CloneFailure("请上传参考音频。", 400, activation_info)
+
+        custom_name = _build_custom_name(custom_voice_name)
+        with tracing.span("upload"):
+            voice_uri, error = _upload_reference_audio(
+                audio_path=reference_audio,
+                api_key=api_key,
+                custom_name=custom_name,
+                sample_text=text,
+                progress=upload_progress,
+            )
+        if error:
+            raise CloneFailure(error, 502, activation_info)
+        created_voice_uri = voice_uri
+        try:
+            ACTIVATION_MANAGER.save_voice(code, voice_uri, custom_name, reference_hash)
+        except ActivationError as exc:
+            logger.warning("音色未能加入音色库：%s", exc)
+        upload_message = f"已上传音色并获得 URI：{voice_uri}"
+
+    payload = {"model": config.MODEL_NAME, "input": text, "voice": voice_uri, **options}
+
+    try:
+        emotion_mode, emotion_message = apply_emotion(
+            payload, emotion_mode, emotion_audio, emotion_vector, emotion_text
+        )
+    except CloneFailure as exc:
+        exc.activation_info = activation_info
+        raise
+    tracing.annotate(emotion_mode=emotion_mode)
     audio_path, status = _call_siliconflow(payload)
+    tracing.annotate(success=bool(audio_path))
 
     if audio_path:
         if created_voice_uri:
             status = f"声音克隆成功。\n{upload_message}"
         else:
             status = f"声音克隆成功（{upload_message}）。"
+        try:
+            with tracing.span("usage_record"):
+                activation_info = ACTIVATION_MANAGER.record_usage(
+                    code,
+                    characters_needed,
+                    created_voice_uri is not None,
+                )
+        except ActivationError as exc:
+            status = f"{status}\n⚠️ 用量记录失败：{exc}"
+        if not created_voice_uri and voice_uri:
+            ACTIVATION_MANAGER.touch_voice(code, voice_uri)
     else:
-        status = f"{status}\n{upload_message}" if upload_message else status
+        status = f"{status}\n{upload_message}"
 
-    new_saved_uri = created_voice_uri or saved_voice_uri
-    display_uri = created_voice_uri or saved_voice_uri or voice_uri or ""
+    return CloneResult(audio_path, status, voice_uri, created_voice_uri, activation_info, emotion_message)
 
-    param_summary = (
-        f"采样={'开' if do_sample else '关'}, temperature={temperature}, top_p={top_p}, top_k={int(top_k)}, "
-        f"重复惩罚={repetition_penalty}, num_beams={int(num_beams)}, 最大Mel={int(max_mel_tokens)}, 情感强度={emo_alpha}"
+
+def voice_clone(
+    reference_audio: Optional[str],
+    text: str,
+    use_saved_voice: bool,
+    custom_voice_name: str,
+    saved_voice_uri: str,
+    speed: float,
+    pitch: float,
+    volume: float,
+    response_format: str,
+    do_sample: bool,
+    temperature: float,
+    top_p: float,
+    top_k: float,
+    repetition_penalty: float,
+    length_penalty: float,
+    num_beams: float,
+    max_mel_tokens: float,
+    emotion_mode: str,
+    emotion_audio: Optional[str],
+    emo_happy: float,
+    emo_angry: float,
+    emo_sad: float,
+    emo_fear: float,
+    emo_disgust: float,
+    emo_melancholic: float,
+    emo_surprise: float,
+    emo_calm: float,
+    emotion_text: str,
+    emo_alpha: float,
+    activation_state: Optional[Dict[str, Any]],
+    reveal_full_code: bool,
+    progress: gr.Progress = gr.Progress(),
+) -> Tuple[Optional[str], str, str, str, Optional[Dict[str, Any]], str]:
+    if (text or "").strip() and (not activation_state or not activation_state.get("code")):
+        summary = format_activation_summary(activation_state, reveal_full_code)
+        return None, "请先输入激活码完成登录。", saved_voice_uri, saved_voice_uri, activation_state, summary
+
+    options = build_synthesis_options(
+        speed, pitch, volume, response_format, do_sample, temperature, top_p, top_k,
+        repetition_penalty, length_penalty, num_beams, max_mel_tokens, emo_alpha,
     )
-    param_summary += f"，{emotion_message}"
+    try:
+        result = synthesize_clone(
+            (activation_state or {}).get("code", ""),
+            text,
+            options,
+            reference_audio=reference_audio,
+            use_saved_voice=use_saved_voice,
+            saved_voice_uri=saved_voice_uri,
+            custom_voice_name=custom_voice_name,
+            emotion_mode=emotion_mode,
+            emotion_audio=emotion_audio,
+            emotion_vector=[
+                emo_happy, emo_angry, emo_sad, emo_fear,
+                emo_disgust, emo_melancholic, emo_surprise, emo_calm,
+            ],
+            emotion_text=emotion_text,
+            upload_progress=lambda sent, total: progress(sent / total, desc="正在上传参考音频"),
+        )
+    except CloneFailure as exc:
+        # 激活码失效时清空登录状态；其他错误保留当前状态
+        state = None if exc.status_code == 401 else exc.activation_info or activation_state
+        summary = format_activation_summary(state, reveal_full_code)
+        return None, exc.message, saved_voice_uri, saved_voice_uri, state, summary
 
-    if audio_path:
+    status = f"{result.status}\n{_options_summary(options)}，{result.emotion_message}"
+    summary = format_activation_summary(result.activation_info, reveal_full_code)
+    return result.audio_path, status, result.voice_uri, result.voice_uri, result.activation_info, summary
+
+
+API_MEDIA_TYPES = {"mp3": "audio/mpeg", "wav": "audio/wav", "ogg": "audio/ogg", "flac": "audio/flac"}
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+def _require_admin_password(x_admin_password: str) -> None:
+    if not secrets.compare_digest(x_admin_password.strip(), config.get_admin_password()):
+        raise HTTPException(status_code=401, detail="后台口令错误")
+
+
+def _api_activation_code(x_activation_code: str) -> str:
+    code = (x_activation_code or "").strip()
+    if not code:
+        raise HTTPException(status_code=401, detail="请在 X-Activation-Code 请求头中提供激活码")
+    return code
+
+
+async def _save_upload(upload: Optional[UploadFile], label: str) -> Optional[str]:
+    """把上传的音频分块写入临时文件，超过 MAX_REFERENCE_SOURCE_MB 时返回 413"""
+    if upload is None or not upload.filename:
+        return None
+    limit = config.MAX_REFERENCE_SOURCE_MB * 1024 * 1024
+    suffix = os.path.splitext(upload.filename)[1] or ".wav"
+    handle, path = tempfile.mkstemp(prefix="api-upload-", suffix=suffix)
+    written = 0
+    try:
+        with os.fdopen(handle, "wb") as target:
+            while True:
+                chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if written > limit:
+                    raise HTTPException(
+                        status_code=413, detail=f"{label}不能超过 {config.MAX_REFERENCE_SOURCE_MB} MB。"
+                    )
+                target.write(chunk)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return path
+
+
+def _parse_emotion_vector(raw: str) -> Optional[List[float]]:
+    raw = (raw or "").strip()
+    if not raw:
+        return None
+    try:
+        values = [float(item) for item in raw.replace("，", ",").split(",")]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="emotion_vector 应为逗号分隔的数字")
+    if len(values) != len(EMOTION_VECTOR_LABELS):
+        raise HTTPException(
+            status_code=400,
+            detail=f"emotion_vector 需要 {len(EMOTION_VECTOR_LABELS)} 个维度（{'、'.join(EMOTION_VECTOR_LABELS)}）",
+        )
+    return values
+
+
+def _api_options(preset: str, speed: float, pitch: float, volume: float, response_format: str) -> Dict[str, Any]:
+    if preset not in ADVANCED_PRESETS:
+        raise HTTPException(status_code=400, detail=f"未知的参数预设：{preset}")
+    if response_format not in API_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"不支持的输出格式：{response_format}")
+    do_sample, temperature, top_p, top_k, repetition_penalty, length_penalty, num_beams, max_mel_tokens, _, emo_alpha = (
+        _advanced_preset_values(preset)
+    )
+    return build_synthesis_options(
+        speed, pitch, volume, response_format, do_sample, temperature, top_p, top_k,
+        repetition_penalty, length_penalty, num_beams, max_mel_tokens, emo_alpha,
+    )
+
+
+def _api_synthesize(code: str, text: str, options: Dict[str, Any], **kwargs: Any) -> CloneResult:
+    """在线程池中执行；把 CloneFailure 和上游失败转换为 HTTP 错误"""
+    try:
+        result = synthesize_clone(code, text, options, library_only=True, **kwargs)
+    except CloneFailure as exc:
+        raise HTTPException(status_code=exc.status_code, detail=exc.message)
+    if not result.audio_path:
+        # 新音色可能已经上传成功，返回 URI 以便客户端下次直接复用
+        raise HTTPException(status_code=502, detail={"message": result.status, "voice_uri": result.voice_uri})
+    return result
+
+
+def _api_audio_response(result: CloneResult, response_format: str) -> FileResponse:
+    info = result.activation_info or {}
+    headers = {
+        "X-Voice-Uri": result.voice_uri,
+        "X-Voice-Created": "1" if result.created_voice_uri else "0",
+    }
+    if info.get("max_characters"):
+        headers["X-Remaining-Characters"] = str(info.get("remaining_characters", 0))
+    return FileResponse(
+        result.audio_path,
+        media_type=API_MEDIA_TYPES[response_format],
+        filename=f"voice-clone.{response_format}",
+        headers=headers,
+        background=BackgroundTask(os.unlink, result.audio_path),
+    )
+
+
+# 流式合成中已通过额度检查、尚未完成的字数（按激活码）。同一激活码并行的分段检查额度时
+# 计入这部分字数，避免多段共用同一份余额、合成后记录用量时被截断而漏扣
+_STREAM_RESERVED: Dict[str, int] = {}
+_STREAM_RESERVED_LOCK = threading.Lock()
+
+
+def _reserve_stream_characters(code: str, characters: int) -> Dict[str, Any]:
+    key = code.upper()
+    with _STREAM_RESERVED_LOCK:
+        reserved = _STREAM_RESERVED.get(key, 0)
+        ok, message, info = ACTIVATION_MANAGER.ensure_quota(code, reserved + characters, False)
+        if not ok:
+            raise CloneFailure(message, 402, info)
+        _STREAM_RESERVED[key] = reserved + characters
+    return info
+
+
+def _release_stream_characters(code: str, characters: int) -> None:
+    key = code.upper()
+    with _STREAM_RESERVED_LOCK:
+        left = _STREAM_RESERVED.get(key, 0) - characters
+        if left > 0:
+            _STREAM_RESERVED[key] = left
+        else:
+            _STREAM_RESERVED.pop(key, None)
+
+
+@_holds_clone_slot("segment")
+def synthesize_segment(code: str, payload: Dict[str, Any]) -> Tuple[bytes, Dict[str, Any]]:
+    """流式合成的一段：预留字符额度、请求上游、记录用量，失败时抛出 CloneFailure"""
+    characters = len(payload["input"])
+    info = _reserve_stream_characters(code, characters)
+    try:
+        audio_path, status = _call_siliconflow(payload)
+        if not audio_path:
+            raise CloneFailure(status, 502, info)
         try:
-            activation_info = ACTIVATION_MANAGER.record_usage(
-                code,
-                characters_needed,
-                created_voice_uri is not None,
-            )
+            with open(audio_path, "rb") as handle:
+                audio = handle.read()
+        finally:
+            os.unlink(audio_path)
+        try:
+            info = ACTIVATION_MANAGER.record_usage(code, characters, False)
         except ActivationError as exc:
-            status = f"{status}\n⚠️ 用量记录失败：{exc}"
+            logger.warning("流式合成用量记录失败：%s", exc)
+    finally:
+        # 用量已记录（或合成失败）后再释放预留
+        _release_stream_characters(code, characters)
+    return audio, info
+
+
+async def _stream_payload(websocket: WebSocket, start: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+    """校验 start 消息，返回 (激活码, 不含文本的合成请求)"""
+    if not isinstance(start, dict) or start.get("type") != "start":
+        raise CloneFailure("第一条消息应为 {\"type\": \"start\", ...}。")
+    code = str(start.get("activation_code") or websocket.headers.get("x-activation-code", "")).strip()
+    if not code:
+        raise CloneFailure("请在 start 消息或 X-Activation-Code 请求头中提供激活码。", 401)
+    try:
+        options = _api_options(
+            str(start.get("preset") or DEFAULT_PRESET),
+            float(start.get("speed", config.DEFAULT_SPEED)),
+            float(start.get("pitch", config.DEFAULT_PITCH)),
+            float(start.get("volume", config.DEFAULT_VOLUME)),
+            str(start.get("response_format") or "mp3"),
+        )
+    except HTTPException as exc:
+        raise CloneFailure(str(exc.detail), exc.status_code)
+    except (TypeError, ValueError):
+        raise CloneFailure("speed / pitch / volume 应为数字。")
+
+    await run_in_threadpool(check_activation, code)
+    voice_uri = str(start.get("voice_uri") or "").strip()
+    if voice_uri:
+        await run_in_threadpool(check_voice_owner, code, voice_uri)
+    else:
+        recent = await run_in_threadpool(ACTIVATION_MANAGER.list_voices, code, 1)
+        if not recent:
+            raise CloneFailure("音色库为空，请先克隆一个音色或提供 voice_uri。")
+        voice_uri = recent[0]["uri"]
+
+    payload = {"model": config.MODEL_NAME, "voice": voice_uri, **options}
+    emotion_vector = start.get("emotion_vector")
+    emotion_text = str(start.get("emotion_text") or "")
+    emotion_mode = EMOTION_MODE_OPTIONS[2] if emotion_vector else (
+        EMOTION_MODE_OPTIONS[3] if emotion_text.strip() else EMOTION_MODE_OPTIONS[0]
+    )
+    try:
+        apply_emotion(payload, emotion_mode, None, emotion_vector, emotion_text)
+    except (TypeError, ValueError):
+        raise CloneFailure("emotion_vector 应为数字数组。")
+    return code, payload
 
-    summary = format_activation_summary(activation_info, reveal_full_code)
-    status = f"{status}\n{param_summary}"
 
-    return audio_path, status, new_saved_uri, display_uri, activation_info, summary
+async def run_stream_session(websocket: WebSocket) -> None:
+    """WebSocket 流式合成
+
+    客户端依次发送 {"type": "start", ...}、若干 {"type": "text", "text": "..."}、{"type": "end"}；
+    服务端按句分段，最多 STREAM_PARALLELISM 段同时请求上游（同时占用 CLONE_SLOTS 名额），并按顺序推送：
+    每段先发 {"type": "segment", ...}，再发一帧二进制音频；结束时发 {"type": "done", ...}。
+    """
+    try:
+        start = await asyncio.wait_for(websocket.receive_json(), config.STREAM_IDLE_TIMEOUT)
+        code, payload = await _stream_payload(websocket, start)
+    except WebSocketDisconnect:
+        return
+    except (CloneFailure, asyncio.TimeoutError, ValueError) as exc:
+        message = exc.message if isinstance(exc, CloneFailure) else "start 消息无效或超时。"
+        await websocket.send_json({"type": "error", "status": getattr(exc, "status_code", 400), "message": message})
+        await websocket.close(code=1008)
+        return
+    await websocket.send_json({"type": "ready", "voice_uri": payload["voice"]})
+
+    slots = asyncio.Semaphore(config.STREAM_PARALLELISM)
+    segments: "asyncio.Queue[Any]" = asyncio.Queue()
+    tasks: List[asyncio.Task] = []
+    first_text_at: List[float] = []
+
+    async def synthesize(text: str) -> Tuple[bytes, Dict[str, Any]]:
+        async with slots:
+            return await run_in_threadpool(synthesize_segment, code, {**payload, "input": text})
+
+    def schedule(texts: List[str]) -> None:
+        for text in texts:
+            task = asyncio.create_task(synthesize(text))
+            tasks.append(task)
+            segments.put_nowait((text, task))
+
+    async def receive_text() -> None:
+        """读取客户端文本并分段；出错时把异常放进队列交给发送端处理"""
+        segmenter = TextSegmenter(config.STREAM_SEGMENT_CHARS)
+        received = 0
+        try:
+            while True:
+                try:
+                    message = await asyncio.wait_for(websocket.receive_json(), config.STREAM_IDLE_TIMEOUT)
+                except asyncio.TimeoutError:
+                    raise CloneFailure("长时间未收到文本，连接已关闭。", 408)
+                if not isinstance(message, dict):
+                    raise CloneFailure("消息应为 JSON 对象。")
+                if message.get("type") == "end":
+                    schedule(segmenter.flush())
+                    segments.put_nowait(None)
+                    return
+                if message.get("type") != "text":
+                    raise CloneFailure(f"未知的消息类型：{message.get('type')}")
+                text = str(message.get("text") or "")
+                received += len(text)
+                if received > config.STREAM_MAX_CHARACTERS:
+                    raise CloneFailure(f"单次连接最多合成 {config.STREAM_MAX_CHARACTERS} 字。", 413)
+                if text and not first_text_at:
+                    first_text_at.append(time.perf_counter())
+                # 按已积累的文本量和并行数选择总耗时最短的分段长度，只用于合并完整的句子；
+                # 长句仍按 STREAM_SEGMENT_CHARS 在停顿处切开
+                segmenter.target_chars = LATENCY_MODEL.chunk_chars(
+                    segmenter.buffered + len(text),
+                    config.STREAM_PARALLELISM,
+                    config.STREAM_SEGMENT_CHARS,
+                    config.MAX_TEXT_CHARACTERS,
+                )
+                schedule(segmenter.feed(text))
+        except (CloneFailure, WebSocketDisconnect) as exc:
+            segments.put_nowait(exc)
+        except ValueError:
+            segments.put_nowait(CloneFailure("消息不是有效的 JSON。"))
+        except Exception as exc:
+            segments.put_nowait(exc)
+
+    receiver = asyncio.create_task(receive_text())
+    sent = characters = 0
+    try:
+        while True:
+            item = await segments.get()
+            if item is None:
+                break
+            if isinstance(item, Exception):
+                raise item
+            text, task = item
+            try:
+                audio, info = await task
+            except CloneFailure:
+                metrics.STREAM_SEGMENTS.inc(result="error")
+                raise
+            if not sent and first_text_at:
+                metrics.STREAM_FIRST_AUDIO_SECONDS.observe(time.perf_counter() - first_text_at[0])
+            await websocket.send_json({
+                "type": "segment",
+                "index": sent,
+                "text": text,
+                "format": payload["response_format"],
+                "bytes": len(audio),
+                "remaining_characters": info.get("remaining_characters") if info else None,
+            })
+            await websocket.send_bytes(audio)
+            metrics.STREAM_SEGMENTS.inc(result="ok")
+            sent += 1
+            characters += len(text)
+        await websocket.send_json({"type": "done", "segments": sent, "characters": characters})
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+    except CloneFailure as exc:
+        await websocket.send_json({"type": "error", "index": sent, "status": exc.status_code, "message": exc.message})
+        await websocket.close(code=1008 if exc.status_code < 500 else 1011)
+    finally:
+        receiver.cancel()
+        for task in tasks:
+            task.cancel()
 
 def refresh_api_status() -> str:
     api_key = config.get_api_key()
@@ -870,6 +1650,10 @@ def refresh_api_status() -> str:
     return f"⚠ 密钥已加载（{key_preview}），但未获取到任何模型数据。"
 
 
+def _log_api_status() -> None:
+    logger.info(refresh_api_status())
+
+
 def build_client_app() -> gr.Blocks:
     with gr.Blocks(
         title="Ai Push Voice Clone 2.0",
@@ -918,9 +1702,15 @@ def build_client_app() -> gr.Blocks:
                         sources=['upload'],
                     )
                     clone_use_saved = gr.Checkbox(
-                        label="复用最近生成的音色",
+                        label="复用音色库中的音色",
                         value=True,
                     )
+                    voice_picker = gr.Dropdown(
+                        label="我的音色库",
+                        choices=[],
+                        value=None,
+                        info="上传过的参考音频会自动保存为音色；再次上传同一段音频时直接复用，不消耗音色额度。",
+                    )
                     clone_voice_name = gr.Textbox(
                         label="音色名称（可选）",
                         placeholder="用于标记本次音色，未填写时自动生成。",
@@ -1007,6 +1797,32 @@ def build_client_app() -> gr.Blocks:
                         interactive=False,
                         visible=False,
                     )
+                    with gr.Accordion("重新导出（不重新合成，不消耗额度）", open=False):
+                        with gr.Row():
+                            export_format = gr.Dropdown(
+                                label="导出格式",
+                                choices=config.SUPPORTED_AUDIO_FORMATS,
+                                value='mp3',
+                            )
+                            export_normalize = gr.Checkbox(label="响度标准化", value=True)
+                        with gr.Row():
+                            export_volume = gr.Slider(
+                                label="音量",
+                                minimum=0.5,
+                                maximum=2.0,
+                                step=0.05,
+                                value=1.0,
+                            )
+                            export_speed = gr.Slider(
+                                label="语速",
+                                minimum=0.5,
+                                maximum=2.0,
+                                step=0.05,
+                                value=1.0,
+                            )
+                        export_button = gr.Button("导出", variant="secondary")
+                        export_output = gr.File(label="导出文件", interactive=False)
+                        export_status = gr.Markdown()
             with gr.Column(visible=False):
                 clone_preset = gr.Radio(
                     label="参数预设",
@@ -1095,6 +1911,10 @@ def build_client_app() -> gr.Blocks:
                 reveal_state,
                 summary_display,
             ],
+        ).then(
+            fn=refresh_voice_library,
+            inputs=[activation_state, saved_voice_state],
+            outputs=[voice_picker, saved_voice_state],
         )
 
         logout_button.click(
@@ -1108,6 +1928,23 @@ def build_client_app() -> gr.Blocks:
                 summary_display,
                 login_feedback,
             ],
+        ).then(
+            fn=refresh_voice_library,
+            inputs=[activation_state, saved_voice_state],
+            outputs=[voice_picker, saved_voice_state],
+        )
+
+        # 上传了新的参考音频时取消复用，以新音频克隆（同一段音频仍会按哈希自动复用）
+        clone_audio.upload(
+            fn=lambda: gr.update(value=False),
+            inputs=None,
+            outputs=[clone_use_saved],
+        )
+
+        voice_picker.input(
+            fn=select_library_voice,
+            inputs=[voice_picker],
+            outputs=[saved_voice_state, clone_voice_info, clone_use_saved],
         )
 
         reveal_checkbox.change(
@@ -1150,7 +1987,21 @@ def build_client_app() -> gr.Blocks:
             ],
         )
 
+        def check_queue_capacity() -> None:
+            """队列已满时在入队前立即拒绝，显示 QUEUE_FULL_MESSAGE（Gradio 自带的提示无法配置）"""
+            try:
+                queued = len(demo._queue)
+            except (AttributeError, TypeError):
+                return
+            if queued >= config.QUEUE_MAX_SIZE:
+                raise gr.Error(config.QUEUE_FULL_MESSAGE)
+
         clone_button.click(
+            fn=check_queue_capacity,
+            inputs=None,
+            outputs=None,
+            queue=False,
+        ).success(
             fn=voice_clone,
             inputs=[
                 clone_audio,
@@ -1186,8 +2037,26 @@ def build_client_app() -> gr.Blocks:
                 activation_state,
                 summary_display,
             ],
+            concurrency_limit=config.CLONE_CONCURRENCY,
+            concurrency_id="clone",
+            show_progress="full",
+        ).then(
+            fn=refresh_voice_library,
+            inputs=[activation_state, saved_voice_state],
+            outputs=[voice_picker, saved_voice_state],
+        )
+
+        export_button.click(
+            fn=handle_reexport,
+            inputs=[clone_output, export_format, export_volume, export_speed, export_normalize],
+            outputs=[export_output, export_status],
+            concurrency_limit=config.POSTPROCESS_WORKERS,
+            concurrency_id="export",
         )
 
+    # 排队时前端会显示排队位置；队列已满时新请求直接被拒绝
+    demo.queue(default_concurrency_limit=config.CLIENT_CONCURRENCY, max_size=config.QUEUE_MAX_SIZE)
+    metrics.GRADIO_QUEUE_DEPTH.set_function(lambda: len(getattr(demo, "_queue", ())))
     return demo
 
 
@@ -1201,6 +2070,9 @@ def build_admin_app() -> gr.Blocks:
         admin_logged_state = gr.State(False)
         disable_flag_state = gr.State(True)
         enable_flag_state = gr.State(False)
+        codes_query_state = gr.State(default_codes_query())
+        prev_page_state = gr.State(-1)
+        next_page_state = gr.State(1)
 
         gr.Markdown(
             """\
@@ -1224,6 +2096,13 @@ def build_admin_app() -> gr.Blocks:
         with gr.Group(visible=False) as admin_controls:
             with gr.Tabs():
                 with gr.Tab("生成激活码"):
+                    new_count = gr.Number(
+                        label=f"生成数量（单次最多 {ADMIN_MAX_BULK_CODES} 个）",
+                        value=1,
+                        precision=0,
+                        minimum=1,
+                        maximum=ADMIN_MAX_BULK_CODES,
+                    )
                     new_voice_limit = gr.Number(
                         label="可用音色数量（0 表示无限）",
                         value=5,
@@ -1246,9 +2125,45 @@ def build_admin_app() -> gr.Blocks:
                     generated_code_box = gr.Textbox(
                         label="最新生成的激活码",
                         interactive=False,
+                        max_lines=10,
+                    )
+                    generated_codes_file = gr.File(
+                        label="批量生成的激活码文件",
+                        interactive=False,
+                    )
+                with gr.Tab("批量导入"):
+                    gr.Markdown(
+                        "上传 CSV（首行为表头，至少包含 `code` 列）、JSONL 或 JSON 文件，"
+                        "可选列：max_voices、max_characters、expires_at、note 等。已存在的激活码会被跳过。"
                     )
+                    import_codes_file = gr.File(
+                        label="激活码文件",
+                        file_types=[".csv", ".json", ".jsonl"],
+                        type="filepath",
+                    )
+                    import_codes_button = gr.Button("导入激活码", variant="primary")
                 with gr.Tab("激活码列表与维护"):
-                    refresh_codes_button = gr.Button("刷新列表", variant="secondary")
+                    with gr.Row():
+                        search_code_prefix = gr.Textbox(
+                            label="激活码前缀",
+                            placeholder="例如：63R6",
+                        )
+                        search_note = gr.Textbox(
+                            label="备注包含",
+                        )
+                        search_status = gr.Dropdown(
+                            label="状态",
+                            choices=list(CODE_STATUS_OPTIONS.keys()),
+                            value="全部",
+                        )
+                        search_page_size = gr.Dropdown(
+                            label="每页数量",
+                            choices=CODES_PAGE_SIZE_OPTIONS,
+                            value=DEFAULT_CODES_PAGE_SIZE,
+                        )
+                    with gr.Row():
+                        search_codes_button = gr.Button("搜索", variant="primary")
+                        refresh_codes_button = gr.Button("刷新列表", variant="secondary")
                     codes_table = gr.DataFrame(
                         value=[],  # 初始为空，登录后通过 handle_admin_login 更新
                         headers=[
@@ -1265,6 +2180,10 @@ def build_admin_app() -> gr.Blocks:
                         interactive=False,
                         wrap=True,
                     )
+                    with gr.Row():
+                        prev_page_button = gr.Button("上一页", variant="secondary")
+                        codes_page_info = gr.Markdown()
+                        next_page_button = gr.Button("下一页", variant="secondary")
                     update_code_input = gr.Textbox(
                         label="要更新的激活码",
                         placeholder="请输入完整激活码字符串",
@@ -1290,41 +2209,81 @@ def build_admin_app() -> gr.Blocks:
         # 登录按钮点击事件
         admin_login_button.click(
             fn=handle_admin_login,
-            inputs=[admin_password, admin_logged_state],
-            outputs=[admin_logged_state, admin_status, admin_controls, codes_table],
-            queue=False,
+            inputs=[admin_password, admin_logged_state, codes_query_state],
+            outputs=[admin_logged_state, admin_status, admin_controls, codes_table, codes_page_info, codes_query_state],
+            **ADMIN_EVENT_OPTIONS,
         )
 
         # 密码框按回车键登录
         admin_password.submit(
             fn=handle_admin_login,
-            inputs=[admin_password, admin_logged_state],
-            outputs=[admin_logged_state, admin_status, admin_controls, codes_table],
-            queue=False,
+            inputs=[admin_password, admin_logged_state, codes_query_state],
+            outputs=[admin_logged_state, admin_status, admin_controls, codes_table, codes_page_info, codes_query_state],
+            **ADMIN_EVENT_OPTIONS,
         )
 
         generate_code_button.click(
             fn=handle_admin_generate,
             inputs=[
                 admin_logged_state,
+                new_count,
                 new_voice_limit,
                 new_char_limit,
                 new_expiry,
                 new_note,
+                codes_query_state,
             ],
             outputs=[
                 generated_code_box,
+                generated_codes_file,
                 admin_status,
                 codes_table,
+                codes_page_info,
+                codes_query_state,
             ],
-            queue=False,
+            **ADMIN_EVENT_OPTIONS,
+        )
+
+        import_codes_button.click(
+            fn=handle_admin_import,
+            inputs=[admin_logged_state, import_codes_file, codes_query_state],
+            outputs=[admin_status, codes_table, codes_page_info, codes_query_state],
+            **ADMIN_EVENT_OPTIONS,
         )
 
         refresh_codes_button.click(
             fn=handle_admin_refresh,
-            inputs=[admin_logged_state],
-            outputs=[codes_table, admin_status],
-            queue=False,
+            inputs=[admin_logged_state, codes_query_state],
+            outputs=[codes_table, codes_page_info, codes_query_state, admin_status],
+            **ADMIN_EVENT_OPTIONS,
+        )
+
+        search_codes_button.click(
+            fn=handle_admin_search,
+            inputs=[
+                admin_logged_state,
+                search_code_prefix,
+                search_note,
+                search_status,
+                search_page_size,
+                codes_query_state,
+            ],
+            outputs=[codes_table, codes_page_info, codes_query_state, admin_status],
+            **ADMIN_EVENT_OPTIONS,
+        )
+
+        prev_page_button.click(
+            fn=handle_admin_page,
+            inputs=[admin_logged_state, codes_query_state, prev_page_state],
+            outputs=[codes_table, codes_page_info, codes_query_state, admin_status],
+            **ADMIN_EVENT_OPTIONS,
+        )
+
+        next_page_button.click(
+            fn=handle_admin_page,
+            inputs=[admin_logged_state, codes_query_state, next_page_state],
+            outputs=[codes_table, codes_page_info, codes_query_state, admin_status],
+            **ADMIN_EVENT_OPTIONS,
         )
 
         update_code_button.click(
@@ -1336,23 +2295,24 @@ def build_admin_app() -> gr.Blocks:
                 update_char_limit,
                 update_expiry,
                 update_note,
+                codes_query_state,
             ],
-            outputs=[admin_status, codes_table],
-            queue=False,
+            outputs=[admin_status, codes_table, codes_page_info, codes_query_state],
+            **ADMIN_EVENT_OPTIONS,
         )
 
         disable_code_button.click(
             fn=handle_admin_toggle,
-            inputs=[admin_logged_state, update_code_input, disable_flag_state],
-            outputs=[admin_status, codes_table],
-            queue=False,
+            inputs=[admin_logged_state, update_code_input, disable_flag_state, codes_query_state],
+            outputs=[admin_status, codes_table, codes_page_info, codes_query_state],
+            **ADMIN_EVENT_OPTIONS,
         )
 
         enable_code_button.click(
             fn=handle_admin_toggle,
-            inputs=[admin_logged_state, update_code_input, enable_flag_state],
-            outputs=[admin_status, codes_table],
-            queue=False,
+            inputs=[admin_logged_state, update_code_input, enable_flag_state, codes_query_state],
+            outputs=[admin_status, codes_table, codes_page_info, codes_query_state],
+            **ADMIN_EVENT_OPTIONS,
         )
 
     return admin_demo
@@ -1360,74 +2320,180 @@ def build_admin_app() -> gr.Blocks:
 
 
 
-def create_fastapi_app() -> FastAPI:
-    # 创建 Gradio 应用
-    client_blocks = build_client_app()
-    admin_blocks = build_admin_app()
+def _create_admin_sub_app() -> FastAPI:
+    admin_sub_app = FastAPI(root_path="/azttsadmin")
+    return gr.mount_gradio_app(admin_sub_app, build_admin_app(), path="/", root_path="/azttsadmin")
+
+
+def create_fastapi_app(include_ui: bool = True) -> FastAPI:
+    """应用工厂：前台界面立即构建，管理后台在第一次访问时构建
+
+    include_ui=False 时只包含无状态的 /api/* 等路由，可以运行多个 worker（见 api_app）。
+    """
+    client_blocks = build_client_app() if include_ui else None
 
     # 创建 FastAPI 应用（使用 APIRouter 来保护自定义路由）
     from fastapi import APIRouter
 
     api_router = APIRouter()
 
+    @api_router.get("/healthz")
+    async def healthz():
+        """存活探针：只说明进程在运行，不访问数据库"""
+        return HEALTH_MONITOR.liveness()
+
+    @api_router.get("/readyz")
+    async def readyz():
+        """就绪探针：返回后台线程缓存的检查结果"""
+        readiness = HEALTH_MONITOR.readiness()
+        return JSONResponse(readiness, status_code=200 if readiness["ready"] else 503)
+
     @api_router.get("/version")
     async def version_check():
-        import subprocess
-        try:
-            commit = subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
-                                            stderr=subprocess.DEVNULL).decode().strip()
-        except:
-            commit = "unknown"
-        return {
-            "version": "2.0",
-            "commit": commit,
-            "admin_login_fix": "2024-09-30-v5",
-            "status": "ok"
-        }
+        return RUNTIME_INFO.version()
+
+    @api_router.get("/api/runtime")
+    async def runtime_status(x_admin_password: str = Header(default="")):
+        """构建信息与进程运行时状态（供监控面板使用，需在 X-Admin-Password 请求头中提供后台口令）"""
+        _require_admin_password(x_admin_password)
+        runtime = RUNTIME_INFO.runtime()
+        runtime["activation_backend"] = type(ACTIVATION_MANAGER._manager).__name__
+        return runtime
+
+    @api_router.get("/metrics")
+    async def metrics_endpoint():
+        """Prometheus 指标"""
+        return PlainTextResponse(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
 
     @api_router.get("/api/check_codes")
     async def check_codes():
-        """检查激活码数据"""
-        rows = build_codes_table_rows()
+        """检查激活码数据（仅返回最新的一页激活码）"""
+        count = await ASYNC_ACTIVATION_MANAGER.count_codes()
+        infos = await ASYNC_ACTIVATION_MANAGER.list_codes(limit=CHECK_CODES_LIMIT)
         return {
-            "count": len(rows),
-            "codes": [row[0] for row in rows] if rows else []
+            "count": count,
+            "codes": [info["code"] for info in infos]
         }
 
-    @api_router.post("/api/restore_codes")
-    async def restore_codes():
-        """一键恢复用户原有激活码（临时端点）"""
-        import subprocess
-        import sys
+    @api_router.get("/api/export_codes")
+    async def export_codes(
+        format: str = "csv",
+        status: Optional[str] = None,
+        x_admin_password: str = Header(default=""),
+    ):
+        """流式导出激活码与用量（需在 X-Admin-Password 请求头中提供后台口令）"""
+        _require_admin_password(x_admin_password)
+        if format not in EXPORT_FORMATS:
+            raise HTTPException(status_code=400, detail=f"不支持的导出格式：{format}")
+        try:
+            chunks = iter_export(ACTIVATION_MANAGER, format, status or None)
+        except ActivationError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+        filename = datetime.datetime.now().strftime(f"activation-codes-%Y%m%d-%H%M%S.{format}")
+        return StreamingResponse(
+            chunks,
+            media_type=EXPORT_MEDIA_TYPES[format],
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        )
 
+    # REST 合成接口：与界面共用额度、限流、音色库、结果缓存与 CLONE_SLOTS 并发名额
+    async def run_api_synthesis(
+        code: str,
+        text: str,
+        options: Dict[str, Any],
+        uploads: Dict[str, Optional[UploadFile]],
+        **kwargs: Any,
+    ) -> FileResponse:
+        paths: Dict[str, Optional[str]] = {}
         try:
-            # 执行恢复脚本
-            result = subprocess.run(
-                [sys.executable, "restore_codes.py"],
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
+            for name, upload in uploads.items():
+                paths[name] = await _save_upload(upload, "情感参考音频" if name == "emotion_audio" else "参考音频")
+            if paths.get("emotion_audio"):
+                kwargs["emotion_mode"] = EMOTION_MODE_OPTIONS[1]
+            elif kwargs.get("emotion_vector"):
+                kwargs["emotion_mode"] = EMOTION_MODE_OPTIONS[2]
+            elif kwargs.get("emotion_text"):
+                kwargs["emotion_mode"] = EMOTION_MODE_OPTIONS[3]
+            result = await run_in_threadpool(_api_synthesize, code, text, options, **paths, **kwargs)
+        finally:
+            for path in paths.values():
+                if path:
+                    os.unlink(path)
+        return _api_audio_response(result, options["response_format"])
+
+    @api_router.post("/api/v1/clone")
+    async def api_clone(
+        text: str = Form(...),
+        reference_audio: Optional[UploadFile] = File(default=None),
+        voice_uri: str = Form(default=""),
+        voice_name: str = Form(default=""),
+        preset: str = Form(default=DEFAULT_PRESET),
+        speed: float = Form(default=config.DEFAULT_SPEED),
+        pitch: float = Form(default=config.DEFAULT_PITCH),
+        volume: float = Form(default=config.DEFAULT_VOLUME),
+        response_format: str = Form(default="mp3"),
+        emotion_audio: Optional[UploadFile] = File(default=None),
+        emotion_vector: str = Form(default=""),
+        emotion_text: str = Form(default=""),
+        x_activation_code: str = Header(default=""),
+    ):
+        """上传参考音频克隆并合成；提供 voice_uri 时直接使用已有音色。返回音频文件"""
+        code = _api_activation_code(x_activation_code)
+        options = _api_options(preset, speed, pitch, volume, response_format)
+        return await run_api_synthesis(
+            code,
+            text,
+            options,
+            {"reference_audio": reference_audio, "emotion_audio": emotion_audio},
+            use_saved_voice=bool(voice_uri.strip()),
+            saved_voice_uri=voice_uri,
+            custom_voice_name=voice_name,
+            emotion_vector=_parse_emotion_vector(emotion_vector),
+            emotion_text=emotion_text,
+        )
+
+    @api_router.post("/api/v1/tts")
+    async def api_tts(
+        text: str = Form(...),
+        voice_uri: str = Form(default=""),
+        preset: str = Form(default=DEFAULT_PRESET),
+        speed: float = Form(default=config.DEFAULT_SPEED),
+        pitch: float = Form(default=config.DEFAULT_PITCH),
+        volume: float = Form(default=config.DEFAULT_VOLUME),
+        response_format: str = Form(default="mp3"),
+        emotion_audio: Optional[UploadFile] = File(default=None),
+        emotion_vector: str = Form(default=""),
+        emotion_text: str = Form(default=""),
+        x_activation_code: str = Header(default=""),
+    ):
+        """使用音色库中的音色合成；不指定 voice_uri 时使用最近使用的音色"""
+        code = _api_activation_code(x_activation_code)
+        options = _api_options(preset, speed, pitch, volume, response_format)
+        return await run_api_synthesis(
+            code,
+            text,
+            options,
+            {"emotion_audio": emotion_audio},
+            use_saved_voice=True,
+            saved_voice_uri=voice_uri,
+            emotion_vector=_parse_emotion_vector(emotion_vector),
+            emotion_text=emotion_text,
+        )
 
-            if result.returncode == 0:
-                return {
-                    "success": True,
-                    "message": "激活码恢复成功",
-                    "output": result.stdout,
-                    "codes": ["63R6LT28W9JIAXGN", "ZDPJ0A2NRWMDY0BO"]
-                }
-            else:
-                return {
-                    "success": False,
-                    "message": "恢复失败",
-                    "error": result.stderr
-                }
-
-        except Exception as e:
-            return {
-                "success": False,
-                "message": f"执行出错: {str(e)}"
-            }
+    @api_router.get("/api/v1/voices")
+    async def api_voices(x_activation_code: str = Header(default="")):
+        """列出激活码音色库中的音色（最近使用的在前）"""
+        code = _api_activation_code(x_activation_code)
+        info = await ASYNC_ACTIVATION_MANAGER.get_code_info(code)
+        if not info:
+            raise HTTPException(status_code=401, detail="激活码无效或已被移除")
+        return {"voices": await run_in_threadpool(ACTIVATION_MANAGER.list_voices, code)}
+
+    @api_router.websocket("/api/v1/stream")
+    async def api_stream(websocket: WebSocket):
+        """流式合成：边接收文本边按句合成并推送音频，协议见 run_stream_session"""
+        await websocket.accept()
+        await run_stream_session(websocket)
 
     @api_router.get("/manifest.json")
     async def frontend_manifest():
@@ -1459,10 +2525,24 @@ def create_fastapi_app() -> FastAPI:
     main_app = FastAPI()
     main_app.include_router(api_router)
 
-    # 挂载管理后台子应用
-    admin_sub_app = FastAPI(root_path="/azttsadmin")
-    admin_sub_app = gr.mount_gradio_app(admin_sub_app, admin_blocks, path="/", root_path="/azttsadmin")
-    main_app.mount("/azttsadmin", admin_sub_app)
+    @main_app.on_event("startup")
+    async def start_background_tasks():
+        # 健康检查线程的第一次检查会初始化存储；API 状态检查需要访问外网，同样放到后台
+        HEALTH_MONITOR.start()
+        threading.Thread(target=_log_api_status, name="api-status", daemon=True).start()
+
+    @main_app.on_event("shutdown")
+    async def close_activation_manager():
+        HEALTH_MONITOR.stop()
+        POSTPROCESS_POOL.shutdown()
+        if is_initialized(ASYNC_ACTIVATION_MANAGER):
+            await ASYNC_ACTIVATION_MANAGER.close()
+
+    if client_blocks is None:
+        return main_app
+
+    # 挂载管理后台子应用（很少访问，第一次请求时再构建）
+    main_app.mount("/azttsadmin", LazyASGIApp(_create_admin_sub_app, "admin_app"))
 
     # 最后挂载前台应用（使用根路径）
     main_app = gr.mount_gradio_app(main_app, client_blocks, path="/")
@@ -1470,23 +2550,57 @@ def create_fastapi_app() -> FastAPI:
     return main_app
 
 
-fastapi_app = create_fastapi_app()
+# app:fastapi_app 为完整应用；app:api_app 不含 Gradio 界面与管理后台，可以多 worker 运行
+_APP_FACTORIES = {"fastapi_app": create_fastapi_app, "api_app": functools.partial(create_fastapi_app, include_ui=False)}
+_apps: Dict[str, FastAPI] = {}
+_fastapi_app_lock = threading.Lock()
+
+
+def __getattr__(name: str) -> Any:
+    """app:fastapi_app / app:api_app 在第一次访问时才构建（uvicorn / gunicorn 导入时）"""
+    if name not in _APP_FACTORIES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    with _fastapi_app_lock:
+        if name not in _apps:
+            _apps[name] = _APP_FACTORIES[name]()
+    return _apps[name]
+
 
 if __name__ == "__main__":
     import os
-    print("正在启动阿左声音克隆产品 2.0...")
-    print(f"[DEBUG] APP_HOST from os.getenv: {os.getenv('APP_HOST', 'NOT_SET')}")
-    print(f"[DEBUG] APP_PORT from os.getenv: {os.getenv('APP_PORT', 'NOT_SET')}")
-    print(f"[DEBUG] config.APP_HOST: {config.APP_HOST}")
-    print(f"[DEBUG] config.APP_PORT: {config.APP_PORT}")
-    status_message = refresh_api_status()
-    print(status_message)
-    print("用户访问入口：http://{0}:{1}/".format(config.APP_HOST, config.APP_PORT))
-    print("后台管理入口：http://{0}:{1}/azttsadmin".format(config.APP_HOST, config.APP_PORT))
-
-    uvicorn.run(
-        fastapi_app,
-        host=config.APP_HOST,
-        port=config.APP_PORT,
-        log_level="info",
-    )
+    logger.info("正在启动阿左声音克隆产品 2.0...")
+    logger.debug("APP_HOST from os.getenv: %s", os.getenv("APP_HOST", "NOT_SET"))
+    logger.debug("APP_PORT from os.getenv: %s", os.getenv("APP_PORT", "NOT_SET"))
+    logger.debug("config.APP_HOST: %s, config.APP_PORT: %s", config.APP_HOST, config.APP_PORT)
+    logger.info("用户访问入口：http://%s:%s/", config.APP_HOST, config.APP_PORT)
+    logger.info("后台管理入口：http://%s:%s/azttsadmin", config.APP_HOST, config.APP_PORT)
+
+    # log_config=None：uvicorn 不再单独配置日志，访问日志也走上面的异步队列
+    log_level = logging.getLevelName(logging.getLogger().level).lower()
+    if config.APP_WORKERS > 1:
+        # Gradio 的排队与事件流状态只存在于单个进程中：界面（含 /api/*）在 APP_PORT 上单进程运行，
+        # 无状态的 /api/* 在 APP_API_PORT 上多 worker 运行，由反向代理把 /api/ 转发过去，无需会话保持
+        ui_server = uvicorn.Server(uvicorn.Config(
+            create_fastapi_app(), host=config.APP_HOST, port=config.APP_PORT,
+            log_level=log_level, log_config=None,
+        ))
+        threading.Thread(target=ui_server.run, name="ui-server", daemon=True).start()
+        logger.info("多进程接口入口：http://%s:%s/api/（%s 个 worker）",
+                    config.APP_HOST, config.APP_API_PORT, config.APP_WORKERS)
+        # 多 worker 时 uvicorn 需要以导入路径加载应用，每个 worker 各自创建一份
+        uvicorn.run(
+            "app:api_app",
+            host=config.APP_HOST,
+            port=config.APP_API_PORT,
+            workers=config.APP_WORKERS,
+            log_level=log_level,
+            log_config=None,
+        )
+    else:
+        uvicorn.run(
+            create_fastapi_app(),
+            host=config.APP_HOST,
+            port=config.APP_PORT,
+            log_level=log_level,
+            log_config=None,
+        )
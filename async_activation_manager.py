@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+激活码管理器的异步接口，供 FastAPI 的 async 路由使用
+
+- PostgreSQL 且安装了 asyncpg：热点查询直接走 asyncpg 连接池（自动使用服务端预备语句），
+  其余操作放到线程池中调用同步管理器；
+- JSON 文件存储或未安装 asyncpg：所有调用都放到专用线程池执行，不阻塞事件循环。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import logging
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Protocol, Tuple
+
+from activation_manager import ActivationError
+from db_activation_manager import PREPARED_STATEMENTS
+
+try:
+    import asyncpg
+    ASYNCPG_AVAILABLE = True
+except ImportError:
+    ASYNCPG_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+ASYNC_STORE_WORKERS = int(os.getenv("ASYNC_STORE_WORKERS", "8"))
+ASYNCPG_POOL_MIN = int(os.getenv("ASYNCPG_POOL_MIN", "1"))
+ASYNCPG_POOL_MAX = int(os.getenv("ASYNCPG_POOL_MAX", "10"))
+
+
+class AsyncActivationManager(Protocol):
+    """异步激活码管理器接口，方法与同步管理器一一对应"""
+
+    async def get_code_info(self, code: str) -> Optional[Dict[str, Any]]: ...
+
+    async def list_codes(self, offset: int = 0, limit: Optional[int] = None, **filters: Any) -> List[Dict[str, Any]]: ...
+
+    async def count_codes(self, **filters: Any) -> int: ...
+
+    async def ensure_quota(self, code: str, required_characters: int,
+                           needs_new_voice: bool) -> Tuple[bool, str, Optional[Dict[str, Any]]]: ...
+
+    async def record_usage(self, code: str, characters: int, created_voice: bool) -> Dict[str, Any]: ...
+
+    async def create_codes(self, count: int, template: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]: ...
+
+    async def import_codes(self, records: Iterable[Dict[str, Any]]) -> Tuple[List[str], List[str]]: ...
+
+    async def update_code(self, code: str, **changes: Any) -> Dict[str, Any]: ...
+
+    async def close(self) -> None: ...
+
+
+class ThreadedAsyncActivationManager:
+    """把同步管理器的调用放到专用线程池执行"""
+
+    def __init__(self, manager, max_workers: int = ASYNC_STORE_WORKERS):
+        self.manager = manager
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="activation-store")
+
+    async def _run(self, method: str, *args: Any, **kwargs: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        call = functools.partial(getattr(self.manager, method), *args, **kwargs)
+        return await loop.run_in_executor(self._executor, call)
+
+    async def get_code_info(self, code: str) -> Optional[Dict[str, Any]]:
+        return await self._run("get_code_info", code)
+
+    async def list_codes(self, offset: int = 0, limit: Optional[int] = None, **filters: Any) -> List[Dict[str, Any]]:
+        return await self._run("list_codes", offset, limit, **filters)
+
+    async def count_codes(self, **filters: Any) -> int:
+        return await self._run("count_codes", **filters)
+
+    async def ensure_quota(self, code: str, required_characters: int,
+                           needs_new_voice: bool) -> Tuple[bool, str, Optional[Dict[str, Any]]]:
+        return await self._run("ensure_quota", code, required_characters, needs_new_voice)
+
+    async def record_usage(self, code: str, characters: int, created_voice: bool) -> Dict[str, Any]:
+        return await self._run("record_usage", code, characters, created_voice)
+
+    async def create_codes(self, count: int, template: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        return await self._run("create_codes", count, template)
+
+    async def import_codes(self, records: Iterable[Dict[str, Any]]) -> Tuple[List[str], List[str]]:
+        return await self._run("import_codes", list(records))
+
+    async def update_code(self, code: str, **changes: Any) -> Dict[str, Any]:
+        return await self._run("update_code", code, **changes)
+
+    async def close(self) -> None:
+        self._executor.shutdown(wait=False)
+
+
+def _to_dollar_params(query: str) -> str:
+    """把 psycopg2 的 %s 占位符转换为 asyncpg 的 $1, $2, ..."""
+    counter = iter(range(1, query.count("%s") + 1))
+    return re.sub(r"%s", lambda _: f"${next(counter)}", query)
+
+
+class AsyncpgActivationManager(ThreadedAsyncActivationManager):
+    """PostgreSQL 的 asyncpg 实现；写入类的低频操作仍复用同步管理器"""
+
+    def __init__(self, manager, max_workers: int = ASYNC_STORE_WORKERS):
+        super().__init__(manager, max_workers)
+        self._pool = None
+        self._pool_lock: Optional[asyncio.Lock] = None
+
+    async def _get_pool(self):
+        # 连接池必须在服务所在的事件循环中创建，因此延迟到第一次调用
+        if self._pool is None:
+            if self._pool_lock is None:
+                self._pool_lock = asyncio.Lock()
+            async with self._pool_lock:
+                if self._pool is None:
+                    self._pool = await asyncpg.create_pool(
+                        self.manager.database_url,
+                        min_size=ASYNCPG_POOL_MIN,
+                        max_size=ASYNCPG_POOL_MAX,
+                    )
+        return self._pool
+
+    async def _fetchrow(self, statement: str, *params: Any) -> Optional[Dict[str, Any]]:
+        pool = await self._get_pool()
+        row = await pool.fetchrow(statement, *params)
+        return dict(row) if row else None
+
+    async def get_code_info(self, code: str) -> Optional[Dict[str, Any]]:
+        code = (code or "").upper()
+        if not code:
+            return None
+        row = await self._fetchrow(PREPARED_STATEMENTS["ac_get_code"][1], code)
+        return self.manager._build_info(row) if row else None
+
+    async def list_codes(self, offset: int = 0, limit: Optional[int] = None, **filters: Any) -> List[Dict[str, Any]]:
+        query, params = self.manager.build_list_query(offset, limit, **filters)
+        pool = await self._get_pool()
+        rows = await pool.fetch(_to_dollar_params(query), *params)
+        return [self.manager._build_info(dict(row)) for row in rows]
+
+    async def count_codes(self, **filters: Any) -> int:
+        query, params = self.manager.build_count_query(**filters)
+        pool = await self._get_pool()
+        return int(await pool.fetchval(_to_dollar_params(query), *params))
+
+    async def ensure_quota(self, code: str, required_characters: int,
+                           needs_new_voice: bool) -> Tuple[bool, str, Optional[Dict[str, Any]]]:
+        code = (code or "").upper()
+        if not code:
+            return False, "激活码不存在或已被删除。", None
+        row = await self._fetchrow(
+            PREPARED_STATEMENTS["ac_check_quota"][1],
+            code,
+            max(int(required_characters), 0),
+            bool(needs_new_voice),
+        )
+        return self.manager.evaluate_quota_row(row)
+
+    async def record_usage(self, code: str, characters: int, created_voice: bool) -> Dict[str, Any]:
+        row = await self._fetchrow(
+            PREPARED_STATEMENTS["ac_record_usage"][1],
+            (code or "").upper(),
+            max(int(characters), 0),
+            bool(created_voice),
+        )
+        if not row:
+            raise ActivationError("激活码不存在。")
+        return self.manager._build_info(row)
+
+    async def close(self) -> None:
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+        await super().close()
+
+
+def create_async_activation_manager(manager) -> AsyncActivationManager:
+    """根据同步管理器的类型选择异步实现"""
+    database_url = getattr(manager, "database_url", None)
+    if database_url and ASYNCPG_AVAILABLE:
+        logger.info("异步路由使用 asyncpg 连接池")
+        return AsyncpgActivationManager(manager)
+    return ThreadedAsyncActivationManager(manager)
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+合成结果的本地后处理
+
+对已经生成的音频重新导出：在 config.SUPPORTED_AUDIO_FORMATS 之间转码、
+响度标准化、调整音量与语速（保持音调的时间伸缩），不再请求上游、不消耗额度。
+
+转码依赖 ffmpeg，在独立的进程池中执行，并发数由 POSTPROCESS_WORKERS 限制，
+避免大量转码占满 Web 进程的 CPU。
+"""
+
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import os
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import List, Optional
+
+import config
+from audio_preprocess import FFMPEG_PATH
+
+logger = logging.getLogger(__name__)
+
+POSTPROCESS_TIMEOUT = 120
+# 目标响度（EBU R128），适合语音播放
+LOUDNORM_FILTER = "loudnorm=I=-16:TP=-1.5:LRA=11"
+FORMAT_CODECS = {
+    "mp3": ["-c:a", "libmp3lame", "-q:a", "2"],
+    "wav": ["-c:a", "pcm_s16le"],
+    "ogg": ["-c:a", "libvorbis", "-q:a", "5"],
+    "flac": ["-c:a", "flac"],
+}
+
+
+@dataclass(frozen=True)
+class PostprocessOptions:
+    response_format: str = "mp3"
+    volume: float = 1.0
+    speed: float = 1.0
+    normalize: bool = False
+
+    def filters(self) -> List[str]:
+        filters: List[str] = []
+        if self.normalize:
+            filters.append(LOUDNORM_FILTER)
+        if abs(self.volume - 1.0) > 1e-3:
+            filters.append(f"volume={self.volume:.3f}")
+        filters.extend(_atempo_chain(self.speed))
+        return filters
+
+
+def _atempo_chain(speed: float) -> List[str]:
+    """atempo 单级只支持 0.5~2.0 倍，超出范围时串联多级"""
+    if abs(speed - 1.0) < 1e-3 or speed <= 0:
+        return []
+    chain: List[str] = []
+    while speed > 2.0:
+        chain.append("atempo=2.0")
+        speed /= 2.0
+    while speed < 0.5:
+        chain.append("atempo=0.5")
+        speed /= 0.5
+    chain.append(f"atempo={speed:.4f}")
+    return chain
+
+
+def render(ffmpeg_path: str, source: str, options: PostprocessOptions) -> str:
+    """在进程池中执行：转码到临时文件并返回路径"""
+    handle, target = tempfile.mkstemp(prefix="export-", suffix=f".{options.response_format}")
+    os.close(handle)
+    command = [ffmpeg_path, "-hide_banner", "-loglevel", "error", "-nostdin", "-y", "-i", source, "-vn"]
+    filters = options.filters()
+    if filters:
+        command += ["-af", ",".join(filters)]
+    command += FORMAT_CODECS[options.response_format] + [target]
+    try:
+        subprocess.run(command, check=True, capture_output=True, timeout=POSTPROCESS_TIMEOUT)
+    except Exception:
+        os.unlink(target)
+        raise
+    return target
+
+
+class PostprocessPool:
+    """延迟创建的进程池；使用 spawn，避免在多线程的 Web 进程中 fork"""
+
+    def __init__(self, max_workers: int = config.POSTPROCESS_WORKERS):
+        self.max_workers = max_workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    def export(self, source: str, options: PostprocessOptions) -> str:
+        if not FFMPEG_PATH:
+            raise RuntimeError("服务器未安装 ffmpeg，无法转换音频。")
+        if options.response_format not in FORMAT_CODECS:
+            raise ValueError(f"不支持的输出格式：{options.response_format}")
+        future = self._get_executor().submit(render, FFMPEG_PATH, source, options)
+        return future.result(timeout=POSTPROCESS_TIMEOUT + 10)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+POSTPROCESS_POOL = PostprocessPool()
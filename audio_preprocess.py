@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+参考音频预处理
+
+上传前在本地解码参考音频：去掉首尾静音、截取到 REFERENCE_MAX_SECONDS、
+混合为单声道并重采样到模型采样率，再压缩编码。模型本身只使用参考音频的
+前 15 秒左右，上传原始的长 WAV/FLAC 只会浪费带宽和时间。
+
+    有 ffmpeg      支持所有常见格式，输出单声道 MP3
+    没有 ffmpeg    仅支持 16 位 PCM WAV（标准库实现），输出单声道 WAV
+    其他情况       返回 None，调用方直接上传原文件
+
+情感参考音频以 base64 放在合成请求中，EncodedAudioCache 按文件内容哈希缓存
+编码结果，同一段音频重复使用时不再重新处理。
+"""
+
+from __future__ import annotations
+
+import collections
+import hashlib
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import wave
+from array import array
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import config
+import metrics
+
+logger = logging.getLogger(__name__)
+
+FFMPEG_PATH = shutil.which(os.getenv("FFMPEG_BINARY", "ffmpeg"))
+FFMPEG_TIMEOUT = 60
+MP3_BITRATE = "64k"
+SILENCE_THRESHOLD_DB = -45.0
+SILENCE_PADDING_SECONDS = 0.1
+# 标准库实现最多读取的前导静音长度，避免把整段长音频读进内存
+MAX_LEADING_SILENCE_SECONDS = 10.0
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass
+class PreprocessedAudio:
+    path: str
+    mime_type: str
+    source_bytes: int
+    output_bytes: int
+    method: str
+    elapsed_ms: float
+
+    def cleanup(self) -> None:
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+
+def _run_ffmpeg(source: str, target: str, max_seconds: float, sample_rate: int) -> None:
+    trim = (
+        f"silenceremove=start_periods=1:start_threshold={SILENCE_THRESHOLD_DB}dB"
+        f":start_silence={SILENCE_PADDING_SECONDS}"
+    )
+    # 先去前导静音并截断，再反转去尾部静音；areverse 只需缓存截断后的片段
+    audio_filter = f"{trim},atrim=0:{max_seconds},areverse,{trim},areverse"
+    subprocess.run(
+        [
+            FFMPEG_PATH, "-hide_banner", "-loglevel", "error", "-nostdin", "-y",
+            "-i", source,
+            "-vn", "-af", audio_filter,
+            "-ac", "1", "-ar", str(sample_rate),
+            "-c:a", "libmp3lame", "-b:a", MP3_BITRATE,
+            target,
+        ],
+        check=True,
+        capture_output=True,
+        timeout=FFMPEG_TIMEOUT,
+    )
+
+
+def _silence_bounds(samples: array, rate: int) -> Tuple[int, int]:
+    """返回去掉首尾静音后的 [start, end) 下标（保留少量余量）"""
+    threshold = 32768 * 10 ** (SILENCE_THRESHOLD_DB / 20)
+    window = max(rate // 100, 1)
+    padding = int(rate * SILENCE_PADDING_SECONDS)
+    loud = [
+        index for index in range(0, len(samples), window)
+        if max(map(abs, samples[index:index + window])) > threshold
+    ]
+    if not loud:
+        return 0, len(samples)
+    return max(loud[0] - padding, 0), min(loud[-1] + window + padding, len(samples))
+
+
+def _resample(samples: array, source_rate: int, target_rate: int) -> array:
+    """线性插值重采样"""
+    if source_rate == target_rate or not samples:
+        return samples
+    step = source_rate / target_rate
+    last = len(samples) - 1
+    output = array("h", bytes(2 * int(len(samples) / step)))
+    for index in range(len(output)):
+        position = index * step
+        left = int(position)
+        right = min(left + 1, last)
+        fraction = position - left
+        output[index] = int(samples[left] + (samples[right] - samples[left]) * fraction)
+    return output
+
+
+def _process_wav(source: str, target: str, max_seconds: float, sample_rate: int) -> bool:
+    with wave.open(source, "rb") as reader:
+        channels = reader.getnchannels()
+        width = reader.getsampwidth()
+        rate = reader.getframerate()
+        if width != 2:
+            return False
+        frames = reader.readframes(int(rate * (max_seconds + MAX_LEADING_SILENCE_SECONDS)))
+
+    samples = array("h")
+    samples.frombytes(frames[: len(frames) - len(frames) % 2])
+    if sys.byteorder == "big":
+        samples.byteswap()
+    if channels > 1:
+        samples = array("h", (sum(group) // channels for group in zip(*(samples[c::channels] for c in range(channels)))))
+
+    start, end = _silence_bounds(samples, rate)
+    samples = samples[start:min(end, start + int(rate * max_seconds))]
+    samples = _resample(samples, rate, sample_rate)
+    if sys.byteorder == "big":
+        samples.byteswap()
+
+    with wave.open(target, "wb") as writer:
+        writer.setnchannels(1)
+        writer.setsampwidth(2)
+        writer.setframerate(sample_rate)
+        writer.writeframes(samples.tobytes())
+    return True
+
+
+def preprocess_reference_audio(
+    source: str,
+    max_seconds: float = config.REFERENCE_MAX_SECONDS,
+    sample_rate: int = config.REFERENCE_SAMPLE_RATE,
+) -> Optional[PreprocessedAudio]:
+    """处理失败或不支持时返回 None；成功时调用方负责 cleanup() 临时文件"""
+    if not config.REFERENCE_PREPROCESS:
+        return None
+    start = time.perf_counter()
+    if FFMPEG_PATH:
+        method, suffix, mime_type = "ffmpeg", ".mp3", "audio/mpeg"
+    elif source.lower().endswith(".wav"):
+        method, suffix, mime_type = "wave", ".wav", "audio/wav"
+    else:
+        return None
+
+    handle, target = tempfile.mkstemp(prefix="reference-", suffix=suffix)
+    os.close(handle)
+    try:
+        if method == "ffmpeg":
+            _run_ffmpeg(source, target, max_seconds, sample_rate)
+        elif not _process_wav(source, target, max_seconds, sample_rate):
+            os.unlink(target)
+            return None
+    except (OSError, EOFError, wave.Error, subprocess.SubprocessError) as exc:
+        logger.warning("参考音频预处理失败，改为上传原文件：%s", exc)
+        os.unlink(target)
+        return None
+
+    result = PreprocessedAudio(
+        path=target,
+        mime_type=mime_type,
+        source_bytes=os.path.getsize(source),
+        output_bytes=os.path.getsize(target),
+        method=method,
+        elapsed_ms=round((time.perf_counter() - start) * 1000, 1),
+    )
+    if result.output_bytes <= 44:
+        # 全是静音或解码结果为空
+        result.cleanup()
+        return None
+    logger.info(
+        "参考音频预处理完成：%s 字节 -> %s 字节（%s，%.0f ms）",
+        result.source_bytes, result.output_bytes, method, result.elapsed_ms,
+    )
+    return result
+
+
+def file_digest(path: str) -> str:
+    """文件内容的 SHA-256，分块读取"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for block in iter(lambda: handle.read(HASH_CHUNK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def preprocess_settings_key() -> str:
+    """预处理参数变化时缓存键随之变化"""
+    method = "ffmpeg" if FFMPEG_PATH else "wave"
+    enabled = int(config.REFERENCE_PREPROCESS)
+    return f"{enabled}:{method}:{config.REFERENCE_MAX_SECONDS}:{config.REFERENCE_SAMPLE_RATE}"
+
+
+class EncodedAudioCache:
+    """按内容哈希缓存 base64 编码结果，超过 max_bytes 时淘汰最久未使用的条目"""
+
+    def __init__(self, name: str, max_bytes: int):
+        self.name = name
+        self.max_bytes = max_bytes
+        self._entries: "collections.OrderedDict[str, str]" = collections.OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+        metrics.record_cache(self.name, value is not None)
+        return value
+
+    def put(self, key: str, value: str) -> None:
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[key] = value
+            self._size += len(value)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+请求预检
+
+在上传参考音频、请求合成之前先在本地检查，明显无效的请求直接返回错误，
+不再等上游报错：
+
+    文件头        是否为支持的音频格式（mp3 / wav / m4a / ogg / flac）
+    解码          能否解码（损坏或编码不支持）
+    时长          是否过短
+    音量          整体是否接近静音、有效人声片段是否过少
+    文本          长度是否超过上限
+
+解码只取前 VALIDATION_MAX_SECONDS 秒、16 kHz 单声道，耗时通常在 100 ms 以内。
+没有 ffmpeg 时只对 WAV 做解码检查，其他格式只检查文件头。
+"""
+
+from __future__ import annotations
+
+import math
+import subprocess
+import sys
+import wave
+from array import array
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import config
+from audio_preprocess import FFMPEG_PATH
+
+VALIDATION_SAMPLE_RATE = 16000
+VALIDATION_MAX_SECONDS = 30
+VALIDATION_TIMEOUT = 20
+WINDOW_SECONDS = 0.02
+SILENT_RMS_DB = -50.0        # 整体 RMS 低于此值视为静音
+VOICED_WINDOW_DB = -40.0     # 窗口 RMS 高于此值视为有声
+HEADER_BYTES = 12
+
+# 文件头特征 -> 格式
+AUDIO_SIGNATURES = (
+    (0, b"RIFF", "wav"),
+    (0, b"ID3", "mp3"),
+    (0, b"OggS", "ogg"),
+    (0, b"fLaC", "flac"),
+    (4, b"ftyp", "m4a"),
+)
+
+
+class ValidationError(ValueError):
+    """预检不通过；消息可直接展示给用户"""
+
+
+@dataclass
+class AudioStats:
+    format: str
+    duration: float
+    rms_db: float
+    voiced_ratio: float
+
+
+def sniff_format(path: str) -> Optional[str]:
+    with open(path, "rb") as handle:
+        header = handle.read(HEADER_BYTES)
+    for offset, signature, name in AUDIO_SIGNATURES:
+        if header[offset:offset + len(signature)] == signature:
+            return name
+    # 不带 ID3 标签的 MP3 直接以帧同步字开头
+    if len(header) >= 2 and header[0] == 0xFF and header[1] & 0xE0 == 0xE0:
+        return "mp3"
+    return None
+
+
+def _decode_ffmpeg(path: str) -> array:
+    result = subprocess.run(
+        [
+            FFMPEG_PATH, "-hide_banner", "-loglevel", "error", "-nostdin",
+            "-t", str(VALIDATION_MAX_SECONDS), "-i", path,
+            "-vn", "-ac", "1", "-ar", str(VALIDATION_SAMPLE_RATE), "-f", "s16le", "-",
+        ],
+        capture_output=True,
+        timeout=VALIDATION_TIMEOUT,
+    )
+    if result.returncode != 0:
+        detail = result.stderr.decode("utf-8", "replace").strip().splitlines()
+        raise ValidationError(f"无法解码：{detail[-1] if detail else '未知错误'}")
+    samples = array("h")
+    samples.frombytes(result.stdout[: len(result.stdout) - len(result.stdout) % 2])
+    if sys.byteorder == "big":
+        samples.byteswap()
+    return samples
+
+
+def _decode_wav(path: str) -> Tuple[Optional[array], int]:
+    """返回 (样本, 采样率)；多声道只取第一个声道"""
+    try:
+        with wave.open(path, "rb") as reader:
+            channels = reader.getnchannels()
+            rate = reader.getframerate()
+            if reader.getsampwidth() != 2:
+                return None, rate
+            frames = reader.readframes(rate * VALIDATION_MAX_SECONDS)
+    except (wave.Error, EOFError) as exc:
+        raise ValidationError(f"无法解码：{exc}")
+    samples = array("h")
+    samples.frombytes(frames[: len(frames) - len(frames) % 2])
+    if sys.byteorder == "big":
+        samples.byteswap()
+    return samples[::channels], rate
+
+
+def _to_db(value: float) -> float:
+    return 20 * math.log10(value / 32768) if value > 0 else -120.0
+
+
+def measure(samples: array, rate: int) -> Tuple[float, float]:
+    """返回 (整体 RMS dBFS, 有声窗口比例)"""
+    window = max(int(rate * WINDOW_SECONDS), 1)
+    voiced_threshold = 32768 * 10 ** (VOICED_WINDOW_DB / 20)
+    total_energy = 0.0
+    windows = voiced = 0
+    for start in range(0, len(samples), window):
+        chunk = samples[start:start + window]
+        energy = sum(value * value for value in chunk)
+        total_energy += energy
+        windows += 1
+        if math.sqrt(energy / len(chunk)) > voiced_threshold:
+            voiced += 1
+    if not windows:
+        return -120.0, 0.0
+    return _to_db(math.sqrt(total_energy / len(samples))), voiced / windows
+
+
+def inspect_audio(path: str) -> Optional[AudioStats]:
+    """检查文件头并解码统计；无法解码统计时（缺少 ffmpeg）返回 None"""
+    audio_format = sniff_format(path)
+    if audio_format is None:
+        raise ValidationError("不是支持的音频格式（请使用 mp3 / wav / m4a / ogg / flac）")
+    if FFMPEG_PATH:
+        samples, rate = _decode_ffmpeg(path), VALIDATION_SAMPLE_RATE
+    elif audio_format == "wav":
+        samples, rate = _decode_wav(path)
+        if samples is None:
+            return None
+    else:
+        return None
+    rms_db, voiced_ratio = measure(samples, rate)
+    return AudioStats(audio_format, len(samples) / rate if rate else 0.0, rms_db, voiced_ratio)
+
+
+def validate_reference_audio(path: str, label: str = "参考音频") -> Optional[AudioStats]:
+    """不通过时抛出 ValidationError"""
+    try:
+        stats = inspect_audio(path)
+    except ValidationError as exc:
+        raise ValidationError(f"{label}{exc}。")
+    except (OSError, subprocess.SubprocessError) as exc:
+        raise ValidationError(f"读取{label}失败：{exc}")
+    if stats is None:
+        return None
+    if stats.duration < config.MIN_REFERENCE_SECONDS:
+        raise ValidationError(
+            f"{label}太短（{stats.duration:.1f} 秒），请提供至少 {config.MIN_REFERENCE_SECONDS:g} 秒的清晰人声。"
+        )
+    if stats.rms_db < SILENT_RMS_DB:
+        raise ValidationError(f"{label}几乎没有声音，请检查录音音量。")
+    if stats.voiced_ratio < config.MIN_VOICED_RATIO:
+        raise ValidationError(f"{label}中有效人声过少（{stats.voiced_ratio:.0%}），请去掉长时间的静音后重试。")
+    return stats
+
+
+def validate_text(text: str) -> None:
+    if len(text) > config.MAX_TEXT_CHARACTERS:
+        raise ValidationError(
+            f"合成文本过长（{len(text)} 字），单次最多 {config.MAX_TEXT_CHARACTERS} 字，请分段合成。"
+        )
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+激活码存储后端微基准
+
+在 100 / 10k / 100k 个激活码规模下，测量 ActivationManager（JSON 文件）与
+DatabaseActivationManager（PostgreSQL，设置了 DATABASE_URL 时）的
+get_code_info / ensure_quota / record_usage / create_code / list_codes 单次耗时。
+
+    python benchmarks/activation_backends.py -o before.json
+    # ……修改代码后……
+    python benchmarks/activation_backends.py -o after.json --compare before.json
+
+--compare 会逐项对比 p50，任一项变慢超过 --threshold 倍时以退出码 1 结束，
+可直接用于 CI。PostgreSQL 请使用本地空库（不要指向生产库），基准数据带
+唯一备注，结束后删除。
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from activation_manager import ActivationManager  # noqa: E402
+
+BENCHMARK_NOTE = f"benchmark-{os.getpid()}-{int(time.time())}"
+DEFAULT_SIZES = "100,10000,100000"
+OPERATIONS = ("get_code_info", "ensure_quota", "record_usage", "create_code", "list_codes")
+
+
+def measure(func: Callable[[], object], iterations: int, max_seconds: float, warmup: int = 5) -> Dict[str, float]:
+    """单次耗时统计（微秒）；超过 max_seconds 时提前结束，避免慢操作拖长基准"""
+    for _ in range(warmup):
+        func()
+    samples: List[float] = []
+    deadline = time.perf_counter() + max_seconds
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        end = time.perf_counter()
+        samples.append((end - start) * 1_000_000)
+        if end > deadline:
+            break
+    samples.sort()
+    return {
+        "iterations": len(samples),
+        "mean_us": round(statistics.fmean(samples), 1),
+        "p50_us": round(samples[len(samples) // 2], 1),
+        "p95_us": round(samples[max(int(len(samples) * 0.95) - 1, 0)], 1),
+        "p99_us": round(samples[max(int(len(samples) * 0.99) - 1, 0)], 1),
+    }
+
+
+def operations(manager: Any, codes: List[str]) -> Dict[str, Callable[[], object]]:
+    # 轮流访问不同激活码，避免只测到同一条记录
+    cycle = iter(range(sys.maxsize))
+
+    def next_code() -> str:
+        return codes[next(cycle) % len(codes)]
+
+    return {
+        "get_code_info": lambda: manager.get_code_info(next_code()),
+        "ensure_quota": lambda: manager.ensure_quota(next_code(), 10, False),
+        "record_usage": lambda: manager.record_usage(next_code(), 1, False),
+        "create_code": lambda: manager.create_code(0, 0, None, BENCHMARK_NOTE),
+        "list_codes": lambda: manager.list_codes(limit=50),
+    }
+
+
+def backends(workdir: Path) -> Iterator[Tuple[str, Any, Callable[[], None]]]:
+    yield "json", ActivationManager(workdir / "activation_codes.json"), lambda: None
+
+    database_url = os.getenv("DATABASE_URL")
+    if database_url:
+        from db_activation_manager import DatabaseActivationManager
+
+        manager = DatabaseActivationManager(database_url)
+
+        def cleanup() -> None:
+            with manager._get_connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute("DELETE FROM activation_codes WHERE note = %s", (BENCHMARK_NOTE,))
+            manager.close()
+
+        yield "postgresql", manager, cleanup
+
+
+def run(sizes: List[int], iterations: int, max_seconds: float) -> Dict[str, Any]:
+    results: Dict[str, Dict[str, Dict[str, Dict[str, float]]]] = {}
+    with tempfile.TemporaryDirectory(prefix="azvoice-bench-") as workdir:
+        for backend, manager, cleanup in backends(Path(workdir)):
+            codes: List[str] = []
+            try:
+                # 逐级补足到目标规模，复用上一级已写入的数据
+                for size in sorted(sizes):
+                    missing = size - len(codes)
+                    if missing > 0:
+                        infos = manager.create_codes(missing, {"note": BENCHMARK_NOTE})
+                        codes.extend(info["code"] for info in infos)
+                    print(f"[{backend}] {size} 个激活码 ...", file=sys.stderr)
+                    calls = operations(manager, codes[:size])
+                    results.setdefault(backend, {})[str(size)] = {
+                        name: measure(calls[name], iterations, max_seconds) for name in OPERATIONS
+                    }
+            finally:
+                cleanup()
+    return results
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> bool:
+    """打印 p50 对比表，返回是否存在超过阈值的退化"""
+    regressed = False
+    print(f"{'backend':<11}{'size':>8}  {'operation':<15}{'before_us':>12}{'after_us':>12}{'ratio':>8}")
+    for backend, by_size in current["results"].items():
+        for size, by_op in by_size.items():
+            for name, stats in by_op.items():
+                before = baseline.get("results", {}).get(backend, {}).get(size, {}).get(name)
+                if not before or not before["p50_us"]:
+                    continue
+                ratio = stats["p50_us"] / before["p50_us"]
+                flag = "  <-- 退化" if ratio > threshold else ""
+                regressed = regressed or ratio > threshold
+                print(f"{backend:<11}{size:>8}  {name:<15}{before['p50_us']:>12}{stats['p50_us']:>12}{ratio:>8.2f}{flag}")
+    return regressed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="激活码存储后端微基准")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="逗号分隔的激活码数量")
+    parser.add_argument("--iterations", type=int, default=200, help="每项操作的最多测量次数")
+    parser.add_argument("--max-seconds", type=float, default=5.0, help="每项操作的最长测量时间")
+    parser.add_argument("--output", "-o", default=None, help="结果 JSON 输出文件")
+    parser.add_argument("--compare", default=None, help="与之前保存的结果 JSON 对比")
+    parser.add_argument("--threshold", type=float, default=1.25, help="p50 变慢超过该倍数视为退化")
+    args = parser.parse_args()
+
+    sizes = [int(item) for item in args.sizes.split(",") if item.strip()]
+    report = {
+        "benchmark": "activation_backends",
+        "sizes": sizes,
+        "results": run(sizes, args.iterations, args.max_seconds),
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        return 1 if compare(report, baseline, args.threshold) else 0
+    print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地 SiliconFlow 替身服务，用于压测（不消耗真实额度）
+
+模拟两个接口：
+    POST /v1/audio/speech          按配置的延迟返回指定大小的音频，或按错误率返回 5xx/429
+    POST /v1/uploads/audio/voice   读完上传内容后返回音色 URI
+
+单独运行：
+    python benchmarks/fake_siliconflow.py --port 9100 --latency-ms 1500 --error-rate 0.02
+然后让应用指向它：
+    SILICONFLOW_API_URL=http://127.0.0.1:9100/v1/audio/speech \\
+    SILICONFLOW_UPLOAD_URL=http://127.0.0.1:9100/v1/uploads/audio/voice python app.py
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Tuple
+
+SPEECH_PATH = "/v1/audio/speech"
+UPLOAD_PATH = "/v1/uploads/audio/voice"
+
+
+@dataclass
+class FakeOptions:
+    latency_ms: float = 1500.0       # 合成延迟中位数
+    latency_sigma: float = 0.35      # 对数正态分布的 sigma，0 表示固定延迟
+    upload_latency_ms: float = 300.0
+    error_rate: float = 0.0          # 合成请求失败比例
+    audio_bytes: int = 96 * 1024     # 每次返回的音频大小
+
+    def sample_latency(self, median_ms: float) -> float:
+        if self.latency_sigma <= 0:
+            return median_ms / 1000
+        return random.lognormvariate(math.log(max(median_ms, 0.001)), self.latency_sigma) / 1000
+
+
+class FakeSiliconFlowHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "FakeSiliconFlowServer"
+
+    def log_message(self, format: str, *args) -> None:  # noqa: A002 - 覆盖基类签名
+        pass
+
+    def _send(self, status: int, body: bytes, content_type: str) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status: int, payload: dict) -> None:
+        self._send(status, json.dumps(payload).encode("utf-8"), "application/json")
+
+    def _drain_body(self) -> int:
+        length = int(self.headers.get("Content-Length") or 0)
+        remaining = length
+        while remaining > 0:
+            chunk = self.rfile.read(min(remaining, 64 * 1024))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+        return length
+
+    def do_HEAD(self) -> None:
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_POST(self) -> None:
+        options = self.server.options
+        received = self._drain_body()
+        if self.path == UPLOAD_PATH:
+            time.sleep(options.sample_latency(options.upload_latency_ms))
+            self._send_json(200, {"uri": f"speech:fake:{received}:{random.getrandbits(32):08x}"})
+        elif self.path == SPEECH_PATH:
+            time.sleep(options.sample_latency(options.latency_ms))
+            if random.random() < options.error_rate:
+                status = random.choice((429, 500, 503))
+                self._send_json(status, {"code": status, "message": "fake upstream error"})
+                return
+            self._send(200, self.server.audio, "audio/mpeg")
+        else:
+            self._send_json(404, {"message": "not found"})
+
+
+class FakeSiliconFlowServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, address: Tuple[str, int], options: FakeOptions):
+        super().__init__(address, FakeSiliconFlowHandler)
+        self.options = options
+        self.audio = os.urandom(options.audio_bytes)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def start_fake_server(options: FakeOptions, host: str = "127.0.0.1", port: int = 0) -> FakeSiliconFlowServer:
+    """在后台线程中启动替身服务；port=0 时自动选择空闲端口"""
+    server = FakeSiliconFlowServer((host, port), options)
+    threading.Thread(target=server.serve_forever, name="fake-siliconflow", daemon=True).start()
+    return server
+
+
+def add_fake_options(parser: argparse.ArgumentParser) -> None:
+    defaults = FakeOptions()
+    parser.add_argument("--latency-ms", type=float, default=defaults.latency_ms, help="合成延迟中位数（毫秒）")
+    parser.add_argument("--latency-sigma", type=float, default=defaults.latency_sigma,
+                        help="延迟对数正态分布的 sigma，0 表示固定延迟")
+    parser.add_argument("--upload-latency-ms", type=float, default=defaults.upload_latency_ms)
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate, help="合成失败比例（0~1）")
+    parser.add_argument("--audio-bytes", type=int, default=defaults.audio_bytes, help="返回的音频大小（字节）")
+
+
+def fake_options_from_args(args: argparse.Namespace) -> FakeOptions:
+    return FakeOptions(
+        latency_ms=args.latency_ms,
+        latency_sigma=args.latency_sigma,
+        upload_latency_ms=args.upload_latency_ms,
+        error_rate=args.error_rate,
+        audio_bytes=args.audio_bytes,
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="本地 SiliconFlow 替身服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    add_fake_options(parser)
+    args = parser.parse_args()
+
+    server = FakeSiliconFlowServer((args.host, args.port), fake_options_from_args(args))
+    print(f"替身服务已启动：{server.base_url}{SPEECH_PATH}  {server.base_url}{UPLOAD_PATH}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
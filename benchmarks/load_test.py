@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+单实例压测：N 个并发虚拟用户驱动声音克隆与 FastAPI 路由
+
+上游由 benchmarks/fake_siliconflow.py 在本进程内模拟，不消耗真实额度。
+激活码存放在临时目录的 JSON 文件中；如需压测 PostgreSQL，设置 DATABASE_URL
+指向本地测试库（不要指向生产库）。
+
+场景：
+    clone   直接调用 app.voice_clone（上传参考音频 + 合成 + 记录用量）
+    routes  启动 uvicorn，通过 HTTP 轮流请求 --routes 中的路由
+
+示例：
+    python benchmarks/load_test.py clone --users 32 --duration 60 --latency-ms 1500
+    python benchmarks/load_test.py routes --users 64 --requests 20000 --routes /healthz,/api/check_codes
+
+报告（JSON）包含吞吐量、延迟 p50/p95/p99、错误数与进程资源占用，可用 -o 保存后在提交间对比。
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import wave
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fake_siliconflow import (  # noqa: E402
+    SPEECH_PATH,
+    UPLOAD_PATH,
+    add_fake_options,
+    fake_options_from_args,
+    start_fake_server,
+)
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+
+    def percentile(fraction: float) -> float:
+        return round(ordered[min(int(len(ordered) * fraction), len(ordered) - 1)] * 1000, 1)
+
+    return {
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 1),
+        "p50_ms": percentile(0.50),
+        "p95_ms": percentile(0.95),
+        "p99_ms": percentile(0.99),
+        "max_ms": round(ordered[-1] * 1000, 1),
+    }
+
+
+def resource_snapshot() -> Dict[str, float]:
+    times = os.times()
+    snapshot = {"cpu_seconds": times.user + times.system, "threads": threading.active_count()}
+    if resource is not None:
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        snapshot["max_rss_mb"] = max_rss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    return snapshot
+
+
+def run_virtual_users(
+    call: Callable[[int], bool],
+    users: int,
+    duration: Optional[float],
+    total_requests: Optional[int],
+) -> Dict[str, Any]:
+    """并发执行 call(i)；call 返回 True 表示成功。按时长或总请求数结束。"""
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    lock = threading.Lock()
+    counter = iter(range(total_requests if total_requests else sys.maxsize))
+    deadline = time.perf_counter() + duration if duration else None
+    peak_threads = threading.active_count()
+
+    def user() -> None:
+        nonlocal peak_threads
+        while deadline is None or time.perf_counter() < deadline:
+            with lock:
+                index = next(counter, None)
+            if index is None:
+                return
+            start = time.perf_counter()
+            try:
+                outcome = "ok" if call(index) else "failed"
+            except Exception as exc:
+                outcome = type(exc).__name__
+            elapsed = time.perf_counter() - start
+            with lock:
+                if outcome == "ok":
+                    latencies.append(elapsed)
+                else:
+                    errors[outcome] = errors.get(outcome, 0) + 1
+                peak_threads = max(peak_threads, threading.active_count())
+
+    before = resource_snapshot()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users, thread_name_prefix="vu") as pool:
+        for _ in range(users):
+            pool.submit(user)
+    wall = time.perf_counter() - started
+    after = resource_snapshot()
+
+    cpu = after["cpu_seconds"] - before["cpu_seconds"]
+    usage = {
+        "cpu_seconds": round(cpu, 2),
+        "cpu_utilisation": round(cpu / wall, 2) if wall else 0,
+        "peak_threads": peak_threads,
+    }
+    if "max_rss_mb" in after:
+        usage["max_rss_mb"] = round(after["max_rss_mb"], 1)
+    return {
+        "users": users,
+        "wall_seconds": round(wall, 2),
+        "requests": len(latencies) + sum(errors.values()),
+        "succeeded": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / wall, 2) if wall else 0,
+        "latency": summarize(latencies),
+        "resources": usage,
+    }
+
+
+def _write_reference_audio(path: Path, seconds: float = 5.0, rate: int = 16000, frequency: float = 220.0) -> None:
+    # 正弦波而不是静音，否则会被 voice_clone 的预检拒绝
+    samples = array("h", (int(8000 * math.sin(2 * math.pi * frequency * i / rate)) for i in range(int(seconds * rate))))
+    with wave.open(str(path), "wb") as handle:
+        handle.setnchannels(1)
+        handle.setsampwidth(2)
+        handle.setframerate(rate)
+        handle.writeframes(samples.tobytes())
+
+
+def import_app(workdir: Path, upstream_base: str):
+    """在临时工作目录中导入 app，使其使用替身上游与临时激活码存储"""
+    os.environ["SILICONFLOW_API_URL"] = upstream_base + SPEECH_PATH
+    os.environ["SILICONFLOW_UPLOAD_URL"] = upstream_base + UPLOAD_PATH
+    os.environ.setdefault("API_KEY", "load-test")
+    # 默认只输出警告日志，避免日志淹没报告；设置 LOG_LEVEL=INFO 可把日志开销计入压测
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.chdir(workdir)
+    import app
+
+    return app
+
+
+def clone_scenario(app, workdir: Path, args: argparse.Namespace) -> Callable[[int], bool]:
+    reference = workdir / "reference.wav"
+    _write_reference_audio(reference)
+    code = app.ACTIVATION_MANAGER.create_codes(1, {"note": "load-test"})[0]["code"]
+    activation_state = {"code": code}
+    text = "这是一段用于压测的合成文本。" * max(args.text_repeat, 1)
+
+    def call(index: int) -> bool:
+        # --reuse-voice 比例的请求复用已有音色，其余请求重新上传参考音频
+        reuse = (index % 100) < args.reuse_voice * 100
+        clip = reference
+        if not reuse:
+            # 每次写入频率不同的参考音频，否则内容哈希相同会自动复用音色，--reuse-voice 失去意义
+            clip = workdir / f"reference-{index}.wav"
+            _write_reference_audio(clip, frequency=200.0 + index % 3000 + index // 3000 / 100)
+        try:
+            result = app.voice_clone(
+                reference_audio=str(clip),
+                text=text,
+                use_saved_voice=reuse,
+                custom_voice_name=f"load-{index}",
+                saved_voice_uri="speech:fake:existing" if reuse else "",
+                speed=1.0, pitch=1.0, volume=1.0,
+                response_format="mp3",
+                do_sample=True, temperature=0.8, top_p=0.8, top_k=30,
+                repetition_penalty=10.0, length_penalty=0.0, num_beams=3, max_mel_tokens=1500,
+                emotion_mode=app.EMOTION_MODE_OPTIONS[0], emotion_audio=None,
+                emo_happy=0, emo_angry=0, emo_sad=0, emo_fear=0,
+                emo_disgust=0, emo_melancholic=0, emo_surprise=0, emo_calm=0,
+                emotion_text="", emo_alpha=1.0,
+                activation_state=activation_state,
+                reveal_full_code=False,
+            )
+        finally:
+            if clip is not reference:
+                clip.unlink()
+        audio_path = result[0]
+        if audio_path:
+            os.unlink(audio_path)
+        return bool(audio_path)
+
+    return call
+
+
+def routes_scenario(app, args: argparse.Namespace) -> Tuple[Callable[[int], bool], Callable[[], None]]:
+    import requests
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(app.fastapi_app, host="127.0.0.1", port=args.port,
+                                           log_config=None, access_log=False))
+    thread = threading.Thread(target=server.run, name="uvicorn", daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    routes = [route.strip() for route in args.routes.split(",") if route.strip()]
+    base = f"http://127.0.0.1:{args.port}"
+    local = threading.local()
+
+    def call(index: int) -> bool:
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        response = session.get(base + routes[index % len(routes)], timeout=30)
+        return response.status_code == 200
+
+    def stop() -> None:
+        server.should_exit = True
+        thread.join(timeout=10)
+
+    return call, stop
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="单实例压测")
+    parser.add_argument("scenario", choices=("clone", "routes"))
+    parser.add_argument("--users", type=int, default=16, help="并发虚拟用户数")
+    parser.add_argument("--duration", type=float, default=None, help="压测时长（秒）")
+    parser.add_argument("--requests", type=int, default=None, help="总请求数（未指定时长时默认 500）")
+    parser.add_argument("--reuse-voice", type=float, default=0.5, help="clone：复用已有音色的请求比例")
+    parser.add_argument("--text-repeat", type=int, default=4, help="clone：合成文本重复次数")
+    parser.add_argument("--routes", default="/healthz,/readyz,/version,/api/check_codes,/metrics",
+                        help="routes：逗号分隔的路由")
+    parser.add_argument("--port", type=int, default=7961, help="routes：uvicorn 监听端口")
+    parser.add_argument("--output", "-o", default=None, help="结果 JSON 输出文件")
+    add_fake_options(parser)
+    args = parser.parse_args()
+    if args.duration is None and args.requests is None:
+        args.requests = 500
+    output = Path(args.output).resolve() if args.output else None
+
+    fake_options = fake_options_from_args(args)
+    upstream = start_fake_server(fake_options)
+    workdir = Path(tempfile.mkdtemp(prefix="azvoice-load-"))
+    app = import_app(workdir, upstream.base_url)
+
+    stop: Callable[[], None] = lambda: None
+    if args.scenario == "clone":
+        call = clone_scenario(app, workdir, args)
+    else:
+        call, stop = routes_scenario(app, args)
+    try:
+        result = run_virtual_users(call, args.users, args.duration, args.requests)
+    finally:
+        stop()
+        upstream.shutdown()
+
+    report = {
+        "benchmark": "load_test",
+        "scenario": args.scenario,
+        "upstream": vars(fake_options),
+        "result": result,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if output:
+        output.write_text(text + "\n", encoding="utf-8")
+    print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
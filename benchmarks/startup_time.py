@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+冷启动耗时基准
+
+每轮在新的子进程中（临时工作目录）依次测量：
+    import_app       import app（应只创建占位对象，不连接数据库、不构建界面）
+    create_app       app.create_fastapi_app()（构建前台界面并挂载路由）
+    storage_init     第一次访问激活码存储
+    admin_app        第一次访问管理后台时构建后台界面
+
+同时用 python -X importtime 统计导入 app 时最慢的模块。
+
+    python benchmarks/startup_time.py -o before.json
+    python benchmarks/startup_time.py --compare before.json   # 中位数变慢超过 1.25 倍时退出码为 1
+
+默认继承当前环境变量；设置了 DATABASE_URL 时 storage_init 包含连接 PostgreSQL 的时间。
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Sequence, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+PHASES = ("import_app", "create_app", "storage_init", "admin_app")
+
+PROBE = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+timings = {{}}
+start = time.perf_counter()
+import app
+timings["import_app"] = time.perf_counter() - start
+start = time.perf_counter()
+app.create_fastapi_app()
+timings["create_app"] = time.perf_counter() - start
+start = time.perf_counter()
+app.ACTIVATION_MANAGER.ping()
+timings["storage_init"] = time.perf_counter() - start
+start = time.perf_counter()
+app._create_admin_sub_app()
+timings["admin_app"] = time.perf_counter() - start
+print(json.dumps(timings))
+"""
+
+
+def _probe_env() -> Dict[str, str]:
+    env = dict(os.environ)
+    env.setdefault("API_KEY", "startup-benchmark")
+    env.setdefault("LOG_LEVEL", "WARNING")
+    env["PYTHONDONTWRITEBYTECODE"] = "1"
+    return env
+
+
+def run_probe(extra_args: Sequence[str] = ()) -> subprocess.CompletedProcess:
+    with tempfile.TemporaryDirectory(prefix="azvoice-startup-") as workdir:
+        return subprocess.run(
+            [sys.executable, *extra_args, "-c", PROBE.format(root=str(REPO_ROOT))],
+            cwd=workdir,
+            env=_probe_env(),
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+
+
+def measure_phases(repeat: int) -> Dict[str, Dict[str, float]]:
+    samples: Dict[str, List[float]] = {phase: [] for phase in PHASES}
+    for index in range(repeat):
+        print(f"第 {index + 1}/{repeat} 轮 ...", file=sys.stderr)
+        timings = json.loads(run_probe().stdout.strip().splitlines()[-1])
+        for phase in PHASES:
+            samples[phase].append(timings[phase] * 1000)
+    return {
+        phase: {
+            "median_ms": round(statistics.median(values), 1),
+            "min_ms": round(min(values), 1),
+            "max_ms": round(max(values), 1),
+        }
+        for phase, values in samples.items()
+    }
+
+
+def slowest_imports(top: int) -> List[Dict[str, Any]]:
+    """解析 -X importtime 输出，列出 app 直接导入的模块中累计耗时最长的几个"""
+    stderr = run_probe(["-X", "importtime"]).stderr
+    entries: List[Tuple[int, str, int, int]] = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line.split(":", 1)[1].split("|", 2)
+        indent = len(name) - len(name.lstrip())
+        entries.append((indent, name.strip(), int(self_us), int(cumulative_us)))
+
+    # importtime 先输出子模块再输出父模块：从 app 那一行往前找缩进多一级的条目
+    app_index = next((i for i, entry in enumerate(entries) if entry[1] == "app"), None)
+    if app_index is None:
+        return []
+    app_indent = entries[app_index][0]
+    children = []
+    for indent, name, self_us, cumulative_us in reversed(entries[:app_index]):
+        if indent <= app_indent:
+            break
+        if indent == app_indent + 2:
+            children.append({"module": name, "self_ms": self_us / 1000, "cumulative_ms": cumulative_us / 1000})
+    children.sort(key=lambda entry: entry["cumulative_ms"], reverse=True)
+    return children[:top]
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> bool:
+    """打印中位数对比表，返回是否存在超过阈值的退化"""
+    regressed = False
+    print(f"{'phase':<14}{'before_ms':>12}{'after_ms':>12}{'ratio':>8}")
+    for phase, stats in current["phases"].items():
+        before = baseline.get("phases", {}).get(phase)
+        if not before or not before["median_ms"]:
+            continue
+        ratio = stats["median_ms"] / before["median_ms"]
+        flag = "  <-- 退化" if ratio > threshold else ""
+        regressed = regressed or ratio > threshold
+        print(f"{phase:<14}{before['median_ms']:>12}{stats['median_ms']:>12}{ratio:>8.2f}{flag}")
+    return regressed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="冷启动耗时基准")
+    parser.add_argument("--repeat", type=int, default=5, help="测量轮数（每轮一个新进程）")
+    parser.add_argument("--top", type=int, default=15, help="列出导入最慢的模块数")
+    parser.add_argument("--output", "-o", default=None, help="结果 JSON 输出文件")
+    parser.add_argument("--compare", default=None, help="与之前保存的结果 JSON 对比")
+    parser.add_argument("--threshold", type=float, default=1.25, help="中位数变慢超过该倍数视为退化")
+    args = parser.parse_args()
+
+    report = {
+        "benchmark": "startup_time",
+        "repeat": args.repeat,
+        "phases": measure_phases(args.repeat),
+        "slowest_imports": slowest_imports(args.top),
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        return 1 if compare(report, baseline, args.threshold) else 0
+    print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
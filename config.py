@@ -20,13 +20,15 @@ def get_api_key() -> str:
     return os.getenv("API_KEY", "").strip()
 
 
-API_URL = "https://api.siliconflow.cn/v1/audio/speech"
-VOICE_UPLOAD_URL = "https://api.siliconflow.cn/v1/uploads/audio/voice"
 MODEL_NAME = "IndexTeam/IndexTTS-2"
 
 # 先加载环境变量
 _load_env()
 
+# 上游地址可通过环境变量覆盖（压测时指向 benchmarks/fake_siliconflow.py）
+API_URL = os.getenv("SILICONFLOW_API_URL", "https://api.siliconflow.cn/v1/audio/speech")
+VOICE_UPLOAD_URL = os.getenv("SILICONFLOW_UPLOAD_URL", "https://api.siliconflow.cn/v1/uploads/audio/voice")
+
 # 读取配置，系统环境变量优先
 APP_HOST = os.getenv("APP_HOST", "127.0.0.1")
 APP_PORT = int(os.getenv("APP_PORT", "7860"))
@@ -34,6 +36,21 @@ APP_SHARE = False
 
 ACTIVATION_STORE_PATH = BASE_DIR / "activation_codes.json"
 
+# Gradio 队列：按上游并发额度设置，队列满时新请求会被立即拒绝
+CLONE_CONCURRENCY = int(os.getenv("CLONE_CONCURRENCY", "4"))       # 同时请求上游的合成数（界面、REST、流式共用）
+CLIENT_CONCURRENCY = int(os.getenv("CLIENT_CONCURRENCY", "16"))    # 前台其他事件（登录、刷新额度等）
+ADMIN_CONCURRENCY = int(os.getenv("ADMIN_CONCURRENCY", "2"))       # 后台管理操作
+QUEUE_MAX_SIZE = int(os.getenv("QUEUE_MAX_SIZE", "64"))            # 最多排队的请求数
+QUEUE_FULL_MESSAGE = os.getenv("QUEUE_FULL_MESSAGE", "当前排队人数已满，请稍后再试。")   # 队列已满时的提示
+
+# 多进程部署：APP_WORKERS > 1 时在 APP_API_PORT 上启动多个只含 /api/* 的 uvicorn worker，
+# 界面仍在 APP_PORT 上单进程运行；共享状态见 shared_state.py
+APP_WORKERS = int(os.getenv("APP_WORKERS", "1"))
+APP_API_PORT = int(os.getenv("APP_API_PORT", str(APP_PORT + 1)))
+RESULT_CACHE_TTL = int(os.getenv("RESULT_CACHE_TTL", "0"))                 # 合成结果缓存时间（秒），0 表示关闭
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(2 * 1024 * 1024)))
+RATE_LIMIT_PER_MINUTE = int(os.getenv("RATE_LIMIT_PER_MINUTE", "0"))       # 每个激活码每分钟最多合成次数，0 表示不限
+
 
 DEFAULT_SPEED = 1.0
 DEFAULT_PITCH = 1.0
@@ -46,4 +63,22 @@ def get_admin_password() -> str:
     _load_env()
     return os.getenv("ADMIN_PASSWORD", "admin123").strip()
 
-SUPPORTED_AUDIO_FORMATS = ["mp3", "wav", "ogg", "flac"]
\ No newline at end of file
+SUPPORTED_AUDIO_FORMATS = ["mp3", "wav", "ogg", "flac"]
+
+# 参考音频上传前的预处理（见 audio_preprocess.py）
+REFERENCE_PREPROCESS = os.getenv("REFERENCE_PREPROCESS", "1").strip().lower() not in ("0", "false", "no")
+REFERENCE_MAX_SECONDS = float(os.getenv("REFERENCE_MAX_SECONDS", "15"))    # 截取的最长时长，模型只使用前 15 秒左右
+REFERENCE_SAMPLE_RATE = int(os.getenv("REFERENCE_SAMPLE_RATE", "22050"))   # 重采样后的采样率
+MAX_REFERENCE_SOURCE_MB = int(os.getenv("MAX_REFERENCE_SOURCE_MB", "50"))  # 预处理前允许的原始文件大小
+EMOTION_AUDIO_CACHE_MB = int(os.getenv("EMOTION_AUDIO_CACHE_MB", "32"))    # 情感参考音频编码结果的缓存上限
+POSTPROCESS_WORKERS = int(os.getenv("POSTPROCESS_WORKERS", "2"))           # 本地转码进程数（见 audio_postprocess.py）
+
+# 请求预检（见 audio_validation.py），不通过的请求不会发往上游
+MIN_REFERENCE_SECONDS = float(os.getenv("MIN_REFERENCE_SECONDS", "3"))     # 参考音频最短时长
+MIN_VOICED_RATIO = float(os.getenv("MIN_VOICED_RATIO", "0.2"))             # 有声片段占比下限
+MAX_TEXT_CHARACTERS = int(os.getenv("MAX_TEXT_CHARACTERS", "2000"))        # 单次合成文本的最大字数
+# WebSocket 流式合成（/api/v1/stream），文本按句分段后依次合成
+STREAM_PARALLELISM = int(os.getenv("STREAM_PARALLELISM", "2"))             # 每个连接同时请求上游的分段数
+STREAM_SEGMENT_CHARS = int(os.getenv("STREAM_SEGMENT_CHARS", "120"))       # 耗时模型样本不足时的分段字数
+STREAM_MAX_CHARACTERS = int(os.getenv("STREAM_MAX_CHARACTERS", "20000"))   # 单个连接累计的最大字数
+STREAM_IDLE_TIMEOUT = float(os.getenv("STREAM_IDLE_TIMEOUT", "60"))        # 等待客户端文本的超时（秒）
@@ -7,18 +7,109 @@
 
 from __future__ import annotations
 
+import contextlib
+import csv
+import io
 import json
+import logging
 import os
+import threading
 from datetime import date, datetime
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
 try:
     import psycopg2
+    import psycopg2.extensions
     import psycopg2.extras
+    import psycopg2.pool
     PSYCOPG2_AVAILABLE = True
 except ImportError:
     PSYCOPG2_AVAILABLE = False
 
+from activation_manager import (
+    CODE_RECORD_FIELDS,
+    CODE_SORT_OPTIONS,
+    CODE_STATUS_FILTERS,
+    MAX_VOICES_PER_CODE,
+    ActivationError,
+    generate_unique_codes,
+    prepare_import_record,
+    validate_bulk_count,
+)
+
+logger = logging.getLogger(__name__)
+
+# 排序方式 -> (ORDER BY 子句, 游标翻页条件)
+_SORT_CLAUSES = {
+    "created_desc": (
+        "created_at DESC, code DESC",
+        "(created_at, code) < (SELECT created_at, code FROM activation_codes WHERE code = %s)",
+    ),
+    "created_asc": (
+        "created_at ASC, code ASC",
+        "(created_at, code) > (SELECT created_at, code FROM activation_codes WHERE code = %s)",
+    ),
+    "code": ("code ASC", "code > %s"),
+}
+
+_UTC_TODAY = "(NOW() AT TIME ZONE 'UTC')::date"
+
+# 在 SQL 中计算额度与过期状态，_build_info 直接使用这些列
+_INFO_COLUMNS = f"""
+    *,
+    (expires_at IS NOT NULL AND expires_at < {_UTC_TODAY}) AS expired,
+    CASE WHEN max_voices = 0 THEN NULL
+         ELSE GREATEST(max_voices - used_voices, 0) END AS available_voices,
+    CASE WHEN max_characters = 0 THEN NULL
+         ELSE GREATEST(max_characters - used_characters, 0) END AS remaining_characters
+"""
+
+# 热点查询使用服务端预备语句：名称 -> (参数类型, 语句)
+PREPARED_STATEMENTS = {
+    "ac_get_code": (
+        "text",
+        f"SELECT {_INFO_COLUMNS} FROM activation_codes WHERE code = $1",
+    ),
+    "ac_check_quota": (
+        "text, integer, boolean",
+        f"""
+        SELECT {_INFO_COLUMNS},
+               ($3 AND max_voices > 0 AND used_voices >= max_voices) AS voices_exhausted,
+               ($2 > 0 AND max_characters > 0 AND max_characters - used_characters < $2)
+                   AS characters_exhausted
+        FROM activation_codes WHERE code = $1
+        """,
+    ),
+    "ac_record_usage": (
+        "text, integer, boolean",
+        f"""
+        UPDATE activation_codes
+        SET last_used_at = NOW(),
+            used_voices = CASE WHEN NOT $3 THEN used_voices
+                               WHEN max_voices > 0 THEN LEAST(used_voices + 1, max_voices)
+                               ELSE used_voices + 1 END,
+            used_characters = CASE WHEN $2 <= 0 THEN used_characters
+                                   WHEN max_characters > 0 THEN LEAST(used_characters + $2, max_characters)
+                                   ELSE used_characters + $2 END
+        WHERE code = $1
+        RETURNING {_INFO_COLUMNS}
+        """,
+    ),
+}
+
+# psycopg2 连接池只保留 DB_POOL_MIN 个空闲连接（及其预备语句），超出部分归还时关闭
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "2"))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "10"))
+
+
+if PSYCOPG2_AVAILABLE:
+    class _PreparingConnection(psycopg2.extensions.connection):
+        """记录本连接上已 PREPARE 过的语句（预备语句的生命周期与会话相同）"""
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.prepared: set = set()
+
 
 class DatabaseActivationManager:
     """使用 PostgreSQL 存储激活码"""
@@ -28,12 +119,65 @@ class DatabaseActivationManager:
             raise RuntimeError("需要安装 psycopg2-binary: pip install psycopg2-binary")
 
         self.database_url = database_url
+        self._pool = psycopg2.pool.ThreadedConnectionPool(
+            DB_POOL_MIN,
+            DB_POOL_MAX,
+            database_url,
+            connection_factory=_PreparingConnection,
+        )
+        # 连接池用尽时 getconn 会直接报错，用信号量让调用方排队等待
+        self._pool_slots = threading.BoundedSemaphore(DB_POOL_MAX)
         self._init_database()
-        print("[激活码管理] 使用 PostgreSQL 数据库持久化")
+        logger.info("使用 PostgreSQL 数据库持久化")
 
+    @contextlib.contextmanager
     def _get_connection(self):
-        """获取数据库连接"""
-        return psycopg2.connect(self.database_url)
+        """从连接池借出连接，正常结束时提交，异常时回滚"""
+        self._pool_slots.acquire()
+        try:
+            conn = self._pool.getconn()
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                if not conn.closed:
+                    conn.rollback()
+                raise
+            finally:
+                # 已断开的连接直接丢弃，下次借出时重新建立
+                self._pool.putconn(conn, close=bool(conn.closed))
+        finally:
+            self._pool_slots.release()
+
+    def _execute_prepared(self, cur, name: str, params: Tuple[Any, ...]) -> None:
+        """执行预备语句；本连接第一次使用时先 PREPARE"""
+        conn = cur.connection
+        if name not in conn.prepared:
+            types, statement = PREPARED_STATEMENTS[name]
+            cur.execute(f"PREPARE {name} ({types}) AS {statement}")
+            conn.prepared.add(name)
+        placeholders = ", ".join(["%s"] * len(params))
+        cur.execute(f"EXECUTE {name} ({placeholders})", params)
+
+    def ping(self) -> Dict[str, Any]:
+        """健康检查：连接池已满时不排队等待，直接报告繁忙"""
+        if not self._pool_slots.acquire(blocking=False):
+            return {"ok": True, "backend": "postgresql", "pool": "saturated"}
+        try:
+            conn = self._pool.getconn()
+            try:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT 1")
+                conn.rollback()
+            finally:
+                self._pool.putconn(conn, close=bool(conn.closed))
+        finally:
+            self._pool_slots.release()
+        return {"ok": True, "backend": "postgresql", "pool": "available"}
+
+    def close(self) -> None:
+        """关闭连接池"""
+        self._pool.closeall()
 
     def _init_database(self):
         """初始化数据库表"""
@@ -53,6 +197,31 @@ class DatabaseActivationManager:
                         last_used_at TIMESTAMP
                     )
                 """)
+                # 后台列表按创建时间分页、按激活码前缀搜索
+                cur.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_activation_codes_created_at
+                    ON activation_codes (created_at DESC, code DESC)
+                """)
+                cur.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_activation_codes_code_pattern
+                    ON activation_codes (code varchar_pattern_ops)
+                """)
+                # 每个激活码的音色库；按参考音频哈希查找已上传过的音色
+                cur.execute("""
+                    CREATE TABLE IF NOT EXISTS activation_voices (
+                        code VARCHAR(50) NOT NULL REFERENCES activation_codes (code) ON DELETE CASCADE,
+                        uri TEXT NOT NULL,
+                        name TEXT NOT NULL DEFAULT '',
+                        audio_hash VARCHAR(64) NOT NULL DEFAULT '',
+                        created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+                        last_used_at TIMESTAMP NOT NULL DEFAULT NOW(),
+                        PRIMARY KEY (code, uri)
+                    )
+                """)
+                cur.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_activation_voices_hash
+                    ON activation_voices (code, audio_hash)
+                """)
                 conn.commit()
 
     def get_code_info(self, code: str) -> Optional[Dict[str, Any]]:
@@ -63,9 +232,7 @@ class DatabaseActivationManager:
 
         with self._get_connection() as conn:
             with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-                cur.execute("""
-                    SELECT * FROM activation_codes WHERE code = %s
-                """, (code,))
+                self._execute_prepared(cur, "ac_get_code", (code,))
                 row = cur.fetchone()
 
                 if not row:
@@ -73,166 +240,453 @@ class DatabaseActivationManager:
 
                 return self._build_info(dict(row))
 
-    def list_codes(self) -> List[Dict[str, Any]]:
-        """列出所有激活码"""
+    def _filter_clause(self, code_prefix: str, note: str,
+                       status: Optional[str]) -> Tuple[List[str], List[Any]]:
+        """构建筛选条件"""
+        if status and status not in CODE_STATUS_FILTERS:
+            raise ActivationError(f"不支持的状态筛选：{status}")
+
+        conditions: List[str] = []
+        params: List[Any] = []
+
+        code_prefix = (code_prefix or "").strip().upper()
+        if code_prefix:
+            conditions.append("code LIKE %s")
+            params.append(_escape_like(code_prefix) + "%")
+
+        note = (note or "").strip()
+        if note:
+            conditions.append("note ILIKE %s")
+            params.append("%" + _escape_like(note) + "%")
+
+        if status == "disabled":
+            conditions.append("disabled")
+        elif status == "expired":
+            conditions.append(f"expires_at < {_UTC_TODAY}")
+        elif status == "active":
+            conditions.append(f"NOT disabled AND (expires_at IS NULL OR expires_at >= {_UTC_TODAY})")
+
+        return conditions, params
+
+    def build_list_query(self, offset: int = 0, limit: Optional[int] = None, *,
+                         code_prefix: str = "", note: str = "", status: Optional[str] = None,
+                         sort: str = "created_desc",
+                         after: Optional[str] = None) -> Tuple[str, List[Any]]:
+        """构建分页查询语句（%s 占位符）"""
+        if sort not in CODE_SORT_OPTIONS:
+            raise ActivationError(f"不支持的排序方式：{sort}")
+        order_by, keyset = _SORT_CLAUSES[sort]
+        conditions, params = self._filter_clause(code_prefix, note, status)
+
+        if after:
+            conditions.append(keyset)
+            params.append(after.upper())
+            offset = 0
+
+        query = f"SELECT {_INFO_COLUMNS} FROM activation_codes"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += f" ORDER BY {order_by}"
+        if limit is not None:
+            query += " LIMIT %s"
+            params.append(max(int(limit), 0))
+        if offset:
+            query += " OFFSET %s"
+            params.append(max(int(offset), 0))
+        return query, params
+
+    def list_codes(self, offset: int = 0, limit: Optional[int] = None, *,
+                   code_prefix: str = "", note: str = "", status: Optional[str] = None,
+                   sort: str = "created_desc", after: Optional[str] = None) -> List[Dict[str, Any]]:
+        """分页列出激活码，传入 after（上一页最后一个激活码）时使用游标翻页"""
+        query, params = self.build_list_query(
+            offset, limit, code_prefix=code_prefix, note=note, status=status, sort=sort, after=after,
+        )
+
         with self._get_connection() as conn:
             with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-                cur.execute("""
-                    SELECT * FROM activation_codes ORDER BY created_at DESC
-                """)
+                cur.execute(query, params)
                 rows = cur.fetchall()
                 return [self._build_info(dict(row)) for row in rows]
 
+    def iter_codes(self, *, code_prefix: str = "", note: str = "",
+                   status: Optional[str] = None, sort: str = "created_desc",
+                   batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        """使用服务端命名游标逐批读取激活码（用于导出），内存占用与总量无关"""
+        if sort not in CODE_SORT_OPTIONS:
+            raise ActivationError(f"不支持的排序方式：{sort}")
+        order_by, _ = _SORT_CLAUSES[sort]
+        conditions, params = self._filter_clause(code_prefix, note, status)
+        query = f"SELECT {_INFO_COLUMNS} FROM activation_codes"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += f" ORDER BY {order_by}"
+
+        with self._get_connection() as conn:
+            with conn.cursor(name="activation_codes_export",
+                             cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+                cur.itersize = max(int(batch_size), 1)
+                cur.execute(query, params)
+                for row in cur:
+                    yield self._build_info(dict(row))
+
+    def build_count_query(self, *, code_prefix: str = "", note: str = "",
+                          status: Optional[str] = None) -> Tuple[str, List[Any]]:
+        """构建计数查询语句（%s 占位符）"""
+        conditions, params = self._filter_clause(code_prefix, note, status)
+        query = "SELECT COUNT(*) FROM activation_codes"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        return query, params
+
+    def count_codes(self, *, code_prefix: str = "", note: str = "",
+                    status: Optional[str] = None) -> int:
+        """统计符合条件的激活码数量"""
+        query, params = self.build_count_query(code_prefix=code_prefix, note=note, status=status)
+
+        with self._get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(query, params)
+                return int(cur.fetchone()[0])
+
     def create_code(self, max_voices: int, max_characters: int,
                    expires_at: Optional[str], note: str = "") -> Dict[str, Any]:
         """创建新激活码"""
-        from activation_manager import ActivationManager
-        from pathlib import Path
-
-        # 使用原有的代码生成逻辑
-        temp_manager = ActivationManager(Path("temp_codes.json"))
-        new_code = temp_manager._generate_unique_code(set())
+        template = {
+            "max_voices": max_voices,
+            "max_characters": max_characters,
+            "expires_at": expires_at,
+            "note": note,
+        }
+        return self.create_codes(1, template)[0]
+
+    def create_codes(self, count: int, template: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """按同一模板批量创建激活码，单个事务内用 execute_values 分批插入"""
+        count = validate_bulk_count(count)
+        template = template or {}
+        max_voices = max(int(template.get("max_voices", 0) or 0), 0)
+        max_characters = max(int(template.get("max_characters", 0) or 0), 0)
+        note = template.get("note") or ""
 
         # 解析过期日期
         expiry_date = None
+        expires_at = (template.get("expires_at") or "").strip()
         if expires_at:
             try:
                 expiry_date = datetime.strptime(expires_at, "%Y-%m-%d").date()
             except ValueError:
                 pass
 
+        created: List[Dict[str, Any]] = []
+        attempted: set = set()
+
         with self._get_connection() as conn:
             with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+                # 与库中已有激活码冲突的极少数会被 ON CONFLICT 跳过，补生成即可
+                while len(created) < count:
+                    batch = generate_unique_codes(count - len(created), attempted)
+                    attempted.update(batch)
+                    rows = psycopg2.extras.execute_values(
+                        cur,
+                        """
+                        INSERT INTO activation_codes
+                        (code, max_voices, used_voices, max_characters, used_characters,
+                         expires_at, disabled, note, created_at)
+                        VALUES %s
+                        ON CONFLICT (code) DO NOTHING
+                        RETURNING *
+                        """,
+                        [(code, max_voices, max_characters, expiry_date, note) for code in batch],
+                        template="(%s, %s, 0, %s, 0, %s, FALSE, %s, NOW())",
+                        page_size=1000,
+                        fetch=True,
+                    )
+                    created.extend(self._build_info(dict(row)) for row in rows)
+                conn.commit()
+
+        return created
+
+    def import_codes(self, records: Iterable[Dict[str, Any]]) -> Tuple[List[str], List[str]]:
+        """通过 COPY 批量导入指定激活码，已存在的跳过。返回 (已导入, 已跳过)"""
+        prepared: Dict[str, Dict[str, Any]] = {}
+        duplicates: List[str] = []
+        for raw in records:
+            record = prepare_import_record(raw)
+            if record["code"] in prepared:
+                duplicates.append(record["code"])
+                continue
+            prepared[record["code"]] = record
+
+        if not prepared:
+            return [], duplicates
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for record in prepared.values():
+            writer.writerow(["" if record[field] is None else record[field] for field in CODE_RECORD_FIELDS])
+        buffer.seek(0)
+
+        columns = ", ".join(CODE_RECORD_FIELDS)
+        with self._get_connection() as conn:
+            with conn.cursor() as cur:
                 cur.execute("""
-                    INSERT INTO activation_codes
-                    (code, max_voices, used_voices, max_characters, used_characters,
-                     expires_at, disabled, note, created_at)
-                    VALUES (%s, %s, 0, %s, 0, %s, FALSE, %s, NOW())
-                    RETURNING *
-                """, (new_code, max(int(max_voices), 0), max(int(max_characters), 0),
-                      expiry_date, note or ""))
-                row = cur.fetchone()
+                    CREATE TEMP TABLE activation_codes_import ON COMMIT DROP AS
+                    SELECT * FROM activation_codes WITH NO DATA
+                """)
+                cur.copy_expert(
+                    f"COPY activation_codes_import ({columns}) FROM STDIN WITH (FORMAT csv)",
+                    buffer,
+                )
+                cur.execute(f"""
+                    INSERT INTO activation_codes ({columns})
+                    SELECT code, max_voices, used_voices, max_characters, used_characters,
+                           expires_at, disabled, COALESCE(note, ''),
+                           COALESCE(created_at, NOW()), last_used_at
+                    FROM activation_codes_import
+                    ON CONFLICT (code) DO NOTHING
+                    RETURNING code
+                """)
+                inserted = {row[0] for row in cur.fetchall()}
                 conn.commit()
-                return self._build_info(dict(row))
+
+        imported = [code for code in prepared if code in inserted]
+        skipped = [code for code in prepared if code not in inserted] + duplicates
+        return imported, skipped
 
     def update_code(self, code: str, *, max_voices: Optional[int] = None,
                    max_characters: Optional[int] = None, expires_at: Optional[str] = None,
                    note: Optional[str] = None, disabled: Optional[bool] = None) -> Dict[str, Any]:
-        """更新激活码"""
+        """更新激活码（未传入的字段保持不变）"""
         code = (code or "").upper()
-        updates = []
-        params = []
-
-        if max_voices is not None:
-            updates.append("max_voices = %s")
-            params.append(max(int(max_voices), 0))
-            updates.append("used_voices = LEAST(used_voices, %s)")
-            params.append(max(int(max_voices), 0))
-
-        if max_characters is not None:
-            updates.append("max_characters = %s")
-            params.append(max(int(max_characters), 0))
-            updates.append("used_characters = LEAST(used_characters, %s)")
-            params.append(max(int(max_characters), 0))
+        params: Dict[str, Any] = {
+            "code": code,
+            "max_voices": max(int(max_voices), 0) if max_voices is not None else None,
+            "max_characters": max(int(max_characters), 0) if max_characters is not None else None,
+            "set_expiry": False,
+            "expires_at": None,
+            "note": note,
+            "disabled": bool(disabled) if disabled is not None else None,
+        }
 
         if expires_at is not None:
             try:
-                expiry_date = datetime.strptime(expires_at.strip(), "%Y-%m-%d").date() if expires_at.strip() else None
-                updates.append("expires_at = %s")
-                params.append(expiry_date)
+                params["expires_at"] = datetime.strptime(expires_at.strip(), "%Y-%m-%d").date() if expires_at.strip() else None
+                params["set_expiry"] = True
             except ValueError:
                 pass
 
-        if note is not None:
-            updates.append("note = %s")
-            params.append(note)
-
-        if disabled is not None:
-            updates.append("disabled = %s")
-            params.append(bool(disabled))
-
-        if not updates:
-            return self.get_code_info(code)
-
-        params.append(code)
+        if all(params[key] is None for key in ("max_voices", "max_characters", "note", "disabled")) \
+                and not params["set_expiry"]:
+            info = self.get_code_info(code)
+            if not info:
+                raise ActivationError("激活码不存在。")
+            return info
 
         with self._get_connection() as conn:
             with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
                 cur.execute(f"""
                     UPDATE activation_codes
-                    SET {', '.join(updates)}
-                    WHERE code = %s
-                    RETURNING *
+                    SET max_voices = COALESCE(%(max_voices)s::integer, max_voices),
+                        used_voices = CASE WHEN %(max_voices)s::integer IS NULL
+                                             OR %(max_voices)s::integer = 0 THEN used_voices
+                                           ELSE LEAST(used_voices, %(max_voices)s::integer) END,
+                        max_characters = COALESCE(%(max_characters)s::integer, max_characters),
+                        used_characters = CASE WHEN %(max_characters)s::integer IS NULL
+                                                 OR %(max_characters)s::integer = 0 THEN used_characters
+                                               ELSE LEAST(used_characters, %(max_characters)s::integer) END,
+                        expires_at = CASE WHEN %(set_expiry)s THEN %(expires_at)s::date
+                                          ELSE expires_at END,
+                        note = COALESCE(%(note)s::text, note),
+                        disabled = COALESCE(%(disabled)s::boolean, disabled)
+                    WHERE code = %(code)s
+                    RETURNING {_INFO_COLUMNS}
                 """, params)
                 row = cur.fetchone()
-                conn.commit()
 
                 if not row:
-                    raise RuntimeError("激活码不存在")
+                    raise ActivationError("激活码不存在。")
 
                 return self._build_info(dict(row))
 
     def record_usage(self, code: str, characters: int, created_voice: bool) -> Dict[str, Any]:
-        """记录使用情况"""
+        """记录使用情况（单条预备语句完成累加与额度封顶）"""
         code = (code or "").upper()
 
-        updates = ["last_used_at = NOW()"]
-        params = []
-
-        if created_voice:
-            updates.append("used_voices = used_voices + 1")
-
-        if characters > 0:
-            updates.append("used_characters = used_characters + %s")
-            params.append(int(characters))
-
-        params.append(code)
-
         with self._get_connection() as conn:
             with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-                cur.execute(f"""
-                    UPDATE activation_codes
-                    SET {', '.join(updates)}
-                    WHERE code = %s
-                    RETURNING *
-                """, params)
+                self._execute_prepared(
+                    cur,
+                    "ac_record_usage",
+                    (code, max(int(characters), 0), bool(created_voice)),
+                )
                 row = cur.fetchone()
-                conn.commit()
 
                 if not row:
-                    raise RuntimeError("激活码不存在")
+                    raise ActivationError("激活码不存在。")
 
                 return self._build_info(dict(row))
 
     def ensure_quota(self, code: str, required_characters: int,
                     needs_new_voice: bool) -> Tuple[bool, str, Optional[Dict[str, Any]]]:
-        """检查配额"""
-        info = self.get_code_info(code)
-        if not info:
+        """检查配额（可用性在 SQL 中一次算出）"""
+        code = (code or "").upper()
+        if not code:
+            return False, "激活码不存在或已被删除。", None
+
+        with self._get_connection() as conn:
+            with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+                self._execute_prepared(
+                    cur,
+                    "ac_check_quota",
+                    (code, max(int(required_characters), 0), bool(needs_new_voice)),
+                )
+                row = cur.fetchone()
+
+        return self.evaluate_quota_row(dict(row) if row else None)
+
+    def evaluate_quota_row(self, row: Optional[Dict[str, Any]]) -> Tuple[bool, str, Optional[Dict[str, Any]]]:
+        """根据 ac_check_quota 查询结果给出配额判断"""
+        if not row:
             return False, "激活码不存在或已被删除。", None
+        info = self._build_info(row)
         if info["disabled"]:
             return False, "激活码已停用，请联系管理员。", info
         if info["expired"]:
             return False, "激活码已过期，请联系管理员。", info
-        if needs_new_voice and info["available_voices"] is not None and info["available_voices"] <= 0:
+        if row["voices_exhausted"]:
             return False, "可用音色额度不足，请联系管理员。", info
-        if required_characters > 0 and info["remaining_characters"] is not None and info["remaining_characters"] < required_characters:
+        if row["characters_exhausted"]:
             return False, "剩余字符不足，请缩短文本或联系管理员。", info
         return True, "", info
 
+    def list_voices(self, code: str, limit: int = MAX_VOICES_PER_CODE) -> List[Dict[str, Any]]:
+        """激活码的音色库，最近使用的在前"""
+        with self._get_connection() as conn:
+            with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+                cur.execute(
+                    f"SELECT {_VOICE_COLUMNS} FROM activation_voices WHERE code = %s "
+                    "ORDER BY last_used_at DESC LIMIT %s",
+                    ((code or "").upper(), max(int(limit), 0)),
+                )
+                return [_voice_from_row(row) for row in cur.fetchall()]
+
+    def find_voice(self, code: str, audio_hash: str) -> Optional[Dict[str, Any]]:
+        """按参考音频哈希查找已上传过的音色"""
+        if not audio_hash:
+            return None
+        with self._get_connection() as conn:
+            with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+                cur.execute(
+                    f"SELECT {_VOICE_COLUMNS} FROM activation_voices WHERE code = %s AND audio_hash = %s "
+                    "ORDER BY last_used_at DESC LIMIT 1",
+                    ((code or "").upper(), audio_hash),
+                )
+                row = cur.fetchone()
+        return _voice_from_row(row) if row else None
+
+    def save_voice(self, code: str, uri: str, name: str = "", audio_hash: str = "") -> Dict[str, Any]:
+        """新增或更新音色库中的音色（按 URI 去重），超出上限时淘汰最久未使用的"""
+        code = (code or "").upper()
+        with self._get_connection() as conn:
+            with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+                cur.execute(
+                    f"""
+                    INSERT INTO activation_voices (code, uri, name, audio_hash)
+                    SELECT %s, %s, %s, %s WHERE EXISTS (SELECT 1 FROM activation_codes WHERE code = %s)
+                    ON CONFLICT (code, uri) DO UPDATE SET
+                        name = COALESCE(NULLIF(EXCLUDED.name, ''), activation_voices.name),
+                        audio_hash = COALESCE(NULLIF(EXCLUDED.audio_hash, ''), activation_voices.audio_hash),
+                        last_used_at = NOW()
+                    RETURNING {_VOICE_COLUMNS}
+                    """,
+                    (code, uri, name or "", audio_hash or "", code),
+                )
+                row = cur.fetchone()
+                if not row:
+                    raise ActivationError("激活码不存在。")
+                cur.execute(
+                    """
+                    DELETE FROM activation_voices WHERE code = %s AND uri NOT IN (
+                        SELECT uri FROM activation_voices WHERE code = %s
+                        ORDER BY last_used_at DESC LIMIT %s
+                    )
+                    """,
+                    (code, code, MAX_VOICES_PER_CODE),
+                )
+        return _voice_from_row(row)
+
+    def touch_voice(self, code: str, uri: str) -> None:
+        """更新音色的最近使用时间；音色不在库中时忽略"""
+        with self._get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "UPDATE activation_voices SET last_used_at = NOW() WHERE code = %s AND uri = %s",
+                    ((code or "").upper(), uri),
+                )
+
+    def delete_voice(self, code: str, uri: str) -> bool:
+        with self._get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "DELETE FROM activation_voices WHERE code = %s AND uri = %s",
+                    ((code or "").upper(), uri),
+                )
+                return cur.rowcount > 0
+
+    def iter_voices(self) -> Iterator[Dict[str, Any]]:
+        """遍历所有激活码的音色库条目（用于快照）"""
+        with self._get_connection() as conn:
+            with conn.cursor(name="activation_voices_export",
+                             cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+                cur.execute(f"SELECT code, {_VOICE_COLUMNS} FROM activation_voices ORDER BY code, created_at")
+                for row in cur:
+                    yield _voice_from_row(row)
+
+    def import_voices(self, entries: Iterable[Dict[str, Any]]) -> int:
+        """导入音色库条目（用于快照恢复）；激活码不存在或 URI 已在库中的跳过，返回导入数"""
+        imported = 0
+        with self._get_connection() as conn:
+            with conn.cursor() as cur:
+                for entry in entries:
+                    code = str(entry.get("code") or "").upper()
+                    if not code or not entry.get("uri"):
+                        continue
+                    cur.execute(
+                        """
+                        INSERT INTO activation_voices (code, uri, name, audio_hash, created_at, last_used_at)
+                        SELECT %s, %s, %s, %s, COALESCE(%s::timestamp, NOW()), COALESCE(%s::timestamp, NOW())
+                        WHERE EXISTS (SELECT 1 FROM activation_codes WHERE code = %s)
+                        ON CONFLICT (code, uri) DO NOTHING
+                        """,
+                        (
+                            code, entry["uri"], entry.get("name") or "", entry.get("audio_hash") or "",
+                            entry.get("created_at"), entry.get("last_used_at"), code,
+                        ),
+                    )
+                    imported += cur.rowcount
+        return imported
+
     def _build_info(self, row: Dict[str, Any]) -> Dict[str, Any]:
-        """构建激活码信息字典"""
-        today = datetime.utcnow().date()
+        """构建激活码信息字典（优先使用 SQL 已算好的额度与过期状态）"""
         expires_at = row.get("expires_at")
-        expired = expires_at is not None and today > expires_at
+        if "expired" in row:
+            expired = bool(row["expired"])
+        else:
+            expired = expires_at is not None and datetime.utcnow().date() > expires_at
 
         max_voices = row.get("max_voices", 0) or 0
         used_voices = row.get("used_voices", 0) or 0
-        available_voices = None if max_voices == 0 else max(max_voices - used_voices, 0)
+        if "available_voices" in row:
+            available_voices = row["available_voices"]
+        else:
+            available_voices = None if max_voices == 0 else max(max_voices - used_voices, 0)
 
         max_characters = row.get("max_characters", 0) or 0
         used_characters = row.get("used_characters", 0) or 0
-        remaining_characters = None if max_characters == 0 else max(max_characters - used_characters, 0)
+        if "remaining_characters" in row:
+            remaining_characters = row["remaining_characters"]
+        else:
+            remaining_characters = None if max_characters == 0 else max(max_characters - used_characters, 0)
 
         created_at = row.get("created_at")
         last_used_at = row.get("last_used_at")
@@ -251,4 +705,20 @@ class DatabaseActivationManager:
             "note": row.get("note", ""),
             "created_at": created_at.isoformat() if isinstance(created_at, datetime) else created_at,
             "last_used_at": last_used_at.isoformat() if isinstance(last_used_at, datetime) else last_used_at,
-        }
\ No newline at end of file
+        }
+
+
+_VOICE_COLUMNS = "uri, name, audio_hash, created_at, last_used_at"
+
+
+def _voice_from_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    voice = dict(row)
+    for key in ("created_at", "last_used_at"):
+        if isinstance(voice.get(key), datetime):
+            voice[key] = voice[key].isoformat()
+    return voice
+
+
+def _escape_like(value: str) -> str:
+    """转义 LIKE 模式中的通配符"""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
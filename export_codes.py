@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+激活码与用量流式导出工具
+
+逐条读取激活码并增量写出 CSV / JSONL，内存占用与激活码总量无关。
+设置了 DATABASE_URL 时读取 PostgreSQL（服务端命名游标），否则读取本地 JSON 文件。
+
+示例：
+    python export_codes.py --format csv --output codes.csv
+    python export_codes.py --format jsonl --status active > active.jsonl
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import csv
+import io
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from activation_manager import CODE_STATUS_FILTERS, ActivationError, create_activation_manager
+
+EXPORT_FORMATS = ("csv", "jsonl")
+
+EXPORT_FIELDS = (
+    "code",
+    "max_voices",
+    "used_voices",
+    "available_voices",
+    "max_characters",
+    "used_characters",
+    "remaining_characters",
+    "expires_at",
+    "expired",
+    "disabled",
+    "note",
+    "created_at",
+    "last_used_at",
+)
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "jsonl": "application/x-ndjson; charset=utf-8",
+}
+
+
+def iter_csv(infos: Iterable[Dict[str, Any]], batch_size: int = 500) -> Iterator[str]:
+    """把激活码信息编码为 CSV 文本块，每 batch_size 行产出一次。"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    pending = 0
+    for info in infos:
+        writer.writerow(["" if info.get(field) is None else info.get(field) for field in EXPORT_FIELDS])
+        pending += 1
+        if pending >= batch_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+            pending = 0
+    yield buffer.getvalue()
+
+
+def iter_jsonl(infos: Iterable[Dict[str, Any]], batch_size: int = 500) -> Iterator[str]:
+    """把激活码信息编码为 JSONL 文本块，每 batch_size 行产出一次。"""
+    lines: List[str] = []
+    for info in infos:
+        lines.append(json.dumps({field: info.get(field) for field in EXPORT_FIELDS}, ensure_ascii=False))
+        if len(lines) >= batch_size:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+def iter_export(manager, export_format: str, status: Optional[str] = None) -> Iterator[str]:
+    if export_format not in EXPORT_FORMATS:
+        raise ActivationError(f"不支持的导出格式：{export_format}")
+    if status and status not in CODE_STATUS_FILTERS:
+        raise ActivationError(f"不支持的状态筛选：{status}")
+    infos = manager.iter_codes(status=status)
+    return iter_csv(infos) if export_format == "csv" else iter_jsonl(infos)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="激活码与用量流式导出工具")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="csv", help="导出格式")
+    parser.add_argument("--status", choices=CODE_STATUS_FILTERS, default=None, help="按状态筛选")
+    parser.add_argument("--output", "-o", default=None, help="输出文件（默认写到标准输出）")
+    parser.add_argument(
+        "--store",
+        default="activation_codes.json",
+        help="未设置 DATABASE_URL 时读取的 JSON 存储文件",
+    )
+    args = parser.parse_args(argv)
+
+    # 存储初始化日志写到 stderr，避免混入导出内容
+    with contextlib.redirect_stdout(sys.stderr):
+        manager = create_activation_manager(Path(args.store))
+    try:
+        chunks = iter_export(manager, args.format, args.status)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8", newline="") as handle:
+                for chunk in chunks:
+                    handle.write(chunk)
+            print(f"✓ 已导出到 {args.output}", file=sys.stderr)
+        else:
+            for chunk in chunks:
+                sys.stdout.write(chunk)
+    except (ActivationError, OSError) as exc:
+        print(f"错误：{exc}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+健康检查
+
+- /healthz 只说明进程存活，不访问任何外部依赖；
+- /readyz 返回后台线程定期刷新的检查结果（存储、上游 API），
+  探针请求本身是 O(1) 的，不会占用数据库连接。
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+import requests
+
+HEALTH_CHECK_INTERVAL = float(os.getenv("HEALTH_CHECK_INTERVAL", "30"))
+UPSTREAM_CHECK_TIMEOUT = (3, 5)
+
+HealthCheck = Callable[[], Dict[str, Any]]
+
+
+def check_upstream(url: str) -> Dict[str, Any]:
+    """上游 API 可达即视为正常（未带鉴权，4xx 也说明服务在线）"""
+    response = requests.head(url, timeout=UPSTREAM_CHECK_TIMEOUT, allow_redirects=False)
+    return {"ok": response.status_code < 500, "status_code": response.status_code}
+
+
+class HealthMonitor:
+    """在后台线程中定期执行检查，探针只读取缓存的结果"""
+
+    def __init__(
+        self,
+        checks: Dict[str, HealthCheck],
+        critical: Iterable[str] = (),
+        interval: float = HEALTH_CHECK_INTERVAL,
+    ):
+        self.checks = checks
+        self.critical = set(critical)
+        self.interval = interval
+        self.started_at = time.time()
+        self._results: Dict[str, Dict[str, Any]] = {}
+        self._checked_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._loop, name="health-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            self.refresh()
+            self._stop.wait(self.interval)
+
+    def refresh(self) -> None:
+        results: Dict[str, Dict[str, Any]] = {}
+        for name, check in self.checks.items():
+            start = time.perf_counter()
+            try:
+                result = dict(check())
+            except Exception as exc:
+                result = {"ok": False, "error": str(exc)}
+            result["latency_ms"] = round((time.perf_counter() - start) * 1000, 1)
+            results[name] = result
+        with self._lock:
+            self._results = results
+            self._checked_at = time.time()
+
+    def liveness(self) -> Dict[str, Any]:
+        return {"status": "ok", "uptime_seconds": int(time.time() - self.started_at)}
+
+    def readiness(self) -> Dict[str, Any]:
+        with self._lock:
+            results = self._results
+            checked_at = self._checked_at
+        if checked_at is None:
+            return {"ready": False, "status": "starting", "checks": {}}
+        ready = all(results.get(name, {}).get("ok") for name in self.critical)
+        degraded = not all(result.get("ok") for result in results.values())
+        return {
+            "ready": ready,
+            "status": "degraded" if ready and degraded else ("ok" if ready else "unavailable"),
+            "checked_at": checked_at,
+            "age_seconds": round(time.time() - checked_at, 1),
+            "checks": results,
+        }
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+上游合成耗时模型
+
+每次成功的合成请求记录 (字数, 耗时, 音频时长)，用指数衰减的加权最小二乘在线拟合
+
+    耗时 ≈ intercept + slope × 字数
+
+衰减让模型跟随上游负载的变化，权重每 HALF_LIFE 个样本减半。
+
+流式合成据此选择分段长度：n 字分成 k 段、每个连接最多 P 段同时请求时，总耗时约为
+
+    ceil(k / P) × (intercept + slope × n / k)
+
+分段太少无法并行，太多则每段的固定开销累加；在 [MIN_CHUNK_CHARS, max_chars]
+内取总耗时最小的分段长度，作为分段器合并完整句子的目标长度（不用来切开句子）。
+样本不足 MIN_SAMPLES 时使用调用方给出的默认值。
+拟合结果同时输出到 /metrics。
+"""
+
+from __future__ import annotations
+
+import io
+import math
+import threading
+import wave
+from typing import Optional, Tuple
+
+import metrics
+
+HALF_LIFE = 200
+MIN_SAMPLES = 10
+MIN_CHUNK_CHARS = 20
+# /metrics 中输出预测耗时的字数
+CURVE_POINTS = (20, 50, 100, 200, 500, 1000, 2000)
+
+# MPEG-1 / MPEG-2 Layer III 的码率表（kbps）
+MP3_BITRATES = {
+    1: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    2: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+
+
+def _mp3_seconds(content: bytes) -> Optional[float]:
+    """按第一帧的码率估算时长（VBR 文件为近似值）"""
+    offset = 0
+    if content[:3] == b"ID3" and len(content) >= 10:
+        size = content[6:10]
+        offset = 10 + ((size[0] & 0x7F) << 21 | (size[1] & 0x7F) << 14 | (size[2] & 0x7F) << 7 | (size[3] & 0x7F))
+    while offset + 4 <= len(content):
+        if content[offset] == 0xFF and content[offset + 1] & 0xE0 == 0xE0:
+            version = (content[offset + 1] >> 3) & 0x03
+            layer = (content[offset + 1] >> 1) & 0x03
+            bitrate_index = content[offset + 2] >> 4
+            if layer == 1 and version != 1 and 0 < bitrate_index < 15:
+                kbps = MP3_BITRATES[1 if version == 3 else 2][bitrate_index]
+                return (len(content) - offset) * 8 / (kbps * 1000)
+        offset += 1
+    return None
+
+
+def audio_seconds(content: bytes, response_format: str) -> Optional[float]:
+    """合成结果的时长；无法解析的格式返回 None"""
+    try:
+        if response_format == "wav":
+            with wave.open(io.BytesIO(content), "rb") as reader:
+                return reader.getnframes() / reader.getframerate()
+        if response_format == "mp3":
+            return _mp3_seconds(content)
+    except (wave.Error, EOFError, ZeroDivisionError):
+        return None
+    return None
+
+
+class LatencyModel:
+    def __init__(self, half_life: float = HALF_LIFE, min_samples: int = MIN_SAMPLES):
+        self.decay = 0.5 ** (1 / half_life)
+        self.min_samples = min_samples
+        self.samples = 0
+        self._lock = threading.Lock()
+        # 加权和：权重、x、y、x²、xy；音频时长与对应字数
+        self._weight = self._sum_x = self._sum_y = self._sum_xx = self._sum_xy = 0.0
+        self._audio_seconds = self._audio_chars = 0.0
+
+    def record(self, characters: int, latency: float, audio_duration: Optional[float] = None) -> None:
+        if characters <= 0 or latency <= 0:
+            return
+        with self._lock:
+            decay = self.decay
+            self._weight = self._weight * decay + 1
+            self._sum_x = self._sum_x * decay + characters
+            self._sum_y = self._sum_y * decay + latency
+            self._sum_xx = self._sum_xx * decay + characters * characters
+            self._sum_xy = self._sum_xy * decay + characters * latency
+            if audio_duration:
+                self._audio_seconds = self._audio_seconds * decay + audio_duration
+                self._audio_chars = self._audio_chars * decay + characters
+            self.samples += 1
+        self._publish()
+
+    def coefficients(self) -> Optional[Tuple[float, float]]:
+        """返回 (intercept 秒, slope 秒/字)；样本不足或字数没有变化时返回 None"""
+        with self._lock:
+            if self.samples < self.min_samples:
+                return None
+            mean_x = self._sum_x / self._weight
+            mean_y = self._sum_y / self._weight
+            variance = self._sum_xx / self._weight - mean_x * mean_x
+            covariance = self._sum_xy / self._weight - mean_x * mean_y
+        if variance < 1.0:
+            return None
+        slope = max(covariance / variance, 0.0)
+        return max(mean_y - slope * mean_x, 0.0), slope
+
+    def predict(self, characters: int) -> Optional[float]:
+        coefficients = self.coefficients()
+        if coefficients is None:
+            return None
+        intercept, slope = coefficients
+        return intercept + slope * characters
+
+    def audio_seconds_per_char(self) -> Optional[float]:
+        with self._lock:
+            if not self._audio_chars:
+                return None
+            return self._audio_seconds / self._audio_chars
+
+    def chunk_chars(self, total: int, parallelism: int, default: int, max_chars: int) -> int:
+        """total 字在 parallelism 路并行下总耗时最短的分段长度"""
+        coefficients = self.coefficients()
+        if coefficients is None or total <= 0:
+            return default
+        intercept, slope = coefficients
+        parallelism = max(parallelism, 1)
+        upper = max(min(max_chars, total), 1)
+        lower = min(MIN_CHUNK_CHARS, upper)
+        best_size, best_seconds = upper, math.inf
+        for chunks in range(math.ceil(total / upper), math.ceil(total / lower) + 1):
+            size = math.ceil(total / chunks)
+            seconds = math.ceil(chunks / parallelism) * (intercept + slope * size)
+            if seconds < best_seconds - 1e-9:
+                best_size, best_seconds = size, seconds
+        return best_size
+
+    def _publish(self) -> None:
+        metrics.UPSTREAM_LATENCY_MODEL.set(self.samples, parameter="samples")
+        coefficients = self.coefficients()
+        if coefficients is not None:
+            intercept, slope = coefficients
+            metrics.UPSTREAM_LATENCY_MODEL.set(intercept, parameter="intercept_seconds")
+            metrics.UPSTREAM_LATENCY_MODEL.set(slope, parameter="seconds_per_character")
+            for characters in CURVE_POINTS:
+                metrics.UPSTREAM_PREDICTED_SECONDS.set(intercept + slope * characters, characters=characters)
+        per_char = self.audio_seconds_per_char()
+        if per_char is not None:
+            metrics.UPSTREAM_LATENCY_MODEL.set(per_char, parameter="audio_seconds_per_character")
+
+
+LATENCY_MODEL = LatencyModel()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+延迟初始化
+
+冷启动时只创建占位对象，真正的初始化（连接数据库、构建 Gradio 界面）
+推迟到第一次使用时进行：
+
+    LazyProxy      普通对象的代理，第一次访问属性时调用工厂函数
+    LazyASGIApp    ASGI 应用的代理，第一次收到请求时在线程池中构建
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class LazyProxy:
+    """第一次访问属性时才调用 factory，之后所有属性原样转发"""
+
+    def __init__(self, factory: Callable[[], Any], name: str = ""):
+        object.__setattr__(self, "_lazy_factory", factory)
+        object.__setattr__(self, "_lazy_name", name or getattr(factory, "__name__", "object"))
+        object.__setattr__(self, "_lazy_target", None)
+        object.__setattr__(self, "_lazy_lock", threading.Lock())
+
+    def _lazy_resolve(self) -> Any:
+        target = self._lazy_target
+        if target is None:
+            with self._lazy_lock:
+                target = self._lazy_target
+                if target is None:
+                    start = time.perf_counter()
+                    target = self._lazy_factory()
+                    object.__setattr__(self, "_lazy_target", target)
+                    logger.info("已初始化 %s（%.0f ms）", self._lazy_name, (time.perf_counter() - start) * 1000)
+        return target
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._lazy_resolve(), name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self._lazy_resolve(), name, value)
+
+    def __repr__(self) -> str:
+        if self._lazy_target is None:
+            return f"<LazyProxy {self._lazy_name} (未初始化)>"
+        return repr(self._lazy_target)
+
+
+def is_initialized(proxy: Any) -> bool:
+    """LazyProxy 是否已经创建了目标对象；普通对象始终返回 True"""
+    if isinstance(proxy, LazyProxy):
+        return object.__getattribute__(proxy, "_lazy_target") is not None
+    return True
+
+
+class LazyASGIApp:
+    """第一次请求时构建 ASGI 应用；构建在线程池中进行，不阻塞事件循环"""
+
+    def __init__(self, factory: Callable[[], Any], name: str = ""):
+        self.factory = factory
+        self.name = name or getattr(factory, "__name__", "app")
+        self._app: Optional[Any] = None
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def _resolve(self) -> Any:
+        if self._app is None:
+            if self._lock is None:
+                self._lock = asyncio.Lock()
+            async with self._lock:
+                if self._app is None:
+                    start = time.perf_counter()
+                    self._app = await asyncio.get_running_loop().run_in_executor(None, self.factory)
+                    logger.info("已构建 %s（%.0f ms）", self.name, (time.perf_counter() - start) * 1000)
+        return self._app
+
+    async def __call__(self, scope: Any, receive: Any, send: Any) -> None:
+        app = await self._resolve()
+        await app(scope, receive, send)
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+激活码批量管理工具（替代原 import_codes.py / restore_codes.py）
+
+自动选择存储：设置了 DATABASE_URL 时写入 PostgreSQL，否则写入本地 JSON 文件。
+
+示例：
+    # 批量生成 10000 个激活码并保存到文件
+    python manage_codes.py generate --count 10000 --voices 1 --chars 1000 \\
+        --expires 2025-12-31 --note 渠道A --output codes.txt
+
+    # 导入指定激活码（支持 .csv / .json / .jsonl）
+    python manage_codes.py import restore_codes.csv
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from activation_manager import ActivationError, create_activation_manager
+
+DEFAULT_STORE_PATH = Path("activation_codes.json")
+
+
+def load_code_records(path: Path) -> List[Dict[str, Any]]:
+    """读取待导入的激活码记录。
+
+    - ``.csv``：首行为表头，至少包含 ``code`` 列；
+    - ``.jsonl``：每行一个 JSON 对象；
+    - ``.json``：记录数组，或 activation_codes.json 的 ``{"codes": {...}}`` 格式。
+    """
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix == ".csv":
+        with path.open("r", encoding="utf-8-sig", newline="") as handle:
+            return [dict(row) for row in csv.DictReader(handle)]
+    if suffix == ".jsonl":
+        with path.open("r", encoding="utf-8-sig") as handle:
+            return [json.loads(line) for line in handle if line.strip()]
+    if suffix == ".json":
+        data = json.loads(path.read_text(encoding="utf-8-sig"))
+        if isinstance(data, dict) and isinstance(data.get("codes"), dict):
+            return [{**record, "code": code} for code, record in data["codes"].items()]
+        if isinstance(data, list):
+            return data
+        raise ActivationError("JSON 文件格式不正确，应为记录数组或 {\"codes\": {...}}。")
+    raise ActivationError(f"不支持的文件类型：{path.suffix or path.name}")
+
+
+def run_generate(manager, args: argparse.Namespace) -> int:
+    template = {
+        "max_voices": args.voices,
+        "max_characters": args.chars,
+        "expires_at": args.expires,
+        "note": args.note,
+    }
+    infos = manager.create_codes(args.count, template)
+    codes = "\n".join(info["code"] for info in infos)
+    if args.output:
+        Path(args.output).write_text(codes + "\n", encoding="utf-8")
+        print(f"✓ 已生成 {len(infos)} 个激活码，已保存到 {args.output}")
+    else:
+        print(codes)
+        print(f"✓ 已生成 {len(infos)} 个激活码", file=sys.stderr)
+    return 0
+
+
+def run_import(manager, args: argparse.Namespace) -> int:
+    records = load_code_records(Path(args.file))
+    imported, skipped = manager.import_codes(records)
+    for code in skipped:
+        print(f"⚠ 激活码 {code} 已存在，跳过")
+    print(f"✓ 导入完成：新增 {len(imported)} 个，跳过 {len(skipped)} 个")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="激活码批量管理工具")
+    parser.add_argument(
+        "--store",
+        default=str(DEFAULT_STORE_PATH),
+        help="未设置 DATABASE_URL 时使用的 JSON 存储文件（默认 activation_codes.json）",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    generate = subparsers.add_parser("generate", help="按模板批量生成激活码")
+    generate.add_argument("--count", type=int, default=1, help="生成数量")
+    generate.add_argument("--voices", type=int, default=0, help="可用音色数量（0 表示无限）")
+    generate.add_argument("--chars", type=int, default=0, help="可用字符数量（0 表示无限）")
+    generate.add_argument("--expires", default=None, help="有效期 YYYY-MM-DD")
+    generate.add_argument("--note", default="", help="备注")
+    generate.add_argument("--output", "-o", default=None, help="输出文件（默认打印到标准输出）")
+    generate.set_defaults(handler=run_generate)
+
+    import_parser = subparsers.add_parser("import", help="从 CSV / JSON / JSONL 文件导入指定激活码")
+    import_parser.add_argument("file", help="待导入的文件")
+    import_parser.set_defaults(handler=run_import)
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    manager = create_activation_manager(Path(args.store))
+    try:
+        return args.handler(manager, args)
+    except (ActivationError, OSError, ValueError) as exc:
+        print(f"错误：{exc}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
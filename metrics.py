@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+轻量级 Prometheus 指标（仅依赖标准库）
+
+提供 Counter / Gauge / Histogram 三种指标，/metrics 路由通过
+REGISTRY.render() 输出 Prometheus 文本格式（0.0.4）。
+"""
+
+from __future__ import annotations
+
+import contextlib
+import functools
+import inspect
+import math
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+STORE_LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+BYTES_BUCKETS = (16 * 1024, 64 * 1024, 256 * 1024, 1024 ** 2, 4 * 1024 ** 2, 16 * 1024 ** 2)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} 需要标签 {self.labelnames}，实际为 {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: Any) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._function: Optional[Callable[[], float]] = None
+
+    def dec(self, amount: float = 1, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """输出时调用 function 取值（仅适用于无标签的指标）"""
+        self._function = function
+
+    @contextlib.contextmanager
+    def track_inprogress(self, **labels: Any) -> Iterator[None]:
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def _samples(self) -> List[str]:
+        if self._function is not None:
+            return [f"{self.name} {_format_value(self._function())}"]
+        return super()._samples()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # 标签 -> [各桶计数, 总和, 样本数]
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, totals = self._values.setdefault(key, ([0] * len(self.buckets), [0.0, 0]))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            totals[0] += value
+            totals[1] += 1
+
+    @contextlib.contextmanager
+    def time(self, **labels: Any) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels: Any) -> int:
+        with self._lock:
+            entry = self._values.get(self._key(labels))
+            return int(entry[1][1]) if entry else 0
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, (list(counts), list(totals))) for key, (counts, totals) in self._values.items())
+        lines: List[str] = []
+        for key, (counts, (total, samples)) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {int(samples)}")
+        return lines
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"指标 {metric.name} 已注册")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+UPSTREAM_SECONDS = REGISTRY.histogram(
+    "azvoice_upstream_request_seconds",
+    "SiliconFlow 请求耗时（speech=语音合成，upload=参考音频上传）",
+    ("endpoint",),
+)
+UPSTREAM_RESPONSES = REGISTRY.counter(
+    "azvoice_upstream_responses_total",
+    "SiliconFlow 响应次数，按 HTTP 状态码（timeout/error 表示未收到响应）",
+    ("endpoint", "status"),
+)
+AUDIO_BYTES = REGISTRY.histogram(
+    "azvoice_audio_bytes",
+    "音频大小（synthesized=合成结果，uploaded=上传的参考音频）",
+    ("direction",),
+    buckets=BYTES_BUCKETS,
+)
+CLONES_IN_PROGRESS = REGISTRY.gauge(
+    "azvoice_clone_in_progress",
+    "正在处理的声音克隆请求数",
+)
+CLONE_SLOT_WAITING = REGISTRY.gauge(
+    "azvoice_clone_slot_waiting",
+    "正在等待上游并发名额（CLONE_CONCURRENCY）的合成请求数（clone=界面与 REST，segment=流式分段）",
+    ("kind",),
+)
+CLONE_SLOT_WAIT_SECONDS = REGISTRY.histogram(
+    "azvoice_clone_slot_wait_seconds",
+    "合成请求等待上游并发名额的耗时",
+    ("kind",),
+)
+GRADIO_QUEUE_DEPTH = REGISTRY.gauge(
+    "azvoice_gradio_queue_depth",
+    "前台 Gradio 队列中排队、尚未开始处理的事件数",
+)
+STORE_SECONDS = REGISTRY.histogram(
+    "azvoice_activation_store_seconds",
+    "激活码存储操作耗时",
+    ("backend", "method"),
+    buckets=STORE_LATENCY_BUCKETS,
+)
+STORE_ERRORS = REGISTRY.counter(
+    "azvoice_activation_store_errors_total",
+    "激活码存储操作抛出的异常数",
+    ("backend", "method", "error"),
+)
+LOGS_DROPPED = REGISTRY.counter(
+    "azvoice_logs_dropped_total",
+    "日志队列已满而丢弃的日志条数",
+)
+PREFLIGHT_REJECTIONS = REGISTRY.counter(
+    "azvoice_preflight_rejections_total",
+    "本地预检未通过、未发往上游的克隆请求数",
+)
+UPSTREAM_LATENCY_MODEL = REGISTRY.gauge(
+    "azvoice_upstream_latency_model",
+    "合成耗时模型（见 latency_model.py）：samples、intercept_seconds、seconds_per_character、"
+    "audio_seconds_per_character",
+    ("parameter",),
+)
+UPSTREAM_PREDICTED_SECONDS = REGISTRY.gauge(
+    "azvoice_upstream_predicted_seconds",
+    "按拟合的耗时模型预测的不同字数的合成耗时",
+    ("characters",),
+)
+STREAM_FIRST_AUDIO_SECONDS = REGISTRY.histogram(
+    "azvoice_stream_first_audio_seconds",
+    "流式合成从收到第一段文本到发出第一段音频的耗时",
+)
+STREAM_SEGMENTS = REGISTRY.counter(
+    "azvoice_stream_segments_total",
+    "流式合成的分段数（ok=已发送，error=合成失败）",
+    ("result",),
+)
+CACHE_REQUESTS = REGISTRY.counter(
+    "azvoice_cache_requests_total",
+    "缓存命中与未命中次数",
+    ("cache", "result"),
+)
+
+
+def record_upstream_status(endpoint: str, status: Any) -> None:
+    UPSTREAM_RESPONSES.inc(endpoint=endpoint, status=status)
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+class InstrumentedManager:
+    """激活码管理器代理：记录每个公开方法的耗时与异常，其余属性原样转发"""
+
+    def __init__(self, manager: Any):
+        self._manager = manager
+        self._backend = type(manager).__name__
+        self._wrapped: Dict[str, Callable[..., Any]] = {}
+
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self._manager, name)
+        if name.startswith("_") or not callable(attribute):
+            return attribute
+        wrapped = self._wrapped.get(name)
+        if wrapped is None:
+            wrapped = self._instrument(name)
+            self._wrapped[name] = wrapped
+        return wrapped
+
+    def _instrument(self, name: str) -> Callable[..., Any]:
+        method = getattr(self._manager, name)
+        backend = self._backend
+        if inspect.isgeneratorfunction(method):
+            return self._instrument_generator(name, method)
+
+        @functools.wraps(method)
+        def call(*args: Any, **kwargs: Any) -> Any:
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            except Exception as exc:
+                STORE_ERRORS.inc(backend=backend, method=name, error=type(exc).__name__)
+                raise
+            finally:
+                STORE_SECONDS.observe(time.perf_counter() - start, backend=backend, method=name)
+
+        return call
+
+    def _instrument_generator(self, name: str, method: Callable[..., Any]) -> Callable[..., Any]:
+        """生成器方法（如 iter_codes）：累计每次取下一条的耗时，遍历结束时记录一次"""
+        backend = self._backend
+
+        @functools.wraps(method)
+        def iterate(*args: Any, **kwargs: Any) -> Iterator[Any]:
+            iterator = method(*args, **kwargs)
+            elapsed = 0.0
+            try:
+                while True:
+                    start = time.perf_counter()
+                    try:
+                        item = next(iterator)
+                    except StopIteration:
+                        return
+                    finally:
+                        elapsed += time.perf_counter() - start
+                    yield item
+            except Exception as exc:
+                STORE_ERRORS.inc(backend=backend, method=name, error=type(exc).__name__)
+                raise
+            finally:
+                iterator.close()
+                STORE_SECONDS.observe(elapsed, backend=backend, method=name)
+
+        return iterate
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+构建信息与运行时状态
+
+构建信息（提交号、构建时间、依赖版本）只在启动时解析一次，来源优先级：
+    1. build_info.json（部署构建阶段执行 `python runtime_info.py --write` 生成）
+    2. 平台注入的环境变量（Render 的 RENDER_GIT_COMMIT 等）
+    3. 本地开发时调用一次 git rev-parse
+
+示例：
+    python runtime_info.py --write   # 生成 build_info.json
+    python runtime_info.py           # 打印当前构建信息
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from importlib import metadata
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+APP_VERSION = "2.0"
+BUILD_INFO_PATH = Path(__file__).resolve().parent / "build_info.json"
+COMMIT_ENV_VARS = ("RENDER_GIT_COMMIT", "GIT_COMMIT", "SOURCE_COMMIT")
+TRACKED_PACKAGES = ("gradio", "fastapi", "uvicorn", "requests", "psycopg2-binary", "asyncpg")
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def _package_versions() -> Dict[str, Optional[str]]:
+    versions: Dict[str, Optional[str]] = {}
+    for name in TRACKED_PACKAGES:
+        try:
+            versions[name] = metadata.version(name)
+        except metadata.PackageNotFoundError:
+            versions[name] = None
+    return versions
+
+
+def _resolve_commit() -> str:
+    for name in COMMIT_ENV_VARS:
+        value = os.getenv(name, "").strip()
+        if value:
+            return value[:7]
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BUILD_INFO_PATH.parent,
+            stderr=subprocess.DEVNULL,
+            timeout=5,
+        ).decode().strip()
+    except (OSError, subprocess.SubprocessError):
+        return "unknown"
+
+
+def collect_build_info() -> Dict[str, Any]:
+    return {
+        "version": APP_VERSION,
+        "commit": _resolve_commit(),
+        "built_at": datetime.datetime.utcnow().replace(microsecond=0).isoformat() + "Z",
+        "python": platform.python_version(),
+        "packages": _package_versions(),
+    }
+
+
+def load_build_info(path: Path = BUILD_INFO_PATH) -> Dict[str, Any]:
+    """读取构建阶段生成的 build_info.json，不存在或损坏时现场解析"""
+    try:
+        info = json.loads(path.read_text(encoding="utf-8"))
+        info["source"] = "build_info.json"
+        return info
+    except (OSError, ValueError):
+        info = collect_build_info()
+        info["source"] = "startup"
+        return info
+
+
+class RuntimeInfo:
+    """进程级运行时信息；构建信息在创建时解析一次后缓存"""
+
+    def __init__(self, build_info: Optional[Dict[str, Any]] = None):
+        self.build = build_info if build_info is not None else load_build_info()
+        self.started_at = time.time()
+
+    def uptime_seconds(self) -> int:
+        return int(time.time() - self.started_at)
+
+    def version(self) -> Dict[str, Any]:
+        return {
+            "version": self.build.get("version", APP_VERSION),
+            "commit": self.build.get("commit", "unknown"),
+            "built_at": self.build.get("built_at"),
+            "uptime_seconds": self.uptime_seconds(),
+            "admin_login_fix": "2024-09-30-v5",
+            "status": "ok",
+        }
+
+    def runtime(self) -> Dict[str, Any]:
+        times = os.times()
+        stats: Dict[str, Any] = {
+            "build": self.build,
+            "started_at": datetime.datetime.utcfromtimestamp(self.started_at).replace(microsecond=0).isoformat() + "Z",
+            "uptime_seconds": self.uptime_seconds(),
+            "pid": os.getpid(),
+            "threads": threading.active_count(),
+            "cpu_seconds": round(times.user + times.system, 2),
+            "gc_counts": list(gc.get_count()),
+        }
+        if resource is not None:
+            # Linux 上 ru_maxrss 单位为 KB，macOS 为字节
+            max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            stats["max_rss_mb"] = round(max_rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+        return stats
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="构建信息工具")
+    parser.add_argument("--write", action="store_true", help=f"写入 {BUILD_INFO_PATH.name}")
+    args = parser.parse_args(argv)
+
+    info = collect_build_info()
+    text = json.dumps(info, ensure_ascii=False, indent=2)
+    if args.write:
+        BUILD_INFO_PATH.write_text(text + "\n", encoding="utf-8")
+        print(f"✓ 已写入 {BUILD_INFO_PATH.name}（commit {info['commit']}）")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
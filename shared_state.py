@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多进程共享状态（合成结果缓存、限流计数）
+
+按配置自动选择后端：
+    REDIS_URL 已设置   Redis 或兼容服务（需安装 redis 包）
+    使用 PostgreSQL    与激活码共用连接池，数据存放在 shared_state 表
+    其他情况           进程内字典（仅适用于单进程部署）
+
+所有后端的值都是字符串，二进制内容请自行编码。
+"""
+
+from __future__ import annotations
+
+import collections
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Optional, Protocol, Tuple
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.getenv("REDIS_URL", "").strip()
+LOCAL_STORE_MAX_ENTRIES = int(os.getenv("LOCAL_STORE_MAX_ENTRIES", "1024"))
+
+
+class SharedStore(Protocol):
+    backend: str
+
+    def get(self, key: str) -> Optional[str]: ...
+
+    def set(self, key: str, value: str, ttl: Optional[int] = None) -> None: ...
+
+    def incr(self, key: str, amount: int = 1, ttl: Optional[int] = None) -> int: ...
+
+    def delete(self, key: str) -> None: ...
+
+
+class LocalStore:
+    """进程内存储；超过容量时淘汰最早写入的键"""
+
+    backend = "local"
+
+    def __init__(self, max_entries: int = LOCAL_STORE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._data: "collections.OrderedDict[str, Tuple[str, Optional[float]]]" = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def _live(self, key: str) -> Optional[str]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        return value
+
+    def _store(self, key: str, value: str, expires_at: Optional[float]) -> None:
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            return self._live(key)
+
+    def set(self, key: str, value: str, ttl: Optional[int] = None) -> None:
+        with self._lock:
+            self._store(key, value, time.monotonic() + ttl if ttl else None)
+
+    def incr(self, key: str, amount: int = 1, ttl: Optional[int] = None) -> int:
+        with self._lock:
+            current = self._live(key)
+            if current is None:
+                value = amount
+                expires_at = time.monotonic() + ttl if ttl else None
+            else:
+                value = int(current) + amount
+                expires_at = self._data[key][1]
+            self._store(key, str(value), expires_at)
+            return value
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+
+class RedisStore:
+    backend = "redis"
+
+    def __init__(self, url: str):
+        if not REDIS_AVAILABLE:
+            raise RuntimeError("需要安装 redis: pip install redis")
+        self._client = redis.Redis.from_url(url, decode_responses=True)
+
+    def get(self, key: str) -> Optional[str]:
+        return self._client.get(key)
+
+    def set(self, key: str, value: str, ttl: Optional[int] = None) -> None:
+        self._client.set(key, value, ex=ttl or None)
+
+    def incr(self, key: str, amount: int = 1, ttl: Optional[int] = None) -> int:
+        value = int(self._client.incrby(key, amount))
+        if ttl and value == amount:
+            self._client.expire(key, ttl)
+        return value
+
+    def delete(self, key: str) -> None:
+        self._client.delete(key)
+
+
+class PostgresStore:
+    """复用 DatabaseActivationManager 的连接池"""
+
+    backend = "postgresql"
+    PURGE_PROBABILITY = 0.01
+
+    def __init__(self, manager: Any):
+        self._manager = manager
+        with manager._get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    CREATE TABLE IF NOT EXISTS shared_state (
+                        key TEXT PRIMARY KEY,
+                        value TEXT NOT NULL,
+                        expires_at TIMESTAMP
+                    )
+                """)
+
+    def _execute(self, query: str, params: Tuple[Any, ...]) -> Optional[Tuple[Any, ...]]:
+        with self._manager._get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(query, params)
+                return cur.fetchone() if cur.description else None
+
+    def get(self, key: str) -> Optional[str]:
+        row = self._execute(
+            "SELECT value FROM shared_state WHERE key = %s AND (expires_at IS NULL OR expires_at > NOW())",
+            (key,),
+        )
+        return row[0] if row else None
+
+    def set(self, key: str, value: str, ttl: Optional[int] = None) -> None:
+        self._execute(
+            """
+            INSERT INTO shared_state (key, value, expires_at)
+            VALUES (%s, %s, NOW() + make_interval(secs => %s))
+            ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value, expires_at = EXCLUDED.expires_at
+            """,
+            (key, value, ttl or None),
+        )
+        # 偶尔顺带清理过期数据，避免表无限增长
+        if random.random() < self.PURGE_PROBABILITY:
+            self._execute("DELETE FROM shared_state WHERE expires_at <= NOW()", ())
+
+    def incr(self, key: str, amount: int = 1, ttl: Optional[int] = None) -> int:
+        row = self._execute(
+            """
+            INSERT INTO shared_state AS s (key, value, expires_at)
+            VALUES (%s, %s, NOW() + make_interval(secs => %s))
+            ON CONFLICT (key) DO UPDATE SET
+                value = CASE WHEN s.expires_at <= NOW() THEN EXCLUDED.value
+                             ELSE (s.value::bigint + EXCLUDED.value::bigint)::text END,
+                expires_at = CASE WHEN s.expires_at <= NOW() THEN EXCLUDED.expires_at
+                                  ELSE s.expires_at END
+            RETURNING value
+            """,
+            (key, str(int(amount)), ttl or None),
+        )
+        return int(row[0])
+
+    def delete(self, key: str) -> None:
+        self._execute("DELETE FROM shared_state WHERE key = %s", (key,))
+
+
+def check_rate_limit(store: SharedStore, key: str, limit: int, window_seconds: int = 60) -> bool:
+    """固定窗口限流：当前窗口内的次数未超过 limit 时返回 True"""
+    if limit <= 0:
+        return True
+    window = int(time.time() // window_seconds)
+    count = store.incr(f"ratelimit:{key}:{window}", 1, ttl=window_seconds * 2)
+    return count <= limit
+
+
+def create_shared_store(manager: Any = None) -> SharedStore:
+    """REDIS_URL 优先，其次与 PostgreSQL 激活码存储共用数据库，否则使用进程内存储"""
+    if REDIS_URL:
+        try:
+            store = RedisStore(REDIS_URL)
+            logger.info("共享状态使用 Redis")
+            return store
+        except Exception as exc:
+            logger.error("Redis 初始化失败，改用其他共享状态后端：%s", exc)
+    if manager is not None and getattr(manager, "database_url", None):
+        store = PostgresStore(manager)
+        logger.info("共享状态使用 PostgreSQL")
+        return store
+    logger.info("共享状态使用进程内存储（仅适用于单进程部署）")
+    return LocalStore()
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+激活码快照：生成、校验与恢复
+
+快照是 gzip 压缩的 JSON Lines 文件：
+    第一行  {"format": "azvoiceclone-activation-snapshot", "version": 2, "created_at": ...}
+    中间行  每行一条激活码记录（字段见 CODE_RECORD_FIELDS），
+            之后每行一个音色库条目 {"voice": {...}}（字段见 VOICE_RECORD_FIELDS）
+    最后一行 {"end": true, "count": N, "voices": M, "sha256": "..."}（所有记录行的校验和）
+
+版本 1 的快照没有音色库条目，仍可读取。
+
+读写均为流式处理，内存占用与激活码数量无关。快照来源可以是本地路径、
+file:// 或 http(s):// 地址。在 Render 等临时文件系统上，设置环境变量
+ACTIVATION_SNAPSHOT 指向快照后，JSON 存储会在第一次读取时按需恢复。
+
+示例：
+    python snapshot.py create --output activation_codes.snapshot.gz
+    python snapshot.py verify https://example.com/activation_codes.snapshot.gz
+    python snapshot.py restore activation_codes.snapshot.gz
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import datetime
+import gzip
+import hashlib
+import json
+import sys
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from activation_manager import CODE_RECORD_FIELDS, VOICE_RECORD_FIELDS, ActivationError, create_activation_manager
+
+SNAPSHOT_FORMAT = "azvoiceclone-activation-snapshot"
+SNAPSHOT_VERSION = 2
+READABLE_VERSIONS = (1, 2)
+SNAPSHOT_TIMEOUT = (10, 60)
+
+
+class SnapshotError(ActivationError):
+    """Raised when a snapshot cannot be read or fails verification."""
+
+
+def _encode_line(item: Dict[str, Any]) -> bytes:
+    return json.dumps(item, ensure_ascii=False, sort_keys=True).encode("utf-8") + b"\n"
+
+
+def write_snapshot(
+    records: Iterable[Dict[str, Any]],
+    output: BinaryIO,
+    voices: Iterable[Dict[str, Any]] = (),
+) -> Dict[str, Any]:
+    """把激活码记录与音色库条目流式写入快照，返回尾部摘要。"""
+    digest = hashlib.sha256()
+    count = voice_count = 0
+    with gzip.GzipFile(fileobj=output, mode="wb") as archive:
+        header = {
+            "format": SNAPSHOT_FORMAT,
+            "version": SNAPSHOT_VERSION,
+            "created_at": datetime.datetime.utcnow().isoformat(),
+        }
+        archive.write(json.dumps(header).encode("utf-8") + b"\n")
+        for record in records:
+            line = _encode_line({field: record.get(field) for field in CODE_RECORD_FIELDS})
+            digest.update(line)
+            archive.write(line)
+            count += 1
+        for voice in voices:
+            line = _encode_line({"voice": {field: voice.get(field) for field in VOICE_RECORD_FIELDS}})
+            digest.update(line)
+            archive.write(line)
+            voice_count += 1
+        footer = {"end": True, "count": count, "voices": voice_count, "sha256": digest.hexdigest()}
+        archive.write(json.dumps(footer).encode("utf-8") + b"\n")
+    return footer
+
+
+@contextlib.contextmanager
+def open_snapshot_source(source: str) -> Iterator[BinaryIO]:
+    """打开快照来源（本地路径、file:// 或 http(s):// 地址），返回二进制流。"""
+    if source.startswith(("http://", "https://")):
+        import requests
+
+        try:
+            response = requests.get(source, stream=True, timeout=SNAPSHOT_TIMEOUT)
+        except requests.exceptions.RequestException as exc:
+            raise SnapshotError(f"下载快照失败：{exc}")
+        with contextlib.closing(response):
+            if response.status_code != 200:
+                raise SnapshotError(f"下载快照失败（HTTP {response.status_code}）")
+            response.raw.decode_content = True
+            yield response.raw
+        return
+
+    if source.startswith("file://"):
+        source = source[len("file://"):]
+    try:
+        handle = open(source, "rb")
+    except OSError as exc:
+        raise SnapshotError(f"读取快照失败：{exc}")
+    with handle:
+        yield handle
+
+
+def iter_snapshot(stream: BinaryIO) -> Iterator[Dict[str, Any]]:
+    """逐条读出快照中的记录（音色库条目为 {"voice": {...}}）；读到末尾时校验条数与校验和。"""
+    digest = hashlib.sha256()
+    count = voice_count = 0
+    footer: Optional[Dict[str, Any]] = None
+    try:
+        with gzip.GzipFile(fileobj=stream, mode="rb") as archive:
+            header = json.loads(archive.readline() or b"{}")
+            if header.get("format") != SNAPSHOT_FORMAT:
+                raise SnapshotError("不是有效的激活码快照文件。")
+            if header.get("version") not in READABLE_VERSIONS:
+                raise SnapshotError(f"不支持的快照版本：{header.get('version')}")
+            for line in archive:
+                if footer is not None:
+                    raise SnapshotError("快照结尾之后仍有数据。")
+                item = json.loads(line)
+                if item.get("end") is True:
+                    footer = item
+                    continue
+                digest.update(line)
+                if "voice" in item:
+                    voice_count += 1
+                else:
+                    count += 1
+                yield item
+    except (OSError, EOFError, ValueError) as exc:
+        raise SnapshotError(f"快照文件已损坏：{exc}")
+
+    if footer is None:
+        raise SnapshotError("快照不完整（缺少结尾校验信息）。")
+    if (
+        footer.get("count") != count
+        or footer.get("voices", 0) != voice_count
+        or footer.get("sha256") != digest.hexdigest()
+    ):
+        raise SnapshotError("快照校验失败，文件可能已损坏。")
+
+
+def load_snapshot(source: str) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """读取并校验整个快照，校验通过后才返回 (激活码记录, 音色库条目)。"""
+    records: List[Dict[str, Any]] = []
+    voices: List[Dict[str, Any]] = []
+    with open_snapshot_source(source) as stream:
+        for item in iter_snapshot(stream):
+            if "voice" in item:
+                voices.append(item["voice"])
+            else:
+                records.append(item)
+    return records, voices
+
+
+def verify_snapshot(source: str) -> Tuple[int, int]:
+    """校验快照，返回 (激活码数, 音色数)。"""
+    counts = [0, 0]
+    with open_snapshot_source(source) as stream:
+        for item in iter_snapshot(stream):
+            counts["voice" in item] += 1
+    return counts[0], counts[1]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="激活码快照工具")
+    parser.add_argument(
+        "--store",
+        default="activation_codes.json",
+        help="未设置 DATABASE_URL 时使用的 JSON 存储文件",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    create = subparsers.add_parser("create", help="从当前存储生成快照")
+    create.add_argument("--output", "-o", required=True, help="快照输出路径（建议 .snapshot.gz）")
+
+    verify = subparsers.add_parser("verify", help="校验快照（本地路径或 URL）")
+    verify.add_argument("source")
+
+    restore = subparsers.add_parser("restore", help="把快照导入当前存储（已存在的激活码跳过）")
+    restore.add_argument("source")
+
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "verify":
+            count, voice_count = verify_snapshot(args.source)
+            print(f"✓ 快照校验通过，共 {count} 个激活码、{voice_count} 个音色")
+            return 0
+
+        manager = create_activation_manager(Path(args.store))
+        if args.command == "create":
+            with open(args.output, "wb") as handle:
+                footer = write_snapshot(manager.iter_codes(sort="created_asc"), handle, manager.iter_voices())
+            print(f"✓ 已生成快照 {args.output}，共 {footer['count']} 个激活码、{footer['voices']} 个音色")
+        else:
+            records, voices = load_snapshot(args.source)
+            imported, skipped = manager.import_codes(records)
+            restored_voices = manager.import_voices(voices)
+            print(f"✓ 恢复完成：新增 {len(imported)} 个，跳过 {len(skipped)} 个，恢复音色 {restored_voices} 个")
+    except (ActivationError, OSError) as exc:
+        print(f"错误：{exc}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流式 multipart/form-data 编码
+
+requests 的 files= 会先在内存中拼出完整的请求体；这里改为边读文件边发送，
+每个请求只占用一个读缓冲区的内存，并通过回调报告上传进度。
+
+    body = MultipartStream({"model": "..."}, "file", path, "audio/wav", progress=callback)
+    requests.post(url, data=body, headers={"Content-Type": body.content_type})
+"""
+
+from __future__ import annotations
+
+import os
+import secrets
+from typing import BinaryIO, Callable, Dict, List, Optional
+
+READ_CHUNK_SIZE = 64 * 1024
+
+ProgressCallback = Callable[[int, int], None]
+
+
+def _quote(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\r", " ").replace("\n", " ")
+
+
+class MultipartStream:
+    """只读文件对象：提供 read() 与 __len__()，requests 据此设置 Content-Length 并分块发送"""
+
+    def __init__(
+        self,
+        fields: Dict[str, str],
+        file_field: str,
+        file_path: str,
+        mime_type: str = "application/octet-stream",
+        file_name: Optional[str] = None,
+        progress: Optional[ProgressCallback] = None,
+    ):
+        self.boundary = secrets.token_hex(16)
+        self.content_type = f"multipart/form-data; boundary={self.boundary}"
+        self.progress = progress
+
+        head: List[bytes] = []
+        for name, value in fields.items():
+            head.append(
+                f'--{self.boundary}\r\nContent-Disposition: form-data; name="{_quote(name)}"\r\n\r\n'
+                .encode("utf-8") + str(value).encode("utf-8") + b"\r\n"
+            )
+        file_name = file_name or os.path.basename(file_path)
+        head.append(
+            f'--{self.boundary}\r\nContent-Disposition: form-data; name="{_quote(file_field)}"; '
+            f'filename="{_quote(file_name)}"\r\nContent-Type: {mime_type}\r\n\r\n'.encode("utf-8")
+        )
+        self._head = b"".join(head)
+        self._tail = f"\r\n--{self.boundary}--\r\n".encode("utf-8")
+        self._file_path = file_path
+        self.file_size = os.path.getsize(file_path)
+        self._length = len(self._head) + self.file_size + len(self._tail)
+
+        self._file: Optional[BinaryIO] = None
+        self._stage = 0          # 0=表单字段与文件头  1=文件内容  2=已结束
+        self._sent = 0
+        self._reported = 0
+
+    def __len__(self) -> int:
+        return self._length
+
+    def _report(self) -> None:
+        # 每 1% 报告一次，避免进度事件过多
+        if self.progress and (self._sent - self._reported >= self._length / 100 or self._sent == self._length):
+            self._reported = self._sent
+            self.progress(self._sent, self._length)
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size <= 0:
+            size = READ_CHUNK_SIZE
+        chunk = b""
+        if self._stage == 0:
+            chunk = self._head
+            self._file = open(self._file_path, "rb")
+            self._stage = 1
+        elif self._stage == 1:
+            chunk = self._file.read(size)
+            if not chunk:
+                self.close()
+                chunk = self._tail
+                self._stage = 2
+        self._sent += len(chunk)
+        if chunk:
+            self._report()
+        return chunk
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> "MultipartStream":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
@@ -0,0 +1,11 @@
+import pytest
+
+from activation_manager import ActivationManager
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    """空的 JSON 激活码存储"""
+    monkeypatch.delenv("ACTIVATION_SNAPSHOT", raising=False)
+    monkeypatch.delenv("DEFAULT_ACTIVATION_CODES", raising=False)
+    return ActivationManager(tmp_path / "activation_codes.json")
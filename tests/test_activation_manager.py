@@ -0,0 +1,97 @@
+import pytest
+
+from activation_manager import CODE_LENGTH, ActivationError, MAX_BULK_CODES, generate_unique_codes
+
+
+def _import_sample(manager):
+    manager.import_codes([
+        {"code": "AAA1", "note": "渠道A", "created_at": "2025-01-01T00:00:00"},
+        {"code": "AAB2", "note": "渠道B", "created_at": "2025-01-02T00:00:00", "disabled": "true"},
+        {"code": "BBB3", "note": "渠道A 续费", "created_at": "2025-01-03T00:00:00", "expires_at": "2000-01-01"},
+        {"code": "CCC4", "note": "", "created_at": "2025-01-04T00:00:00"},
+    ])
+
+
+def _codes(infos):
+    return [info["code"] for info in infos]
+
+
+def test_list_codes_sorts_and_pages(manager):
+    _import_sample(manager)
+    assert _codes(manager.list_codes()) == ["CCC4", "BBB3", "AAB2", "AAA1"]
+    assert _codes(manager.list_codes(sort="created_asc")) == ["AAA1", "AAB2", "BBB3", "CCC4"]
+    assert _codes(manager.list_codes(sort="code", offset=1, limit=2)) == ["AAB2", "BBB3"]
+    assert manager.count_codes() == 4
+
+
+def test_list_codes_filters(manager):
+    _import_sample(manager)
+    assert _codes(manager.list_codes(code_prefix="aa")) == ["AAB2", "AAA1"]
+    assert _codes(manager.list_codes(note="渠道a")) == ["BBB3", "AAA1"]
+    assert _codes(manager.list_codes(status="disabled")) == ["AAB2"]
+    assert _codes(manager.list_codes(status="expired")) == ["BBB3"]
+    assert _codes(manager.list_codes(status="active")) == ["CCC4", "AAA1"]
+    assert manager.count_codes(status="active") == 2
+    with pytest.raises(ActivationError):
+        manager.list_codes(status="unknown")
+
+
+def test_cursor_pagination_walks_every_code_once(manager):
+    _import_sample(manager)
+    seen, after = [], None
+    while True:
+        page = manager.list_codes(limit=3, after=after)
+        if not page:
+            break
+        seen.extend(_codes(page))
+        after = page[-1]["code"]
+    assert seen == ["CCC4", "BBB3", "AAB2", "AAA1"]
+
+
+def test_cursor_ignores_offset_and_applies_filters(manager):
+    _import_sample(manager)
+    assert _codes(manager.list_codes(offset=3, limit=2, after="CCC4", code_prefix="A")) == ["AAB2", "AAA1"]
+
+
+def test_iter_codes_batches_cover_all_codes(manager):
+    manager.create_codes(7)
+    assert len(list(manager.iter_codes(batch_size=3))) == 7
+
+
+def test_create_codes_are_unique_and_follow_template(manager):
+    created = manager.create_codes(50, {"max_voices": 2, "max_characters": 500, "note": "批量"})
+    codes = _codes(created)
+    assert len(set(codes)) == 50 and all(len(code) == CODE_LENGTH for code in codes)
+    info = manager.get_code_info(codes[0])
+    assert (info["max_voices"], info["max_characters"], info["note"]) == (2, 500, "批量")
+    assert manager.count_codes() == 50
+
+
+@pytest.mark.parametrize("count", [0, -1, "abc", MAX_BULK_CODES + 1])
+def test_create_codes_rejects_bad_counts(manager, count):
+    with pytest.raises(ActivationError):
+        manager.create_codes(count)
+
+
+def test_generate_unique_codes_avoids_existing():
+    existing = {"A" * CODE_LENGTH}
+    assert not set(generate_unique_codes(100, existing)) & existing
+
+
+def test_import_skips_existing_codes(manager):
+    manager.import_codes([{"code": "aaa1", "max_characters": "100"}])
+    imported, skipped = manager.import_codes([{"code": "AAA1", "max_characters": 999}, {"code": "NEW1"}])
+    assert (imported, skipped) == (["NEW1"], ["AAA1"])
+    assert manager.get_code_info("AAA1")["max_characters"] == 100
+
+
+@pytest.mark.parametrize("record", [
+    {"code": ""},
+    {"code": "X" * 51},
+    {"code": "BAD1", "max_voices": "many"},
+    {"code": "BAD2", "expires_at": "next year"},
+])
+def test_import_rejects_invalid_records(manager, record):
+    with pytest.raises(ActivationError):
+        manager.import_codes([{"code": "GOOD"}, record])
+    assert manager.count_codes() == 0
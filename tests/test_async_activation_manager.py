@@ -0,0 +1,10 @@
+from async_activation_manager import _to_dollar_params
+
+
+def test_placeholders_are_numbered_in_order():
+    query = "SELECT * FROM activation_codes WHERE code LIKE %s AND note = %s LIMIT %s"
+    assert _to_dollar_params(query) == "SELECT * FROM activation_codes WHERE code LIKE $1 AND note = $2 LIMIT $3"
+
+
+def test_query_without_placeholders_is_unchanged():
+    assert _to_dollar_params("SELECT COUNT(*) FROM activation_codes") == "SELECT COUNT(*) FROM activation_codes"
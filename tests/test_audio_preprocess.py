@@ -0,0 +1,75 @@
+import math
+import wave
+from array import array
+
+import pytest
+
+pytest.importorskip("dotenv")
+
+import audio_preprocess  # noqa: E402
+from audio_preprocess import EncodedAudioCache, _process_wav, _resample, _silence_bounds  # noqa: E402
+
+
+def _tone(seconds: float, rate: int, amplitude: int = 8000) -> array:
+    return array("h", (int(amplitude * math.sin(2 * math.pi * 220 * i / rate)) for i in range(int(seconds * rate))))
+
+
+def _write_wav(path, samples: array, rate: int, channels: int = 1) -> None:
+    with wave.open(str(path), "wb") as writer:
+        writer.setnchannels(channels)
+        writer.setsampwidth(2)
+        writer.setframerate(rate)
+        writer.writeframes(samples.tobytes())
+
+
+def test_silence_bounds_trim_leading_and_trailing_silence():
+    rate = 8000
+    silence = array("h", bytes(2 * rate))
+    samples = silence + _tone(1.0, rate) + silence
+    start, end = _silence_bounds(samples, rate)
+    padding = int(rate * audio_preprocess.SILENCE_PADDING_SECONDS)
+    assert rate - padding - rate // 100 <= start <= rate - padding
+    assert 2 * rate + padding <= end <= 2 * rate + padding + rate // 100
+
+
+def test_silence_bounds_keep_all_silent_audio():
+    assert _silence_bounds(array("h", bytes(1000)), 8000) == (0, 500)
+
+
+def test_resample_changes_length_and_keeps_endpoints():
+    samples = array("h", range(0, 1000, 10))
+    halved = _resample(samples, 16000, 8000)
+    assert len(halved) == 50
+    assert halved[0] == 0 and halved[1] == 20
+    assert _resample(samples, 8000, 8000) is samples
+
+
+def test_process_wav_trims_downmixes_and_caps_length(tmp_path):
+    rate = 16000
+    mono = array("h", bytes(2 * rate)) + _tone(20.0, rate)
+    stereo = array("h", (value for sample in mono for value in (sample, sample)))
+    source, target = tmp_path / "in.wav", tmp_path / "out.wav"
+    _write_wav(source, stereo, rate, channels=2)
+
+    assert _process_wav(str(source), str(target), max_seconds=15.0, sample_rate=8000)
+
+    with wave.open(str(target), "rb") as reader:
+        assert (reader.getnchannels(), reader.getframerate()) == (1, 8000)
+        assert reader.getnframes() == 15 * 8000
+
+
+def test_encoded_audio_cache_evicts_least_recently_used():
+    cache = EncodedAudioCache("test", max_bytes=10)
+    cache.put("a", "aaaa")
+    cache.put("b", "bbbb")
+    assert cache.get("a") == "aaaa"
+    cache.put("c", "cccc")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "aaaa" and cache.get("c") == "cccc"
+
+
+def test_encoded_audio_cache_skips_oversized_values():
+    cache = EncodedAudioCache("test", max_bytes=4)
+    cache.put("big", "x" * 5)
+    assert cache.get("big") is None
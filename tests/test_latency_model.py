@@ -0,0 +1,50 @@
+import pytest
+
+from latency_model import LatencyModel, audio_seconds
+
+
+def _fitted(intercept: float, slope: float) -> LatencyModel:
+    model = LatencyModel(min_samples=5)
+    for characters in (20, 50, 100, 200, 400, 800):
+        model.record(characters, intercept + slope * characters)
+    return model
+
+
+def test_coefficients_recover_linear_latency():
+    intercept, slope = _fitted(1.5, 0.02).coefficients()
+    assert intercept == pytest.approx(1.5)
+    assert slope == pytest.approx(0.02)
+
+
+def test_too_few_samples_use_default():
+    model = LatencyModel(min_samples=10)
+    model.record(100, 2.0)
+    assert model.coefficients() is None
+    assert model.chunk_chars(600, 2, default=120, max_chars=1000) == 120
+
+
+def test_high_fixed_cost_prefers_fewer_chunks():
+    # 固定开销占主导：并行的每一轮都要付一次开销，分成 parallelism 段正好一轮
+    assert _fitted(10.0, 0.001).chunk_chars(600, 2, default=120, max_chars=1000) == 300
+
+
+def test_per_character_cost_fills_parallel_slots():
+    size = _fitted(0.01, 0.05).chunk_chars(600, 4, default=120, max_chars=1000)
+    assert size == 150
+
+
+def test_chunk_never_exceeds_max_chars():
+    assert _fitted(10.0, 0.001).chunk_chars(5000, 1, default=120, max_chars=500) <= 500
+
+
+def test_audio_seconds_reads_wav_duration(tmp_path):
+    import wave
+
+    path = tmp_path / "tone.wav"
+    with wave.open(str(path), "wb") as writer:
+        writer.setnchannels(1)
+        writer.setsampwidth(2)
+        writer.setframerate(8000)
+        writer.writeframes(b"\x00\x00" * 4000)
+    assert audio_seconds(path.read_bytes(), "wav") == pytest.approx(0.5)
+    assert audio_seconds(b"not audio", "wav") is None
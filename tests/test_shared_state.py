@@ -0,0 +1,35 @@
+import shared_state
+from shared_state import LocalStore, check_rate_limit
+
+
+def test_rate_limit_allows_limit_requests_per_window(monkeypatch):
+    store = LocalStore()
+    now = [600.0]
+    monkeypatch.setattr(shared_state.time, "time", lambda: now[0])
+
+    assert [check_rate_limit(store, "CODE", 3) for _ in range(4)] == [True, True, True, False]
+    assert check_rate_limit(store, "OTHER", 3)
+
+    now[0] += 60
+    assert check_rate_limit(store, "CODE", 3)
+
+
+def test_rate_limit_disabled_when_limit_is_zero():
+    store = LocalStore()
+    assert all(check_rate_limit(store, "CODE", 0) for _ in range(100))
+
+
+def test_local_store_expires_and_evicts(monkeypatch):
+    store = LocalStore(max_entries=2)
+    clock = [100.0]
+    monkeypatch.setattr(shared_state.time, "monotonic", lambda: clock[0])
+
+    store.set("a", "1", ttl=10)
+    assert store.incr("a", 2) == 3
+    clock[0] += 11
+    assert store.get("a") is None
+
+    store.set("b", "1")
+    store.set("c", "1")
+    store.set("d", "1")
+    assert store.get("b") is None and store.get("d") == "1"
@@ -0,0 +1,80 @@
+import gzip
+import io
+
+import pytest
+
+from activation_manager import ActivationError, ActivationManager
+from snapshot import SnapshotError, load_snapshot, verify_snapshot, write_snapshot
+
+
+def _write(path, records, voices=()):
+    with open(path, "wb") as handle:
+        return write_snapshot(records, handle, voices)
+
+
+def test_round_trip_with_voices(tmp_path, manager):
+    manager.import_codes([{"code": "AAA1", "max_characters": 100, "note": "甲"}, {"code": "BBB2"}])
+    manager.save_voice("AAA1", "speech:one", "我的音色", "hash-1")
+    path = tmp_path / "codes.snapshot.gz"
+
+    footer = _write(path, manager.iter_codes(), manager.iter_voices())
+
+    assert (footer["count"], footer["voices"]) == (2, 1)
+    assert verify_snapshot(str(path)) == (2, 1)
+    records, voices = load_snapshot(str(path))
+    assert sorted(record["code"] for record in records) == ["AAA1", "BBB2"]
+    assert voices[0]["uri"] == "speech:one" and voices[0]["code"] == "AAA1"
+
+
+def test_tampered_snapshot_fails_checksum(tmp_path):
+    path = tmp_path / "codes.snapshot.gz"
+    _write(path, [{"code": "AAA1", "note": "原始"}])
+    content = gzip.decompress(path.read_bytes()).replace("原始".encode("utf-8"), "篡改".encode("utf-8"))
+    path.write_bytes(gzip.compress(content))
+
+    with pytest.raises(SnapshotError):
+        verify_snapshot(str(path))
+
+
+def test_truncated_snapshot_is_rejected(tmp_path):
+    path = tmp_path / "codes.snapshot.gz"
+    _write(path, [{"code": "AAA1"}])
+    lines = gzip.decompress(path.read_bytes()).splitlines(keepends=True)
+    path.write_bytes(gzip.compress(b"".join(lines[:-1])))
+
+    with pytest.raises(SnapshotError):
+        load_snapshot(str(path))
+
+
+def test_not_a_snapshot(tmp_path):
+    path = tmp_path / "codes.snapshot.gz"
+    path.write_bytes(gzip.compress(b'{"format": "other"}\n'))
+    with pytest.raises(SnapshotError):
+        verify_snapshot(str(path))
+
+
+def test_manager_restores_pending_snapshot(tmp_path, monkeypatch):
+    monkeypatch.delenv("DEFAULT_ACTIVATION_CODES", raising=False)
+    snapshot_path = tmp_path / "codes.snapshot.gz"
+    buffer = io.BytesIO()
+    write_snapshot(
+        [{"code": "AAA1", "max_characters": 100, "used_characters": 40}],
+        buffer,
+        [{"code": "AAA1", "uri": "speech:one", "name": "", "audio_hash": "h"}],
+    )
+    snapshot_path.write_bytes(buffer.getvalue())
+
+    restored = ActivationManager(tmp_path / "store" / "activation_codes.json", snapshot_source=str(snapshot_path))
+
+    assert restored.get_code_info("AAA1")["remaining_characters"] == 60
+    assert [voice["uri"] for voice in restored.list_voices("AAA1")] == ["speech:one"]
+
+
+def test_writes_are_refused_while_snapshot_is_unavailable(tmp_path, monkeypatch):
+    monkeypatch.delenv("DEFAULT_ACTIVATION_CODES", raising=False)
+    broken = ActivationManager(tmp_path / "activation_codes.json", snapshot_source=str(tmp_path / "missing.gz"))
+
+    assert broken.count_codes() == 0
+    with pytest.raises(ActivationError):
+        broken.create_codes(1)
+    assert not (tmp_path / "activation_codes.json").exists()
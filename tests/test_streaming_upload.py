@@ -0,0 +1,39 @@
+import os
+
+from streaming_upload import MultipartStream
+
+
+def _read_all(stream, size=7):
+    chunks = []
+    while True:
+        chunk = stream.read(size)
+        if not chunk:
+            return b"".join(chunks)
+        chunks.append(chunk)
+
+
+def test_length_matches_encoded_body(tmp_path):
+    path = tmp_path / "参考.wav"
+    path.write_bytes(os.urandom(1000))
+    stream = MultipartStream({"model": "IndexTTS-2", "customName": 'a "quoted"\nname'}, "file", str(path), "audio/wav")
+
+    body = _read_all(stream)
+
+    assert len(body) == len(stream)
+    assert body.startswith(f"--{stream.boundary}\r\n".encode())
+    assert body.endswith(f"\r\n--{stream.boundary}--\r\n".encode())
+    assert path.read_bytes() in body
+    assert b'name="customName"' in body and 'filename="参考.wav"'.encode("utf-8") in body
+    assert stream.content_type == f"multipart/form-data; boundary={stream.boundary}"
+
+
+def test_progress_reaches_total(tmp_path):
+    path = tmp_path / "ref.wav"
+    path.write_bytes(b"x" * 5000)
+    reports = []
+    with MultipartStream({}, "file", str(path), progress=lambda sent, total: reports.append((sent, total))) as stream:
+        _read_all(stream, size=100)
+
+    assert reports[-1] == (len(stream), len(stream))
+    assert all(earlier[0] < later[0] for earlier, later in zip(reports, reports[1:]))
+    assert len(reports) <= 101
@@ -0,0 +1,49 @@
+from text_segmenter import TextSegmenter, split_long
+
+
+def test_split_long_prefers_soft_breaks():
+    assert split_long("甲乙丙丁戊己庚辛，壬癸子丑寅卯", 10) == ["甲乙丙丁戊己庚辛，", "壬癸子丑寅卯"]
+
+
+def test_split_long_keeps_english_words_whole():
+    pieces = split_long("Hello world, this sentence is long", 10)
+    assert "".join(pieces) == "Hello world, this sentence is long"
+    assert all(len(piece) <= 10 for piece in pieces)
+    assert [piece.strip() for piece in pieces] == ["Hello", "world,", "this", "sentence", "is long"]
+
+
+def test_split_long_hard_cuts_without_breaks():
+    assert split_long("abcdefghijkl", 5) == ["abcde", "fghij", "kl"]
+
+
+def test_feed_keeps_partial_sentence_until_flush():
+    segmenter = TextSegmenter(max_chars=120)
+    assert segmenter.feed("第一句。第二") == ["第一句。"]
+    assert segmenter.buffered == 2
+    assert segmenter.feed("句！") == ["第二句！"]
+    assert segmenter.flush() == []
+
+
+def test_first_segment_holds_only_the_first_sentence():
+    segmenter = TextSegmenter(max_chars=120)
+    assert segmenter.feed("第一句话。第二句话。第三句话。") == ["第一句话。", "第二句话。第三句话。"]
+
+
+def test_target_chars_packs_whole_sentences_only():
+    segmenter = TextSegmenter(max_chars=120)
+    segmenter.target_chars = 8
+    segments = segmenter.feed("开头的一句话。这一句明显比八个字更长一些。短句。又一句。") + segmenter.flush()
+    assert segments == ["开头的一句话。", "这一句明显比八个字更长一些。", "短句。又一句。"]
+
+
+def test_short_sentences_merge_with_following_text():
+    segmenter = TextSegmenter(max_chars=120, min_chars=4)
+    assert segmenter.feed("好。") == []
+    assert segmenter.feed("我们开始吧。") == ["好。我们开始吧。"]
+
+
+def test_unpunctuated_text_is_cut_at_max_chars():
+    segmenter = TextSegmenter(max_chars=10)
+    segments = segmenter.feed("one two three four five six")
+    assert segments and all(len(segment) <= 10 for segment in segments)
+    assert " ".join(segments + segmenter.flush()) == "one two three four five six"
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+增量文本分段
+
+流式合成时文本分多次到达，TextSegmenter 在句末标点处切出完整的句子交给合成，
+剩余部分留到下一次 feed() 或 flush()：
+
+    segmenter = TextSegmenter(max_chars=120)
+    segmenter.feed("第一句。第二")    # -> ["第一句。"]
+    segmenter.feed("句！")            # -> ["第二句！"]
+    segmenter.flush()                 # -> []
+
+同一次 feed() 中的多个完整句子合并为不超过 target_chars 的分段，减少上游请求次数；
+target_chars 只决定合并多少个完整句子，不会切开句子。第一段只含第一句，保证开始
+播放的等待时间只取决于第一句。超过 max_chars 的长句优先在逗号、顿号等停顿处切开，
+其次在空格处切开（英文不会切断单词），都找不到时才按长度硬切；短于 min_chars 的句子与后文合并，避免为一两个字单独请求
+一次上游。
+"""
+
+from __future__ import annotations
+
+import re
+from typing import List, Optional
+
+SENTENCE_END = re.compile(r"[。！？!?；;…\n]+[”’」』)）\"']*|\.(?=\s)")
+SOFT_BREAKS = "，,、：:—"
+DEFAULT_MAX_CHARS = 120
+DEFAULT_MIN_CHARS = 4
+
+
+def split_long(sentence: str, max_chars: int) -> List[str]:
+    """把超过 max_chars 的句子切成多段：优先停顿标点，其次空格（英文单词边界），都没有时才硬切"""
+    pieces: List[str] = []
+    while len(sentence) > max_chars:
+        soft = max(sentence.rfind(mark, 0, max_chars) for mark in SOFT_BREAKS)
+        space = sentence.rfind(" ", 0, max_chars + 1)
+        if soft >= max_chars // 3:
+            cut = soft + 1
+        elif space > 0:
+            cut = space
+        elif soft >= 0:
+            cut = soft + 1
+        else:
+            cut = max_chars
+        pieces.append(sentence[:cut])
+        sentence = sentence[cut:]
+    if sentence:
+        pieces.append(sentence)
+    return pieces
+
+
+class TextSegmenter:
+    def __init__(self, max_chars: int = DEFAULT_MAX_CHARS, min_chars: int = DEFAULT_MIN_CHARS,
+                 target_chars: Optional[int] = None):
+        self.max_chars = max(max_chars, 1)
+        self.min_chars = min_chars
+        # target_chars 可以在两次 feed() 之间调整（见 latency_model.LatencyModel.chunk_chars）
+        self.target_chars = max(target_chars or self.max_chars, 1)
+        self._buffer = ""
+        self._pending = ""      # 过短、等待与后文合并的分段
+        self._emitted = 0
+
+    @property
+    def buffered(self) -> int:
+        """尚未切出的字数"""
+        return len(self._pending) + len(self._buffer)
+
+    def _pack(self, pieces: List[str], final: bool) -> List[str]:
+        """把完整的句子合并成不超过 target_chars 的分段；第一段只含第一句，尽快开始播放"""
+        segments: List[str] = []
+        current = self._pending
+        for piece in pieces:
+            if not piece.strip():
+                continue
+            first = not self._emitted and not segments
+            if current.strip() and (
+                len(current) + len(piece) > self.target_chars or (first and len(current.strip()) >= self.min_chars)
+            ):
+                segments.append(current.strip())
+                current = ""
+            current += piece
+        if current.strip() and (final or len(current.strip()) >= self.min_chars):
+            segments.append(current.strip())
+            current = ""
+        self._pending = current
+        self._emitted += len(segments)
+        return segments
+
+    def feed(self, text: str) -> List[str]:
+        """追加文本，返回已经完整的分段"""
+        self._buffer += text
+        pieces: List[str] = []
+        start = 0
+        for match in SENTENCE_END.finditer(self._buffer):
+            pieces.extend(split_long(self._buffer[start:match.end()], self.max_chars))
+            start = match.end()
+        self._buffer = self._buffer[start:]
+        # 没有标点的长文本不必等句末，先切出前面的部分
+        if len(self._buffer) > self.max_chars:
+            rest = split_long(self._buffer, self.max_chars)
+            self._buffer = rest.pop()
+            pieces.extend(rest)
+        return self._pack(pieces, final=False)
+
+    def flush(self) -> List[str]:
+        """文本结束：返回剩余的所有内容"""
+        rest, self._buffer = self._buffer, ""
+        return self._pack(split_long(rest, self.max_chars), final=True)
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+轻量级请求追踪
+
+    @tracing.traced("voice_clone")
+    def voice_clone(...):
+        with tracing.span("upload", bytes=size):
+            ...
+
+每个请求结束时输出一行 JSON 日志（请求 ID 与各阶段耗时）；总耗时超过
+TRACE_SLOW_SECONDS 时额外输出包含全部阶段明细的慢请求日志。
+设置 OTEL_EXPORTER_OTLP_ENDPOINT（例如 http://localhost:4318）后，
+追踪数据会在后台线程中以 OTLP/HTTP JSON 格式发送到本地采集器。
+"""
+
+from __future__ import annotations
+
+import contextlib
+import contextvars
+import functools
+import logging
+import os
+import queue
+import secrets
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+TRACE_SLOW_SECONDS = float(os.getenv("TRACE_SLOW_SECONDS", "20"))
+OTLP_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "").rstrip("/")
+OTLP_SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "azvoiceclone")
+OTLP_TIMEOUT = (3, 10)
+OTLP_BATCH_SIZE = 50
+
+logger = logging.getLogger(__name__)
+
+_current_trace: contextvars.ContextVar[Optional["Trace"]] = contextvars.ContextVar("trace", default=None)
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("span", default=None)
+
+
+class Span:
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str] = None,
+                 attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.start_ns = time.time_ns()
+        self._start = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.error: Optional[str] = None
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        self.duration = time.perf_counter() - self._start
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+
+    @property
+    def end_ns(self) -> int:
+        return self.start_ns + int((self.duration or 0) * 1_000_000_000)
+
+    @property
+    def duration_ms(self) -> float:
+        return round((self.duration or 0) * 1000, 1)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "duration_ms": self.duration_ms,
+            "attributes": self.attributes,
+        }
+        if self.error:
+            data["error"] = self.error
+        return data
+
+
+class Trace:
+    """一次请求的追踪；request_id 即 OTLP 的 trace ID"""
+
+    def __init__(self, name: str, attributes: Optional[Dict[str, Any]] = None):
+        self.request_id = secrets.token_hex(16)
+        self.root = Span(name, self.request_id, attributes=attributes)
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def add(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def stages(self) -> Dict[str, float]:
+        """各阶段耗时（毫秒），同名阶段累加"""
+        stages: Dict[str, float] = {}
+        for span in self.spans:
+            stages[span.name] = round(stages.get(span.name, 0) + span.duration_ms, 1)
+        return stages
+
+    def summary(self) -> Dict[str, Any]:
+        data = {
+            "event": "trace",
+            "request_id": self.request_id,
+            "name": self.root.name,
+            "duration_ms": self.root.duration_ms,
+            "stages": self.stages(),
+            "attributes": self.root.attributes,
+        }
+        if self.root.error:
+            data["error"] = self.root.error
+        return data
+
+    def breakdown(self) -> List[Dict[str, Any]]:
+        items = []
+        for span in sorted(self.spans, key=lambda item: item.start_ns):
+            item = span.to_dict()
+            item["offset_ms"] = round((span.start_ns - self.root.start_ns) / 1_000_000, 1)
+            items.append(item)
+        return items
+
+
+def _emit(record: Dict[str, Any], level: int = logging.INFO) -> None:
+    message = f"{record['event']} {record['name']} {record['duration_ms']}ms"
+    logger.log(level, message, extra={"request_id": record["request_id"], "trace": record})
+
+
+@contextlib.contextmanager
+def start_trace(name: str, **attributes: Any) -> Iterator[Trace]:
+    trace = Trace(name, attributes)
+    trace_token = _current_trace.set(trace)
+    span_token = _current_span.set(trace.root)
+    error: Optional[BaseException] = None
+    try:
+        yield trace
+    except BaseException as exc:
+        error = exc
+        raise
+    finally:
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+        trace.root.finish(error)
+        _finish_trace(trace)
+
+
+def _finish_trace(trace: Trace) -> None:
+    _emit(trace.summary())
+    if trace.root.duration is not None and trace.root.duration >= TRACE_SLOW_SECONDS:
+        record = trace.summary()
+        record["event"] = "slow_request"
+        record["threshold_ms"] = TRACE_SLOW_SECONDS * 1000
+        record["spans"] = trace.breakdown()
+        _emit(record, logging.WARNING)
+    if _EXPORTER is not None:
+        _EXPORTER.submit(trace)
+
+
+@contextlib.contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """记录当前请求中的一个阶段；不在追踪中时不做任何事"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+    parent = _current_span.get()
+    current = Span(name, trace.request_id, parent.span_id if parent else None, attributes)
+    token = _current_span.set(current)
+    error: Optional[BaseException] = None
+    try:
+        yield current
+    except BaseException as exc:
+        error = exc
+        raise
+    finally:
+        _current_span.reset(token)
+        current.finish(error)
+        trace.add(current)
+
+
+def annotate(**attributes: Any) -> None:
+    """给当前请求追加属性（例如处理结果）"""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.root.attributes.update(attributes)
+
+
+def current_request_id() -> Optional[str]:
+    trace = _current_trace.get()
+    return trace.request_id if trace else None
+
+
+def traced(name: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """装饰器：每次调用作为一个独立的请求追踪"""
+    def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with start_trace(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_span(item: Span) -> Dict[str, Any]:
+    data = {
+        "traceId": item.trace_id,
+        "spanId": item.span_id,
+        "name": item.name,
+        "kind": 1,
+        "startTimeUnixNano": str(item.start_ns),
+        "endTimeUnixNano": str(item.end_ns),
+        "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in item.attributes.items()],
+        "status": {"code": 2, "message": item.error} if item.error else {"code": 1},
+    }
+    if item.parent_id:
+        data["parentSpanId"] = item.parent_id
+    return data
+
+
+def to_otlp(traces: List[Trace]) -> Dict[str, Any]:
+    spans = [_otlp_span(item) for trace in traces for item in [trace.root, *trace.spans]]
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": OTLP_SERVICE_NAME}}]},
+            "scopeSpans": [{"scope": {"name": "azvoiceclone.tracing"}, "spans": spans}],
+        }]
+    }
+
+
+class OtlpExporter:
+    """后台线程批量发送追踪数据；队列满或采集器不可用时直接丢弃"""
+
+    def __init__(self, endpoint: str, max_queue: int = 1000):
+        self.url = f"{endpoint}/v1/traces"
+        self._queue: "queue.Queue[Trace]" = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name="otlp-exporter", daemon=True)
+        self._thread.start()
+
+    def submit(self, trace: Trace) -> None:
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            pass
+
+    def _run(self) -> None:
+        import requests
+
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < OTLP_BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                requests.post(self.url, json=to_otlp(batch), timeout=OTLP_TIMEOUT)
+            except requests.exceptions.RequestException as exc:
+                logger.warning("发送追踪数据失败：%s", exc)
+
+
+_EXPORTER: Optional[OtlpExporter] = OtlpExporter(OTLP_ENDPOINT) if OTLP_ENDPOINT else None